@@ -0,0 +1,54 @@
+"""content-addressed upload storage
+
+Revision ID: 0001_content_addressed_storage
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+Adds stored_blobs (one row per distinct upload, with a reference count) and
+uploaded_files.content_hash. Existing uploads keep content_hash NULL and are
+still read from uploads/<filename>. Steps are skipped when the table or column
+already exists (e.g. created by Base.metadata.create_all at startup).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_content_addressed_storage"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("stored_blobs"):
+        op.create_table(
+            "stored_blobs",
+            sa.Column("content_hash", sa.String(length=64), primary_key=True),
+            sa.Column("size", sa.Integer(), nullable=False),
+            sa.Column("refcount", sa.Integer(), nullable=False, server_default="1"),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        )
+
+    columns = {c["name"] for c in inspector.get_columns("uploaded_files")}
+    if "content_hash" not in columns:
+        with op.batch_alter_table("uploaded_files") as batch:
+            batch.add_column(sa.Column("content_hash", sa.String(length=64), nullable=True))
+            batch.create_index("ix_uploaded_files_content_hash", ["content_hash"])
+            batch.create_foreign_key(
+                "fk_uploaded_files_content_hash", "stored_blobs", ["content_hash"], ["content_hash"]
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("uploaded_files") as batch:
+        batch.drop_constraint("fk_uploaded_files_content_hash", type_="foreignkey")
+        batch.drop_index("ix_uploaded_files_content_hash")
+        batch.drop_column("content_hash")
+    op.drop_table("stored_blobs")
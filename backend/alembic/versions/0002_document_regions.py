@@ -0,0 +1,65 @@
+"""document regions for "generate more"
+
+Revision ID: 0002_document_regions
+Revises: 0001_content_addressed_storage
+Create Date: 2026-10-19 00:00:00
+
+Adds document_regions (each upload split once into ~REGION_CHARS chunks),
+uploaded_files.region_count / region_cursor (which region the next section
+uses) and quizzes.region_index (which region a section came from). Existing
+files are split lazily on their next "generate". Steps are skipped when the
+table or column already exists.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_document_regions"
+down_revision: Union[str, None] = "0001_content_addressed_storage"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table("document_regions"):
+        op.create_table(
+            "document_regions",
+            sa.Column("id", UUID(as_uuid=True), primary_key=True),
+            sa.Column("file_id", UUID(as_uuid=True), sa.ForeignKey("uploaded_files.id"), nullable=False),
+            sa.Column("region_index", sa.Integer(), nullable=False),
+            sa.Column("first_unit", sa.Integer(), nullable=False),
+            sa.Column("last_unit", sa.Integer(), nullable=False),
+            sa.Column("char_count", sa.Integer(), nullable=False),
+            sa.Column("text", sa.Text(), nullable=False),
+            sa.UniqueConstraint("file_id", "region_index", name="uq_document_regions_file_region"),
+        )
+        op.create_index("ix_document_regions_file_id", "document_regions", ["file_id"])
+
+    file_columns = {c["name"] for c in inspector.get_columns("uploaded_files")}
+    with op.batch_alter_table("uploaded_files") as batch:
+        if "region_count" not in file_columns:
+            batch.add_column(sa.Column("region_count", sa.Integer(), nullable=True))
+        if "region_cursor" not in file_columns:
+            batch.add_column(sa.Column("region_cursor", sa.Integer(), nullable=False, server_default="0"))
+
+    if "region_index" not in {c["name"] for c in inspector.get_columns("quizzes")}:
+        with op.batch_alter_table("quizzes") as batch:
+            batch.add_column(sa.Column("region_index", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("quizzes") as batch:
+        batch.drop_column("region_index")
+    with op.batch_alter_table("uploaded_files") as batch:
+        batch.drop_column("region_cursor")
+        batch.drop_column("region_count")
+    op.drop_index("ix_document_regions_file_id", table_name="document_regions")
+    op.drop_table("document_regions")
@@ -0,0 +1,227 @@
+"""compact per-attempt answer storage
+
+Revision ID: 0003_compact_answer_storage
+Revises: 0002_document_regions
+Create Date: 2026-10-19 00:00:00
+
+Adds quiz_attempts.answers_blob, where ANSWER_STORAGE_MODE=compact keeps an
+attempt's answers as one encoded record (format version 1 of
+services.answer_storage). When the
+migration runs with ANSWER_STORAGE_MODE=compact, existing user_answers rows are
+converted in batches and deleted; otherwise only the column is added and the
+rows stay where they are (readers handle both layouts). Also indexes
+quiz_attempts.user_id and user_answers.attempt_id, which the attempts history
+filters and joins on. Downgrade
+expands any compact records back into user_answers rows before dropping the
+column.
+
+The record format and the conversion are copied here rather than imported, so
+this revision keeps working however the application code changes later.
+"""
+import os
+import struct
+import uuid
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_compact_answer_storage"
+down_revision: Union[str, None] = "0002_document_regions"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+quiz_attempts = sa.table(
+    "quiz_attempts",
+    sa.column("id", UUID(as_uuid=True)),
+    sa.column("user_id", UUID(as_uuid=True)),
+    sa.column("submitted_at", sa.DateTime(timezone=True)),
+    sa.column("answers_blob", sa.LargeBinary()),
+)
+user_answers = sa.table(
+    "user_answers",
+    sa.column("id", UUID(as_uuid=True)),
+    sa.column("user_id", UUID(as_uuid=True)),
+    sa.column("question_id", UUID(as_uuid=True)),
+    sa.column("attempt_id", UUID(as_uuid=True)),
+    sa.column("answer", sa.String()),
+    sa.column("is_correct", sa.Boolean()),
+    sa.column("submitted_at", sa.DateTime(timezone=True)),
+)
+
+
+# === Answer record, format version 1 ===
+# version|flags (1 byte) | count (2 bytes)
+# question ids          count x 16 bytes
+# graded bitmap         ceil(count / 8) bytes: is_correct is not None
+# correct bitmap        ceil(count / 8) bytes: is_correct is True
+# answers               count x (varint length + UTF-8), zlib'd when smaller
+FORMAT_VERSION = 1
+FLAG_ZLIB = 0x80
+_HEADER = struct.Struct(">BH")
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _read_varint(data: bytes, offset: int):
+    shift = result = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
+
+
+def encode_answers(answers) -> bytes:
+    answers = list(answers)
+    count = len(answers)
+    bitmap_len = (count + 7) // 8
+    graded, correct = bytearray(bitmap_len), bytearray(bitmap_len)
+    ids, texts = bytearray(), bytearray()
+    for index, (question_id, answer, is_correct) in enumerate(answers):
+        ids += uuid.UUID(str(question_id)).bytes
+        if is_correct is not None:
+            graded[index // 8] |= 1 << (index % 8)
+            if is_correct:
+                correct[index // 8] |= 1 << (index % 8)
+        # 0 means NULL, otherwise length + 1
+        encoded = None if answer is None else str(answer).encode("utf-8")
+        texts += _varint(0 if encoded is None else len(encoded) + 1)
+        if encoded:
+            texts += encoded
+
+    flags = 0
+    packed = zlib.compress(bytes(texts), 6)
+    if len(packed) < len(texts):
+        texts, flags = packed, FLAG_ZLIB
+    return _HEADER.pack(FORMAT_VERSION | flags, count) + bytes(ids) + bytes(graded) + bytes(correct) + bytes(texts)
+
+
+def decode_answers(blob: bytes) -> list:
+    """(question_id, answer, is_correct) triples in stored order."""
+    version_flags, count = _HEADER.unpack_from(blob, 0)
+    if version_flags & ~FLAG_ZLIB != FORMAT_VERSION:
+        raise ValueError(f"Unknown answer record version {version_flags & ~FLAG_ZLIB}")
+    offset = _HEADER.size
+    ids = [uuid.UUID(bytes=bytes(blob[offset + 16 * i: offset + 16 * (i + 1)])) for i in range(count)]
+    offset += 16 * count
+    bitmap_len = (count + 7) // 8
+    graded = blob[offset: offset + bitmap_len]
+    correct = blob[offset + bitmap_len: offset + 2 * bitmap_len]
+    texts = bytes(blob[offset + 2 * bitmap_len:])
+    if version_flags & FLAG_ZLIB:
+        texts = zlib.decompress(texts)
+
+    answers, position = [], 0
+    for index in range(count):
+        length, position = _read_varint(texts, position)
+        answer = None
+        if length:
+            answer = texts[position: position + length - 1].decode("utf-8")
+            position += length - 1
+        is_correct = None
+        if graded[index // 8] >> (index % 8) & 1:
+            is_correct = bool(correct[index // 8] >> (index % 8) & 1)
+        answers.append((ids[index], answer, is_correct))
+    return answers
+
+
+# === Conversion between the two layouts ===
+def convert_rows_to_compact(connection, batch_size: int = BATCH_SIZE) -> int:
+    """Moves user_answers rows into quiz_attempts.answers_blob. Returns attempts converted."""
+    set_blob = (
+        sa.update(quiz_attempts)
+        .where(quiz_attempts.c.id == sa.bindparam("attempt_id"))
+        .values(answers_blob=sa.bindparam("blob"))
+    )
+    converted = 0
+    while True:
+        attempt_ids = connection.execute(
+            sa.select(user_answers.c.attempt_id).where(user_answers.c.attempt_id.is_not(None))
+            .distinct().limit(batch_size)
+        ).scalars().all()
+        if not attempt_ids:
+            return converted
+        grouped = {}
+        rows = connection.execute(
+            sa.select(user_answers.c.attempt_id, user_answers.c.question_id,
+                      user_answers.c.answer, user_answers.c.is_correct)
+            .where(user_answers.c.attempt_id.in_(attempt_ids))
+        )
+        for attempt_id, question_id, answer, is_correct in rows:
+            grouped.setdefault(attempt_id, []).append((question_id, answer, is_correct))
+        connection.execute(set_blob, [{"attempt_id": a, "blob": encode_answers(r)} for a, r in grouped.items()])
+        connection.execute(sa.delete(user_answers).where(user_answers.c.attempt_id.in_(attempt_ids)))
+        converted += len(grouped)
+
+
+def expand_compact_to_rows(connection, batch_size: int = BATCH_SIZE) -> int:
+    """Inverse of convert_rows_to_compact, for downgrades. Returns attempts expanded."""
+    clear_blob = (
+        sa.update(quiz_attempts)
+        .where(quiz_attempts.c.id == sa.bindparam("attempt_id"))
+        .values(answers_blob=None)
+    )
+    expanded = 0
+    while True:
+        batch = connection.execute(
+            sa.select(quiz_attempts.c.id, quiz_attempts.c.user_id, quiz_attempts.c.submitted_at,
+                      quiz_attempts.c.answers_blob)
+            .where(quiz_attempts.c.answers_blob.is_not(None)).limit(batch_size)
+        ).all()
+        if not batch:
+            return expanded
+        rows = [
+            {"id": uuid.uuid4(), "user_id": user_id, "question_id": question_id, "attempt_id": attempt_id,
+             "answer": answer, "is_correct": is_correct, "submitted_at": submitted_at}
+            for attempt_id, user_id, submitted_at, blob in batch
+            for question_id, answer, is_correct in decode_answers(blob)
+        ]
+        if rows:
+            connection.execute(sa.insert(user_answers), rows)
+        connection.execute(clear_blob, [{"attempt_id": attempt_id} for attempt_id, *_ in batch])
+        expanded += len(batch)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+
+    if "answers_blob" not in {c["name"] for c in inspector.get_columns("quiz_attempts")}:
+        with op.batch_alter_table("quiz_attempts") as batch:
+            batch.add_column(sa.Column("answers_blob", sa.LargeBinary(), nullable=True))
+
+    if "ix_quiz_attempts_user_id" not in {i["name"] for i in inspector.get_indexes("quiz_attempts")}:
+        op.create_index("ix_quiz_attempts_user_id", "quiz_attempts", ["user_id"])
+    if "ix_user_answers_attempt_id" not in {i["name"] for i in inspector.get_indexes("user_answers")}:
+        op.create_index("ix_user_answers_attempt_id", "user_answers", ["attempt_id"])
+
+    if os.getenv("ANSWER_STORAGE_MODE", "rows").lower() == "compact":
+        convert_rows_to_compact(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    expand_compact_to_rows(op.get_bind())
+    op.drop_index("ix_user_answers_attempt_id", table_name="user_answers")
+    op.drop_index("ix_quiz_attempts_user_id", table_name="quiz_attempts")
+    with op.batch_alter_table("quiz_attempts") as batch:
+        batch.drop_column("answers_blob")
@@ -0,0 +1,67 @@
+"""per-quiz score histograms
+
+Revision ID: 0004_quiz_score_histograms
+Revises: 0003_compact_answer_storage
+Create Date: 2026-10-19 00:00:00
+
+Adds quiz_score_histograms (attempts per quiz and score), which submissions
+keep current, and fills it from the existing quiz_attempts with one GROUP BY.
+The same rebuild runs standalone as `python -m services.score_histograms`; the
+statement is copied here so this revision does not depend on application code.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_quiz_score_histograms"
+down_revision: Union[str, None] = "0003_compact_answer_storage"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+quiz_attempts = sa.table(
+    "quiz_attempts",
+    sa.column("quiz_id", UUID(as_uuid=True)),
+    sa.column("score", sa.Integer()),
+)
+quiz_score_histograms = sa.table(
+    "quiz_score_histograms",
+    sa.column("quiz_id", UUID(as_uuid=True)),
+    sa.column("score", sa.Integer()),
+    sa.column("attempts", sa.Integer()),
+)
+
+
+def rebuild_histograms(connection) -> int:
+    """Refills quiz_score_histograms with a GROUP BY over the scored quiz_attempts."""
+    grouped = (
+        sa.select(quiz_attempts.c.quiz_id, quiz_attempts.c.score, sa.func.count())
+        .where(quiz_attempts.c.quiz_id.is_not(None), quiz_attempts.c.score.is_not(None))
+        .group_by(quiz_attempts.c.quiz_id, quiz_attempts.c.score)
+    )
+    connection.execute(sa.delete(quiz_score_histograms))
+    result = connection.execute(
+        sa.insert(quiz_score_histograms).from_select(["quiz_id", "score", "attempts"], grouped)
+    )
+    return result.rowcount
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("quiz_score_histograms"):
+        op.create_table(
+            "quiz_score_histograms",
+            sa.Column("quiz_id", UUID(as_uuid=True), sa.ForeignKey("quizzes.id"), primary_key=True),
+            sa.Column("score", sa.Integer(), primary_key=True),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        )
+    rebuild_histograms(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("quiz_score_histograms")
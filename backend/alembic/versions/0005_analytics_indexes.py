@@ -0,0 +1,42 @@
+"""indexes for per-question analytics
+
+Revision ID: 0005_analytics_indexes
+Revises: 0004_quiz_score_histograms
+Create Date: 2026-10-19 00:00:00
+
+Indexes the foreign keys the analytics queries group and filter on:
+quizzes.file_id, questions.quiz_id, quiz_attempts (quiz_id, submitted_at)
+and user_answers.question_id. Indexes that already exist are skipped.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_analytics_indexes"
+down_revision: Union[str, None] = "0004_quiz_score_histograms"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ("ix_quizzes_file_id", "quizzes", ["file_id"]),
+    ("ix_questions_quiz_id", "questions", ["quiz_id"]),
+    ("ix_quiz_attempts_quiz_submitted", "quiz_attempts", ["quiz_id", "submitted_at"]),
+    ("ix_user_answers_question_id", "user_answers", ["question_id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for name, table, columns in INDEXES:
+        if name not in {i["name"] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,140 @@
+"""per-user question mastery for review mode
+
+Revision ID: 0006_question_mastery
+Revises: 0005_analytics_indexes
+Create Date: 2026-10-19 00:00:00
+
+Adds question_mastery (last result, streak and next due time per user and
+question), indexed on (user_id, next_due_at), which submissions keep current.
+It is filled by replaying the stored answers; the same rebuild runs
+standalone as `python -m services.mastery`. The replay, the review intervals
+and the part of the compact answer record it reads are copied here so this
+revision does not depend on application code.
+"""
+import heapq
+import struct
+import uuid
+from datetime import timedelta
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_question_mastery"
+down_revision: Union[str, None] = "0005_analytics_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Due again this long after the 1st, 2nd, ... correct answer in a row
+REVIEW_INTERVALS = tuple(timedelta(days=d) for d in (1, 3, 7, 14, 30, 60))
+BATCH_SIZE = 5000
+
+user_answers = sa.table(
+    "user_answers",
+    sa.column("user_id", UUID(as_uuid=True)),
+    sa.column("question_id", UUID(as_uuid=True)),
+    sa.column("is_correct", sa.Boolean()),
+    sa.column("submitted_at", sa.DateTime(timezone=True)),
+)
+quiz_attempts = sa.table(
+    "quiz_attempts",
+    sa.column("user_id", UUID(as_uuid=True)),
+    sa.column("submitted_at", sa.DateTime(timezone=True)),
+    sa.column("answers_blob", sa.LargeBinary()),
+)
+question_mastery = sa.table(
+    "question_mastery",
+    sa.column("user_id", UUID(as_uuid=True)),
+    sa.column("question_id", UUID(as_uuid=True)),
+    sa.column("last_correct", sa.Boolean()),
+    sa.column("streak", sa.Integer()),
+    sa.column("attempts", sa.Integer()),
+    sa.column("last_answered_at", sa.DateTime(timezone=True)),
+    sa.column("next_due_at", sa.DateTime(timezone=True)),
+)
+
+
+def _graded_in_record(blob: bytes):
+    """
+    (question_id, is_correct) for each graded answer of a format-1 compact
+    record: version|flags, count, 16-byte ids, graded bitmap, correct bitmap.
+    The answer texts that follow are not needed here.
+    """
+    version_flags, count = struct.unpack_from(">BH", blob, 0)
+    if version_flags & 0x7F != 1:
+        raise ValueError(f"Unknown answer record version {version_flags & 0x7F}")
+    offset = 3
+    bitmap_len = (count + 7) // 8
+    graded = blob[offset + 16 * count: offset + 16 * count + bitmap_len]
+    correct = blob[offset + 16 * count + bitmap_len: offset + 16 * count + 2 * bitmap_len]
+    for index in range(count):
+        if graded[index // 8] >> (index % 8) & 1:
+            question_id = uuid.UUID(bytes=bytes(blob[offset + 16 * index: offset + 16 * (index + 1)]))
+            yield question_id, bool(correct[index // 8] >> (index % 8) & 1)
+
+
+def _row_answers(connection):
+    answered_at = user_answers.c.submitted_at
+    query = (
+        sa.select(answered_at, user_answers.c.user_id, user_answers.c.question_id, user_answers.c.is_correct)
+        .where(user_answers.c.is_correct.is_not(None), answered_at.is_not(None))
+        .order_by(answered_at)
+    )
+    yield from connection.execution_options(yield_per=BATCH_SIZE).execute(query)
+
+
+def _compact_answers(connection):
+    query = (
+        sa.select(quiz_attempts.c.submitted_at, quiz_attempts.c.user_id, quiz_attempts.c.answers_blob)
+        .where(quiz_attempts.c.answers_blob.is_not(None), quiz_attempts.c.submitted_at.is_not(None))
+        .order_by(quiz_attempts.c.submitted_at)
+    )
+    for submitted_at, owner, blob in connection.execution_options(yield_per=1000).execute(query):
+        for question_id, is_correct in _graded_in_record(blob):
+            yield submitted_at, owner, question_id, is_correct
+
+
+def rebuild_mastery(connection) -> int:
+    """Refills question_mastery by replaying every graded answer oldest first. Returns rows written."""
+    connection.execute(sa.delete(question_mastery))
+
+    state = {}  # (user_id, question_id) -> [last_correct, streak, attempts, last_answered_at]
+    answers = heapq.merge(_row_answers(connection), _compact_answers(connection), key=lambda answer: answer[0])
+    for answered_at, owner, question_id, is_correct in answers:
+        entry = state.setdefault((owner, question_id), [False, 0, 0, None])
+        entry[:] = [is_correct, entry[1] + 1 if is_correct else 0, entry[2] + 1, answered_at]
+
+    rows = []
+    for (owner, question_id), (last_correct, streak, attempts, answered_at) in state.items():
+        due = answered_at + REVIEW_INTERVALS[min(streak, len(REVIEW_INTERVALS)) - 1] if last_correct else answered_at
+        rows.append({"user_id": owner, "question_id": question_id, "last_correct": last_correct, "streak": streak,
+                     "attempts": attempts, "last_answered_at": answered_at, "next_due_at": due})
+    for start in range(0, len(rows), BATCH_SIZE):
+        connection.execute(sa.insert(question_mastery), rows[start:start + BATCH_SIZE])
+    return len(rows)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("question_mastery"):
+        op.create_table(
+            "question_mastery",
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("question_id", UUID(as_uuid=True), sa.ForeignKey("questions.id"), primary_key=True),
+            sa.Column("last_correct", sa.Boolean(), nullable=False),
+            sa.Column("streak", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("last_answered_at", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("next_due_at", sa.DateTime(timezone=True), nullable=False),
+        )
+        op.create_index("ix_question_mastery_user_due", "question_mastery", ["user_id", "next_due_at"])
+    rebuild_mastery(op.get_bind())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_question_mastery_user_due", table_name="question_mastery")
+    op.drop_table("question_mastery")
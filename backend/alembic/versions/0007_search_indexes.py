@@ -0,0 +1,55 @@
+"""full-text search indexes
+
+Revision ID: 0007_search_indexes
+Revises: 0006_question_mastery
+Create Date: 2026-10-19 00:00:00
+
+Indexes uploaded_files.user_id, which every search scopes by. On PostgreSQL
+also adds GIN indexes over to_tsvector('english', ...) of
+uploaded_files.original_name, questions.text + explanation and
+document_regions.text, matching the indexes declared in db.models (the
+expressions are spelled out here rather than imported). Other databases search
+through the in-process index in services.search instead.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_search_indexes"
+down_revision: Union[str, None] = "0006_question_mastery"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# index name -> (table, indexed expression)
+SEARCH_INDEXES = {
+    "ix_uploaded_files_search": ("uploaded_files", "to_tsvector('english', coalesce(original_name, ''))"),
+    "ix_questions_search": (
+        "questions", "to_tsvector('english', (coalesce(text, '') || ' ') || coalesce(explanation, ''))",
+    ),
+    "ix_document_regions_search": ("document_regions", "to_tsvector('english', coalesce(text, ''))"),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "ix_uploaded_files_user_id" not in {i["name"] for i in inspector.get_indexes("uploaded_files")}:
+        op.create_index("ix_uploaded_files_user_id", "uploaded_files", ["user_id"])
+    if bind.dialect.name != "postgresql":
+        return
+    for name, (table, expression) in SEARCH_INDEXES.items():
+        if name not in {i["name"] for i in inspector.get_indexes(table)}:
+            op.create_index(name, table, [sa.text(expression)], postgresql_using="gin")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        for name, (table, _) in SEARCH_INDEXES.items():
+            op.drop_index(name, table_name=table)
+    op.drop_index("ix_uploaded_files_user_id", table_name="uploaded_files")
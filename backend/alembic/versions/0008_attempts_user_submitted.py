@@ -0,0 +1,36 @@
+"""index a user's attempts by submission time
+
+Revision ID: 0008_attempts_user_submitted
+Revises: 0007_search_indexes
+Create Date: 2026-10-19 00:00:00
+
+Replaces ix_quiz_attempts_user_id with ix_quiz_attempts_user_submitted on
+(user_id, submitted_at). The export streams a user's attempts in that order
+and resumes from a (submitted_at, id) cursor without sorting the history.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_attempts_user_submitted"
+down_revision: Union[str, None] = "0007_search_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing = {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("quiz_attempts")}
+    if "ix_quiz_attempts_user_submitted" not in existing:
+        op.create_index("ix_quiz_attempts_user_submitted", "quiz_attempts", ["user_id", "submitted_at"])
+    if "ix_quiz_attempts_user_id" in existing:
+        op.drop_index("ix_quiz_attempts_user_id", table_name="quiz_attempts")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_quiz_attempts_user_id", "quiz_attempts", ["user_id"])
+    op.drop_index("ix_quiz_attempts_user_submitted", table_name="quiz_attempts")
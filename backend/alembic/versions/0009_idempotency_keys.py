@@ -0,0 +1,41 @@
+"""idempotency keys shared by all workers
+
+Revision ID: 0009_idempotency_keys
+Revises: 0008_attempts_user_submitted
+Create Date: 2026-10-19 00:00:00
+
+Adds idempotency_keys, one row per (user, Idempotency-Key). A request
+inserts its row before it runs, so a retry that lands on another worker
+sees it, and stores its response there for replay.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_idempotency_keys"
+down_revision: Union[str, None] = "0008_attempts_user_submitted"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("idempotency_keys"):
+        op.create_table(
+            "idempotency_keys",
+            sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("key", sa.String(255), primary_key=True),
+            sa.Column("scope", sa.String(), nullable=False),
+            sa.Column("payload_hash", sa.String(64), nullable=False),
+            sa.Column("response", sa.JSON(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("idempotency_keys")
@@ -1,5 +1,4 @@
 from fastapi import APIRouter, Depends, HTTPException, Depends, Request
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
 from jose import jwt, JWTError
 from starlette.responses import JSONResponse
 from .schemas import ForgotPasswordRequest, ResetPasswordRequest
@@ -12,6 +11,7 @@ from db.models import User
 from auth.schemas import UserOut, UserCreate
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from functools import lru_cache
 
 router = APIRouter()
 load_dotenv()
@@ -21,17 +21,22 @@ SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
 RESET_TOKEN_EXPIRE_SECONDS = 3600
 
-conf = ConnectionConfig(
-    MAIL_USERNAME=os.getenv("EMAIL_USERNAME"),
-    MAIL_PASSWORD=os.getenv("EMAIL_PASSWORD"),
-    MAIL_FROM=os.getenv("EMAIL_USERNAME"),
-    MAIL_PORT=587,
-    MAIL_SERVER="smtp.gmail.com",
-    MAIL_STARTTLS=True,
-    MAIL_SSL_TLS=False,
-    USE_CREDENTIALS=True,
-    VALIDATE_CERTS=True
-)
+# fastapi_mail (and its aiosmtplib / jinja2 stack) is only needed for password resets
+@lru_cache(maxsize=1)
+def get_mail_config():
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME=os.getenv("EMAIL_USERNAME"),
+        MAIL_PASSWORD=os.getenv("EMAIL_PASSWORD"),
+        MAIL_FROM=os.getenv("EMAIL_USERNAME"),
+        MAIL_PORT=587,
+        MAIL_SERVER="smtp.gmail.com",
+        MAIL_STARTTLS=True,
+        MAIL_SSL_TLS=False,
+        USE_CREDENTIALS=True,
+        VALIDATE_CERTS=True
+    )
 
 
 @auth_router.post("/signup", response_model=UserOut)
@@ -87,6 +92,8 @@ async def forgot_password(request: ForgotPasswordRequest, db=Depends(get_db)):
     token = jwt.encode({"sub": user.email, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
 
     reset_url = f"http://localhost:3000/reset-password?token={token}"
+    from fastapi_mail import FastMail, MessageSchema
+
     message = MessageSchema(
         subject="Reset Your NexEra Password",
         recipients=[user.email],
@@ -94,7 +101,7 @@ async def forgot_password(request: ForgotPasswordRequest, db=Depends(get_db)):
         subtype="plain"
     )
 
-    fm = FastMail(conf)
+    fm = FastMail(get_mail_config())
     await fm.send_message(message)
     return {"message": "Password reset link sent."}
 
@@ -9,6 +9,7 @@ from db.session import get_db
 from dotenv import load_dotenv
 import os
 import uuid
+import logging
 import smtplib
 from email.message import EmailMessage
 from email.mime.multipart import MIMEMultipart
@@ -16,6 +17,8 @@ from email.mime.text import MIMEText
 
 load_dotenv()
 
+logger = logging.getLogger("nexera.auth")
+
 # ===================================
 # Security Utilities (Hash & Token)
 # ===================================
@@ -64,7 +67,7 @@ def get_current_user(
     except (JWTError, ValueError):
         raise unauthorized_exc
 
-    user = db.query(User).filter(User.id == str(uuid_user_id)).first()
+    user = db.query(User).filter(User.id == uuid_user_id).first()
     if not user:
         raise unauthorized_exc
 
@@ -102,5 +105,5 @@ def send_verification_email(to_email, full_name):
 
         return True
     except Exception as e:
-        print("📧 Email send error:", e)
+        logger.warning("email send failed: %s", e, extra={"event": "email.send_failed"})
         return False
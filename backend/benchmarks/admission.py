@@ -0,0 +1,103 @@
+"""
+A class-sized burst of uploads, with and without admission control.
+
+    cd backend
+    python -m benchmarks.admission
+    python -m benchmarks.admission --uploads 300 --gradings 30 --llm-seconds 2
+
+Runs in-process against a small app shaped like the real routes: uploads and
+grading wait on a blocking "LLM" call in the threadpool (as the real routes
+do), /user/me is a sync route that needs a threadpool thread too. Fires
+--uploads uploads and --gradings submissions at once while a client polls
+/user/me, once without and once with services.admission. Prints the status
+codes per class, grading latency, and /user/me latency during the burst.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+
+import httpx
+from fastapi import Depends, FastAPI
+from fastapi.concurrency import run_in_threadpool
+
+from auth.utils import get_current_user
+from benchmarks.harness import percentile
+from services.admission import AdmissionRejected, admission_slot, default_controller, handle_admission_rejected
+
+
+def make_app(admission: bool, llm_seconds: float) -> FastAPI:
+    app = FastAPI()
+    app.add_exception_handler(AdmissionRejected, handle_admission_rejected)
+    app.dependency_overrides[get_current_user] = lambda: None
+    controller = default_controller()
+
+    def slot(name):
+        return [Depends(admission_slot(name, controller, enabled=admission))]
+
+    @app.post("/upload-db/", dependencies=slot("generation"))
+    async def upload():
+        await run_in_threadpool(time.sleep, llm_seconds)
+        return {"quiz_id": 1}
+
+    @app.post("/api/answers/", dependencies=slot("grading"))
+    async def grade():
+        await run_in_threadpool(time.sleep, llm_seconds / 2)
+        return {"score": 1}
+
+    @app.get("/user/me")
+    def me():
+        return {"id": 1}
+
+    return app
+
+
+async def burst(app: FastAPI, uploads: int, gradings: int) -> dict:
+    timings = {"me": [], "grading": []}
+    statuses = {"upload": Counter(), "grading": Counter()}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def call(kind, path):
+            started = time.perf_counter()
+            response = await client.post(path)
+            statuses[kind][response.status_code] += 1
+            if kind == "grading" and response.status_code == 200:
+                timings["grading"].append((time.perf_counter() - started) * 1000.0)
+
+        tasks = [asyncio.create_task(call("upload", "/upload-db/")) for _ in range(uploads)]
+        await asyncio.sleep(0.05)
+        tasks += [asyncio.create_task(call("grading", "/api/answers/")) for _ in range(gradings)]
+        while not all(task.done() for task in tasks):
+            started = time.perf_counter()
+            await client.get("/user/me")
+            timings["me"].append((time.perf_counter() - started) * 1000.0)
+            await asyncio.sleep(0.05)
+        await asyncio.gather(*tasks)
+    return {"timings": timings, "statuses": statuses}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=300)
+    parser.add_argument("--gradings", type=int, default=30)
+    parser.add_argument("--llm-seconds", type=float, default=1.0, help="blocking time of one upload; grading takes half")
+    args = parser.parse_args(argv)
+
+    print(f"{'admission':<10} {'uploads':<22} {'grading':<14} {'grade p50':>10} {'me p50':>8} {'me p95':>8} "
+          f"{'me max':>8} {'seconds':>8}")
+    for admission in (False, True):
+        started = time.perf_counter()
+        result = asyncio.run(burst(make_app(admission, args.llm_seconds), args.uploads, args.gradings))
+        seconds = time.perf_counter() - started
+        me, grading = sorted(result["timings"]["me"]), sorted(result["timings"]["grading"])
+        codes = {kind: " ".join(f"{code}x{count}" for code, count in sorted(counter.items()))
+                 for kind, counter in result["statuses"].items()}
+        print(f"{'on' if admission else 'off':<10} {codes['upload']:<22} {codes['grading']:<14} "
+              f"{percentile(grading, 50):>10.0f} {percentile(me, 50):>8.1f} "
+              f"{percentile(me, 95):>8.1f} {me[-1]:>8.1f} {seconds:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
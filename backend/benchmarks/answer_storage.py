@@ -0,0 +1,163 @@
+"""
+Storage size and read speed of the two answer layouts (ANSWER_STORAGE_MODE).
+
+    cd backend
+    python -m benchmarks.answer_storage                      # 10M answers, takes a while
+    python -m benchmarks.answer_storage --answers 200000 --dir /tmp/answers
+
+Builds two SQLite databases with the same users, quizzes, questions and
+attempts; one stores answers as user_answers rows, the other as
+quiz_attempts.answers_blob records. Answers follow seed.py: half multiple
+choice, half free text, about a third wrong. Prints per layout:
+  size        - database file size (indexes included), and bytes per answer
+  history     - GET /attempts for one user (retrieve_all_attempts), best of --repeat
+  full scan   - reading every stored answer and its correctness
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import _question_rows
+from db.models import Base, Question, Quiz, QuizAttempt, User, UserAnswer
+from routes.responses_handler import retrieve_all_attempts
+from services.answer_storage import decode_answers, encode_answers
+
+CHUNK_SIZE = 20000
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _uuid() -> uuid.UUID:
+    # SQLite gives the UUID columns NUMERIC affinity: a hex id made of digits
+    # and a single "e" is stored as a float (usually inf) and, at millions of
+    # rows, collides with another one. Such ids are skipped.
+    while True:
+        value = uuid.uuid4()
+        if not value.hex.replace("e", "", 1).isdigit():
+            return value
+
+
+def _flush(session, model, rows):
+    if rows:
+        session.execute(insert(model), rows)
+        session.commit()
+        rows.clear()
+
+
+def build(path: str, layout: str, answers: int, users: int, quizzes: int, questions: int) -> int:
+    """Seeds one database; returns the probe user's id (user 0)."""
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    rng_state = 0
+    with Session(bind=engine) as session:
+        user_ids = [uuid.uuid4() for _ in range(users)]
+        session.execute(insert(User), [
+            {"id": u, "email": f"bench{n}@example.com", "full_name": f"Bench {n}", "hashed_password": "x"}
+            for n, u in enumerate(user_ids)
+        ])
+        quiz_questions = []
+        for _ in range(quizzes):
+            quiz_id = uuid.uuid4()
+            session.execute(insert(Quiz), [{"id": quiz_id, "created_at": BASE_TIME}])
+            rows = _question_rows(quiz_id, questions)
+            session.execute(insert(Question), rows)
+            quiz_questions.append((quiz_id, rows))
+
+        attempts, stored = [], []
+        for a in range(answers // questions):
+            user_id = user_ids[a % users]
+            quiz_id, rows = quiz_questions[a % quizzes]
+            attempt_id = _uuid()
+            submitted_at = BASE_TIME + timedelta(minutes=a)
+            triples = []
+            for q in rows:
+                rng_state = (rng_state * 1103515245 + 12345) % 2**31
+                is_correct = rng_state % 3 != 0
+                triples.append((q["id"], q["correct_answer"] if is_correct else "Something else", is_correct))
+            attempt = {"id": attempt_id, "user_id": user_id, "quiz_id": quiz_id,
+                       "score": sum(t[2] for t in triples), "submitted_at": submitted_at, "answers_blob": None}
+            if layout == "compact":
+                attempt["answers_blob"] = encode_answers(triples)
+            else:
+                stored.extend(
+                    {"id": _uuid(), "user_id": user_id, "question_id": qid, "attempt_id": attempt_id,
+                     "answer": answer, "is_correct": is_correct, "submitted_at": submitted_at}
+                    for qid, answer, is_correct in triples
+                )
+            attempts.append(attempt)
+            if len(attempts) * questions >= CHUNK_SIZE:
+                _flush(session, QuizAttempt, attempts)
+                _flush(session, UserAnswer, stored)
+        _flush(session, QuizAttempt, attempts)
+        _flush(session, UserAnswer, stored)
+        session.commit()
+    engine.dispose()
+    return user_ids[0]
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000.0
+
+
+def full_scan(session, layout: str) -> int:
+    count = 0
+    if layout == "compact":
+        for (blob,) in session.execute(select(QuizAttempt.answers_blob)).yield_per(CHUNK_SIZE):
+            count += sum(1 for a in decode_answers(blob) if a.is_correct is not None)
+    else:
+        rows = session.execute(select(UserAnswer.answer, UserAnswer.is_correct))
+        count = sum(1 for row in rows.yield_per(CHUNK_SIZE) if row.is_correct is not None)
+    return count
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--quizzes", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=10, help="questions per quiz (answers per attempt)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dir", default=None, help="where the two databases are written (default: a temp dir)")
+    args = parser.parse_args(argv)
+
+    directory = args.dir or tempfile.mkdtemp(prefix="answer-storage-")
+    os.makedirs(directory, exist_ok=True)
+    total = args.answers // args.questions * args.questions
+    print(f"{total:,} answers, {total // args.questions:,} attempts, {args.users} users, in {directory}\n")
+    print(f"{'layout':<8} {'build s':>8} {'size MB':>9} {'B/answer':>9} {'history ms':>11} {'scan s':>7} {'answers/s':>11}")
+
+    for layout in ("rows", "compact"):
+        path = os.path.join(directory, f"{layout}.db")
+        if os.path.exists(path):
+            os.remove(path)
+        started = time.perf_counter()
+        probe_user = build(path, layout, args.answers, args.users, args.quizzes, args.questions)
+        build_s = time.perf_counter() - started
+        size = os.path.getsize(path)
+
+        engine = create_engine(f"sqlite:///{path}")
+        with Session(bind=engine) as session:
+            user = type("User", (), {"id": probe_user})()
+            history_ms = best_of(args.repeat, lambda: retrieve_all_attempts(session, user))
+            started = time.perf_counter()
+            scanned = full_scan(session, layout)
+            scan_s = time.perf_counter() - started
+        engine.dispose()
+        print(f"{layout:<8} {build_s:>8.1f} {size / 2**20:>9.1f} {size / total:>9.1f} "
+              f"{history_ms:>11.2f} {scan_s:>7.2f} {scanned / scan_s:>11,.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
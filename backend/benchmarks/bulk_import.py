@@ -0,0 +1,107 @@
+"""
+Bulk import throughput: questions per minute from an NDJSON question bank.
+
+    cd backend
+    python -m benchmarks.bulk_import
+    python -m benchmarks.bulk_import --questions 1000000 --database-url postgresql://localhost/import_bench
+
+Writes an NDJSON bank of --questions questions (10 per quiz, half MCQ, half
+text) to a temporary file and imports it with services.bulk_import into an
+empty database (default: a temporary SQLite file), timing parse, validation
+and writes together. For comparison it also stores --orm-questions the way
+the upload route does (one ORM object per question, one commit per quiz).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import orjson
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session
+
+from db.models import Base, Question, Quiz, UploadedFile, User
+from services.bulk_import import IMPORT_BATCH, import_quizzes, read_quizzes
+
+PER_QUIZ = 10
+
+
+def quiz(number: int) -> dict:
+    questions = []
+    for n in range(PER_QUIZ):
+        if n % 2:
+            questions.append({"question": f"Explain concept {number}.{n} in your own words.",
+                              "answer": f"Concept {number}.{n} describes how the parts interact.",
+                              "explanation": "An open answer is graded on the key idea.", "question_type": "text"})
+        else:
+            options = [f"Option {o} for {number}.{n}" for o in "ABCD"]
+            questions.append({"question": f"Which statement about concept {number}.{n} is true?",
+                              "options": options, "answer": options[n % 4],
+                              "explanation": "The other options contradict the text.", "question_type": "mcq"})
+    return {"name": f"Bank chapter {number}.pdf", "questions": questions}
+
+
+def write_bank(path: str, questions: int):
+    with open(path, "wb") as f:
+        for number in range(questions // PER_QUIZ):
+            f.write(orjson.dumps(quiz(number), option=orjson.OPT_APPEND_NEWLINE))
+
+
+def orm_store(db: Session, user_id, questions: int):
+    """The upload route's way: ORM objects, a commit for the file, the quiz and the questions."""
+    for number in range(questions // PER_QUIZ):
+        upload = UploadedFile(user_id=user_id, filename=f"orm-{number}", original_name="ORM", file_type="import")
+        db.add(upload)
+        db.commit()
+        section = Quiz(file_id=upload.id)
+        db.add(section)
+        db.commit()
+        for item in quiz(number)["questions"]:
+            db.add(Question(quiz_id=section.id, text=item["question"], options=item.get("options"),
+                            correct_answer=item["answer"], explanation=item["explanation"],
+                            question_type=item["question_type"]))
+        db.commit()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--orm-questions", type=int, default=10_000, help="0 skips the comparison")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH)
+    parser.add_argument("--database-url", default=None, help="empty database to import into (default: temporary SQLite)")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="import-")
+    bank = os.path.join(workdir, "bank.ndjson")
+    write_bank(bank, args.questions)
+    engine = create_engine(args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    Base.metadata.create_all(bind=engine)
+    print(f"Bank: {args.questions:,} questions, {os.path.getsize(bank) / 2**20:.1f} MB; {engine.dialect.name}\n")
+
+    with Session(bind=engine) as db:
+        user = User(email="import-bench@example.com", full_name="Import", hashed_password="x")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+        started = time.perf_counter()
+        with open(bank, "rb") as stream:
+            result = import_quizzes(db, user_id, read_quizzes(stream, "ndjson"), batch_size=args.batch_size)
+        db.commit()
+        seconds = time.perf_counter() - started
+        stored = db.query(func.count(Question.id)).scalar()
+        print(f"{'bulk import':<12} {result['questions']:>10,} questions {seconds:>7.2f} s "
+              f"{result['questions'] / seconds * 60:>12,.0f} / min  ({stored:,} stored)")
+
+        if args.orm_questions:
+            started = time.perf_counter()
+            orm_store(db, user_id, args.orm_questions)
+            seconds = time.perf_counter() - started
+            print(f"{'ORM per row':<12} {args.orm_questions:>10,} questions {seconds:>7.2f} s "
+                  f"{args.orm_questions / seconds * 60:>12,.0f} / min")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
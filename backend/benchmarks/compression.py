@@ -0,0 +1,80 @@
+"""
+CPU cost vs bytes saved of response compression, per payload and level.
+
+    cd backend
+    python -m benchmarks.compression
+    python -m benchmarks.compression --sections 50 --rows 1000 --link-kbps 1000
+
+Payloads are the sections, quiz and attempts responses rendered exactly as the
+API sends them (response model + orjson; see benchmarks.serialization). For
+gzip levels 1/6/9 and, when the `brotli` package is installed, brotli 1/4/9/11
+it prints the compression time (best of --repeat), compressed size, ratio and
+the estimated time to deliver the body over a --link-kbps link, compression
+included, next to the uncompressed transfer time.
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import serialize_response
+
+from benchmarks.serialization import build_payloads, response_fields
+from middleware.compression import _brotli, compress
+
+LEVELS = [("gzip", 1), ("gzip", 6), ("gzip", 9), ("br", 1), ("br", 4), ("br", 9), ("br", 11)]
+ROUTES = {
+    "sections": "/dashboard/files/{file_id}/sections",
+    "quiz": "/{quiz_id}",
+    "attempts": "/attempts",
+}
+
+
+def rendered_bodies(sections: int, questions: int, rows: int) -> dict:
+    payloads = build_payloads(sections, questions, rows)
+    fields = response_fields()
+    bodies = {}
+    for name, path in ROUTES.items():
+        content = asyncio.run(serialize_response(field=fields[path], response_content=payloads[path]))
+        bodies[name] = ORJSONResponse(content).body
+    return bodies
+
+
+def time_compression(body: bytes, encoding: str, level: int, repeat: int):
+    best, compressed = float("inf"), b""
+    for _ in range(repeat):
+        started = time.perf_counter()
+        compressed = compress(body, encoding, gzip_level=level, brotli_level=level)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000.0, len(compressed)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=50)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=200, help="answers per attempts payload / 5")
+    parser.add_argument("--link-kbps", type=float, default=1000.0, help="client link speed for the estimate")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    levels = [(e, l) for e, l in LEVELS if e == "gzip" or _brotli() is not None]
+    if len(levels) < len(LEVELS):
+        print("brotli not installed: gzip only\n")
+    bytes_per_ms = args.link_kbps * 1000 / 8 / 1000
+
+    for name, body in rendered_bodies(args.sections, args.questions, args.rows).items():
+        print(f"{name}: {len(body) / 1024:.1f} KB uncompressed, "
+              f"{len(body) / bytes_per_ms:.0f} ms at {args.link_kbps:.0f} kbps")
+        print(f"  {'encoding':<9} {'cpu ms':>8} {'KB':>8} {'ratio':>7} {'deliver ms':>11}")
+        for encoding, level in levels:
+            cpu_ms, size = time_compression(body, encoding, level, args.repeat)
+            print(f"  {encoding + ' ' + str(level):<9} {cpu_ms:>8.2f} {size / 1024:>8.1f} "
+                  f"{len(body) / size:>6.1f}x {cpu_ms + size / bytes_per_ms:>11.0f}")
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
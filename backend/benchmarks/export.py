@@ -0,0 +1,134 @@
+"""
+Memory and throughput of the attempt-history export.
+
+    cd backend
+    python -m benchmarks.export
+    python -m benchmarks.export --answers 2000000 --compact-share 0.5 --database-url postgresql://localhost/export_bench
+
+Seeds two users into an empty database (default: a temporary SQLite file):
+one with --answers answers and one with a tenth as many, in 10-question
+attempts, --compact-share of them stored as compact records. For each user
+and format it streams services.export.export_attempts to nowhere and prints
+the time, size, answers/s and peak Python memory (tracemalloc). The peak
+should be the same for both users. For comparison it also loads the large
+history with retrieve_all_attempts (GET /api/answers/attempts), which holds
+every answer at once.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import _question_rows
+from db.models import Base, Question, Quiz, QuizAttempt, UploadedFile, User, UserAnswer
+from routes.responses_handler import retrieve_all_attempts
+from services.answer_storage import encode_answers
+from services.export import export_attempts
+
+CHUNK_SIZE = 20000
+QUESTIONS = 10
+BASE_TIME = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _uuid() -> uuid.UUID:
+    # See benchmarks.answer_storage: avoids NUMERIC-affinity collisions on SQLite
+    while True:
+        value = uuid.uuid4()
+        if not value.hex.replace("e", "", 1).isdigit():
+            return value
+
+
+def seed_user(session, answers: int, compact_share: float) -> uuid.UUID:
+    user_id = _uuid()
+    session.execute(insert(User), [{"id": user_id, "email": f"{user_id.hex[:12]}@example.com",
+                                    "full_name": "Export", "hashed_password": "x"}])
+    quizzes = []
+    for f in range(20):
+        file_id, quiz_id = _uuid(), _uuid()
+        session.execute(insert(UploadedFile), [{"id": file_id, "user_id": user_id, "filename": f"{file_id.hex}.pdf",
+                                                "original_name": f"Lecture {f}.pdf", "file_type": "pdf"}])
+        session.execute(insert(Quiz), [{"id": quiz_id, "file_id": file_id}])
+        rows = [{**row, "id": _uuid()} for row in _question_rows(quiz_id, QUESTIONS)]
+        session.execute(insert(Question), rows)
+        quizzes.append((quiz_id, rows))
+
+    attempts, stored = [], []
+    compact_every = round(1 / compact_share) if compact_share else 0
+    for a in range(answers // QUESTIONS):
+        quiz_id, rows = quizzes[a % len(quizzes)]
+        attempt_id, submitted_at = _uuid(), BASE_TIME + timedelta(minutes=a)
+        triples = [(q["id"], q["correct_answer"] if (a + n) % 3 else "Something else", bool((a + n) % 3))
+                   for n, q in enumerate(rows)]
+        attempt = {"id": attempt_id, "user_id": user_id, "quiz_id": quiz_id, "submitted_at": submitted_at,
+                   "score": sum(t[2] for t in triples), "answers_blob": None}
+        if compact_every and a % compact_every == 0:
+            attempt["answers_blob"] = encode_answers(triples)
+        else:
+            stored.extend({"id": _uuid(), "user_id": user_id, "question_id": qid, "attempt_id": attempt_id,
+                           "answer": answer, "is_correct": is_correct} for qid, answer, is_correct in triples)
+        attempts.append(attempt)
+        if len(attempts) * QUESTIONS >= CHUNK_SIZE:
+            session.execute(insert(QuizAttempt), attempts)
+            if stored:
+                session.execute(insert(UserAnswer), stored)
+            session.commit()
+            attempts, stored = [], []
+    if attempts:
+        session.execute(insert(QuizAttempt), attempts)
+    if stored:
+        session.execute(insert(UserAnswer), stored)
+    session.commit()
+    return user_id
+
+
+def measure(fn):
+    """(seconds, result, peak MB) with tracemalloc on; the untraced time is taken separately."""
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, result, peak / 2**20
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=1_000_000, help="answers of the large history")
+    parser.add_argument("--compact-share", type=float, default=0.2, help="share of attempts stored compactly")
+    parser.add_argument("--database-url", default=None, help="empty database to seed (default: temporary SQLite)")
+    args = parser.parse_args(argv)
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='export-'), 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    with Session(bind=engine) as session:
+        users = [(args.answers // 10, seed_user(session, args.answers // 10, args.compact_share)),
+                 (args.answers, seed_user(session, args.answers, args.compact_share))]
+    print(f"Seeded {args.answers + args.answers // 10:,} answers in {time.perf_counter() - started:.1f} s\n")
+
+    print(f"{'answers':>10} {'format':<8} {'seconds':>8} {'MB out':>8} {'answers/s':>11} {'peak MB':>8}")
+    for answers, user_id in users:
+        for fmt in ("csv", "ndjson"):
+            seconds, size, peak = measure(lambda: sum(len(chunk) for chunk in export_attempts(engine, user_id, fmt)))
+            print(f"{answers:>10,} {fmt:<8} {seconds:>8.2f} {size / 2**20:>8.1f} {answers / seconds:>11,.0f} {peak:>8.1f}")
+
+    answers, user_id = users[-1]
+    with Session(bind=engine) as db:
+        user = type("User", (), {"id": user_id})()
+        seconds, _, peak = measure(lambda: retrieve_all_attempts(db, user))
+    print(f"{answers:>10,} {'/attempts':<8} {seconds:>8.2f} {'-':>8} {answers / seconds:>11,.0f} {peak:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+Peak RSS of text extraction on a large PDF.
+
+    cd backend
+    python -m benchmarks.extraction_memory                 # 500 pages, 150 MB target
+    python -m benchmarks.extraction_memory --pages 1000 --max-rss-mb 200
+    python -m benchmarks.extraction_memory --pdf path/to/real.pdf
+
+Each strategy runs in a fresh interpreter so ru_maxrss is its own peak:
+  eager      - the old approach: every page's text in a list, then joined
+  streaming  - services.text_extraction with the default caps
+  range      - streaming, pages 100-150 only
+
+Exits non-zero when the streaming extractor's peak RSS exceeds --max-rss-mb.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CHILD = r"""
+import json, resource, sys, time
+sys.path.insert(0, {backend!r})
+import pymupdf
+from services.text_extraction import extract_text
+
+path, strategy = {path!r}, {strategy!r}
+baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+started = time.perf_counter()
+if strategy == "eager":
+    doc = pymupdf.open(path)
+    text = "\n".join([page.get_text() for page in doc])
+    pages = doc.page_count
+elif strategy == "range":
+    result = extract_text(path, "pdf", first_page=100, last_page=150)
+    text, pages = result.text, result.units_read
+else:
+    result = extract_text(path, "pdf")
+    text, pages = result.text, result.units_read
+print(json.dumps({{
+    "pages": pages,
+    "chars": len(text),
+    "seconds": time.perf_counter() - started,
+    "baseline_mb": baseline_kb / 1024,
+    "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+
+def build_pdf(path: str, pages: int):
+    import pymupdf
+
+    paragraph = ("Photosynthesis converts light energy into chemical energy stored in glucose. " * 6).strip()
+    doc = pymupdf.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(pymupdf.Rect(50, 50, 550, 800), f"Chapter {number + 1}\n\n" + "\n\n".join([paragraph] * 8),
+                            fontsize=9)
+    doc.save(path)
+    doc.close()
+
+
+def measure(path: str, strategy: str) -> dict:
+    code = CHILD.format(backend=BACKEND_DIR, path=path, strategy=strategy)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", help="PDF to measure (default: generate one)")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--max-rss-mb", type=float, default=150.0, help="peak RSS target for streaming")
+    args = parser.parse_args(argv)
+
+    path = args.pdf
+    if not path:
+        path = os.path.join(tempfile.mkdtemp(prefix="quiz-extract-"), f"{args.pages}-pages.pdf")
+        build_pdf(path, args.pages)
+    print(f"{path}: {os.path.getsize(path) / 1e6:.1f} MB\n")
+
+    print(f"{'strategy':<10} {'pages':>6} {'chars':>10} {'seconds':>8} {'peak MB':>8} {'over import':>12}")
+    results = {}
+    for strategy in ("eager", "streaming", "range"):
+        r = results[strategy] = measure(path, strategy)
+        print(f"{strategy:<10} {r['pages']:>6} {r['chars']:>10} {r['seconds']:>8.2f} "
+              f"{r['peak_mb']:>8.1f} {r['peak_mb'] - r['baseline_mb']:>12.1f}")
+
+    peak = results["streaming"]["peak_mb"]
+    if peak > args.max_rss_mb:
+        print(f"\nFAIL: streaming peak RSS {peak:.1f} MB exceeds {args.max_rss_mb:.0f} MB")
+        return 1
+    print(f"\nOK: streaming peak RSS {peak:.1f} MB within {args.max_rss_mb:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
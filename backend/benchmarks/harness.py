@@ -0,0 +1,188 @@
+"""
+Runs routes through the FastAPI app against a seeded database, counting SQL
+statements per request and recording latency percentiles.
+"""
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BUDGETS_PATH = os.path.join(BENCH_DIR, "budgets.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+
+class QueryCounter:
+    """Counts statements sent to the database through `engine`."""
+
+    def __init__(self, engine):
+        self.count = 0
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        self.statements.append(statement)
+
+    @contextmanager
+    def measure(self):
+        self.count = 0
+        self.statements = []
+        yield self
+
+
+def load_budgets(path: str = BUDGETS_PATH) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["routes"]
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def submission_payload(probe: dict) -> dict:
+    return {
+        "quiz_id": str(probe["quiz_id"]),
+        # Unique answers so single-flight never merges iterations
+        "answers": {str(q["id"]): f"{q['correct_answer']} {uuid.uuid4().hex[:6]}" for q in probe["quiz_questions"]},
+    }
+
+
+class BenchmarkApp:
+    """
+    The real FastAPI app wired to a benchmark engine: `get_db` is overridden,
+    the LLM is replaced by the offline fake provider and requests authenticate
+    with a genuine JWT for the seeded probe user.
+    """
+
+    def __init__(self, database_url: str, workdir: str):
+        os.environ.setdefault("DATABASE_URL", database_url)
+        os.environ.setdefault("EMAIL_USERNAME", "bench@example.com")
+        os.environ.setdefault("EMAIL_PASSWORD", "unused")
+
+        from fastapi.testclient import TestClient
+        from main import app
+        from db.session import get_db
+        from services.llm_providers import FakeLLMProvider, set_llm_provider
+        from services.llm_resilience import gemini_caller, TokenBucket
+        from services.request_coalescing import set_session_factory
+        from services.storage import LocalStorage, set_storage
+
+        self.engine = create_engine(database_url)
+        self.counter = QueryCounter(self.engine)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.workdir = workdir
+        os.makedirs(os.path.join(workdir, "uploads"), exist_ok=True)
+        set_storage(LocalStorage(os.path.join(workdir, "uploads", "blobs")))
+
+        def bench_db():
+            db = self.session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = bench_db
+        set_session_factory(self.session_factory)
+        set_llm_provider(FakeLLMProvider(seed=1))
+        gemini_caller.limiter = TokenBucket(rate_per_second=1e6, capacity=1e6)
+        self.app = app
+        self.client = TestClient(app)
+        self.headers = {}
+        self.probe = None
+
+    def seed(self, scale: str) -> dict:
+        from benchmarks.seed import seed_database
+        from auth.utils import create_access_token
+
+        self.probe = seed_database(self.engine, scale)
+        token = create_access_token({"sub": str(self.probe["user_id"])})
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+        # Routes that re-read the uploaded document need it on disk
+        with open(os.path.join(self.workdir, "uploads", self.probe["file_name"]), "w", encoding="utf-8") as f:
+            f.write("Cells are the basic unit of life. " * 50)
+        return self.probe
+
+    def close(self):
+        from db.session import get_db
+        from services.llm_providers import set_llm_provider
+        from services.request_coalescing import set_session_factory
+        from services.storage import set_storage
+
+        self.app.dependency_overrides.pop(get_db, None)
+        set_session_factory(None)
+        set_llm_provider(None)
+        set_storage(None)
+        self.client.close()
+        self.engine.dispose()
+
+    def _request_kwargs(self, spec: dict) -> dict:
+        body = spec.get("body")
+        if body == "submission":
+            return {"json": submission_payload(self.probe)}
+        if body == "upload":
+            return {"files": {"file": ("notes.txt", b"Mitochondria produce energy for the cell. " * 40, "text/plain")}}
+        return {}
+
+    def run_route(self, spec: dict, iterations: int) -> dict:
+        path = spec["path"].format(file_id=self.probe["file_id"], quiz_id=self.probe["quiz_id"])
+        latencies, query_counts = [], []
+        previous_cwd = os.getcwd()
+        os.chdir(self.workdir)
+        try:
+            for _ in range(iterations):
+                kwargs = self._request_kwargs(spec)
+                with self.counter.measure() as measured:
+                    started = time.perf_counter()
+                    response = self.client.request(spec["method"], path, headers=self.headers, **kwargs)
+                    elapsed = (time.perf_counter() - started) * 1000.0
+                if response.status_code >= 400:
+                    raise AssertionError(f"{spec['name']}: {response.status_code} {response.text[:300]}")
+                latencies.append(elapsed)
+                query_counts.append(measured.count)
+        finally:
+            os.chdir(previous_cwd)
+
+        return {
+            "name": spec["name"],
+            "queries": max(query_counts),
+            "max_queries": spec["max_queries"],
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+        }
+
+    def applicable_routes(self, budgets: list) -> list:
+        dialect = self.engine.dialect.name
+        return [spec for spec in budgets if dialect in spec.get("dialects", [dialect])]
+
+
+def check_results(results: list, baseline: dict | None = None, tolerance: float = 0.5, slack_ms: float = 5.0) -> list:
+    """
+    Returns failure messages: query budgets exceeded, or p95 latency worse than
+    baseline * (1 + tolerance) + slack_ms.
+    """
+    failures = []
+    for result in results:
+        if result["queries"] > result["max_queries"]:
+            failures.append(
+                f"{result['name']}: {result['queries']} queries exceeds budget of {result['max_queries']}"
+            )
+        reference = (baseline or {}).get(result["name"])
+        if reference:
+            allowed = reference["p95_ms"] * (1 + tolerance) + slack_ms
+            if result["p95_ms"] > allowed:
+                failures.append(
+                    f"{result['name']}: p95 {result['p95_ms']:.1f} ms regressed past {allowed:.1f} ms "
+                    f"(baseline {reference['p95_ms']:.1f} ms)"
+                )
+    return failures
@@ -0,0 +1,85 @@
+"""
+Agreement of the local pre-grader with LLM verdicts on a labeled set.
+
+    cd backend
+    python -m benchmarks.pregrader_agreement
+    python -m benchmarks.pregrader_agreement --accept 0.8
+    python -m benchmarks.pregrader_agreement --accept 0.8 --reject 0.05
+    python -m benchmarks.pregrader_agreement --labels my_labels.json --min-agreement 0.98
+
+The labels file is a JSON list of {"question", "reference", "answer",
+"llm_is_correct"}; the default is benchmarks/pregrader_labels.json. Answers are
+scored in submission-sized batches (--batch-size). For each accept threshold the
+report shows how many answers were decided locally (coverage) and how often
+those local verdicts matched the LLM (agreement); the rest would go to the LLM.
+
+--reject (default PREGRADE_REJECT) applies to every row.
+
+Exits non-zero when agreement at --accept/--reject is below --min-agreement.
+"""
+import argparse
+import json
+import os
+import sys
+
+from services import pregrader
+
+DEFAULT_LABELS = os.path.join(os.path.dirname(__file__), "pregrader_labels.json")
+GRID = [0.95, 0.9, 0.85, 0.8, 0.7]
+
+
+def load_labels(path: str = DEFAULT_LABELS) -> list:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def evaluate(labels: list, accept: float, batch_size: int = 5, reject: float = 0.0) -> dict:
+    decided = agreed = 0
+    for start in range(0, len(labels), batch_size):
+        batch = labels[start:start + batch_size]
+        decisions = pregrader.pregrade(
+            [row["answer"] for row in batch], [row["reference"] for row in batch],
+            accept=accept, reject=reject,
+        )
+        for row, decision in zip(batch, decisions):
+            if decision.is_correct is not None:
+                decided += 1
+                agreed += decision.is_correct == row["llm_is_correct"]
+    return {
+        "accept": accept,
+        "reject": reject,
+        "total": len(labels),
+        "decided": decided,
+        "coverage": decided / len(labels) if labels else 0.0,
+        "agreement": agreed / decided if decided else 1.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", default=DEFAULT_LABELS)
+    parser.add_argument("--accept", type=float, default=pregrader.PREGRADE_ACCEPT)
+    parser.add_argument("--reject", type=float, default=pregrader.PREGRADE_REJECT)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args(argv)
+
+    labels = load_labels(args.labels)
+    thresholds = sorted(set(GRID) | {args.accept}, reverse=True)
+    print(f"{'accept':>7} {'decided':>8} {'coverage':>9} {'agreement':>10}")
+    for accept in thresholds:
+        r = evaluate(labels, accept, args.batch_size, args.reject)
+        marker = "  <- configured" if accept == args.accept else ""
+        print(f"{accept:>7.2f} {r['decided']:>4}/{r['total']:<3} {r['coverage']:>9.1%} "
+              f"{r['agreement']:>10.1%}{marker}")
+
+    configured = evaluate(labels, args.accept, args.batch_size, args.reject)
+    if configured["agreement"] < args.min_agreement:
+        print(f"\nFAIL: agreement {configured['agreement']:.1%} below {args.min_agreement:.0%}")
+        return 1
+    print(f"\nOK: {configured['coverage']:.0%} of answers decided locally at {configured['agreement']:.1%} agreement")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
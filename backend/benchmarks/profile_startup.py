@@ -0,0 +1,80 @@
+"""
+Import-time profile of the app: what a new worker pays before serving `/`.
+
+    python -m benchmarks.profile_startup              # top 25 modules
+    python -m benchmarks.profile_startup --top 50 --by-package
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter (so the
+numbers are a genuine cold import) and reports cumulative import time per
+module, or per top-level package with --by-package.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def run_importtime(target: str):
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}
+    env.setdefault("DATABASE_URL", "sqlite:///./profile_startup.db")
+    env.setdefault("EMAIL_USERNAME", "profile@example.com")
+    env.setdefault("EMAIL_PASSWORD", "unused")
+    started = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000.0
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"importing {target} failed")
+    return parse_importtime(proc.stderr), wall_ms
+
+
+def parse_importtime(output: str):
+    """[(module, self_us, cumulative_us, depth)] from `-X importtime` stderr."""
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def by_package(rows):
+    totals = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--by-package", action="store_true", help="sum self time per top-level package")
+    args = parser.parse_args(argv)
+
+    rows, wall_ms = run_importtime(args.target)
+    total_us = sum(self_us for _, self_us, _, _ in rows)
+    print(f"import {args.target}: {total_us / 1000:.0f} ms of imports, {wall_ms:.0f} ms process wall time")
+    print(f"{len(rows)} modules imported\n")
+
+    if args.by_package:
+        print(f"{'package':<40} {'self ms':>9} {'share':>7}")
+        for package, self_us in by_package(rows)[: args.top]:
+            print(f"{package:<40} {self_us / 1000:>9.1f} {self_us / total_us:>7.1%}")
+    else:
+        print(f"{'module':<50} {'cumulative ms':>14} {'self ms':>9}")
+        for name, self_us, cumulative_us, _ in sorted(rows, key=lambda r: r[2], reverse=True)[: args.top]:
+            print(f"{name:<50} {cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Per-question analytics on a heavily attempted quiz.
+
+    cd backend
+    python -m benchmarks.question_analytics
+    python -m benchmarks.question_analytics --attempts 100000 --questions 10 --database-url postgresql://localhost/quiz_bench
+
+Seeds one quiz (half MCQ, half text questions) with --attempts attempts stored
+as user_answers rows, plus its score histogram, into an empty database
+(default: a temporary SQLite file). Then times quiz_analytics:
+  cold    - cache empty: version check + the grouped queries over every answer
+  cached  - same attempt count: the version check only
+  after   - right after one more submission: only the new attempt is aggregated
+  recount - the same read with an empty cache
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import _question_rows
+from db.models import Base, Quiz, Question, QuizAttempt, User, UserAnswer
+from services.question_analytics import AnalyticsCache, quiz_analytics
+from services.score_histograms import rebuild_histograms, record_score
+
+CHUNK_SIZE = 20000
+BASE_TIME = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def seed(engine, attempts: int, questions: int):
+    Base.metadata.create_all(bind=engine)
+    user_id, quiz_id = uuid.uuid4(), uuid.uuid4()
+    rows = _question_rows(quiz_id, questions)
+    with Session(bind=engine) as session:
+        session.execute(insert(User), [{"id": user_id, "email": f"{user_id.hex[:8]}@example.com",
+                                        "full_name": "Bench", "hashed_password": "x"}])
+        session.execute(insert(Quiz), [{"id": quiz_id}])
+        session.execute(insert(Question), rows)
+        attempt_rows, answer_rows = [], []
+        for a in range(attempts):
+            attempt_id = uuid.uuid4()
+            score = 0
+            for n, q in enumerate(rows):
+                picked = ["Alpha", "Beta", "Gamma", "Delta"][(a * 7 + n) % 4] if q["options"] else (
+                    q["correct_answer"] if (a + n) % 3 else "Something else")
+                is_correct = picked == q["correct_answer"]
+                score += is_correct
+                answer_rows.append({"id": uuid.uuid4(), "user_id": user_id, "question_id": q["id"],
+                                    "attempt_id": attempt_id, "answer": picked, "is_correct": is_correct})
+            attempt_rows.append({"id": attempt_id, "user_id": user_id, "quiz_id": quiz_id, "score": score,
+                                 "submitted_at": BASE_TIME + timedelta(seconds=a)})
+            if len(answer_rows) >= CHUNK_SIZE:
+                session.execute(insert(QuizAttempt), attempt_rows)
+                session.execute(insert(UserAnswer), answer_rows)
+                attempt_rows, answer_rows = [], []
+        if attempt_rows:
+            session.execute(insert(QuizAttempt), attempt_rows)
+            session.execute(insert(UserAnswer), answer_rows)
+        rebuild_histograms(session.connection(), quiz_id)
+        session.commit()
+    return user_id, quiz_id, rows
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000.0, result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--attempts", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="empty database to seed (default: temporary SQLite)")
+    args = parser.parse_args(argv)
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='analytics-'), 'bench.db')}"
+    engine = create_engine(url)
+    started = time.perf_counter()
+    user_id, quiz_id, questions = seed(engine, args.attempts, args.questions)
+    print(f"Seeded {args.attempts:,} attempts x {args.questions} questions in {time.perf_counter() - started:.1f} s\n")
+
+    cache = AnalyticsCache()
+    with Session(bind=engine) as db:
+        cold_ms, result = timed(lambda: quiz_analytics(db, quiz_id, cache))
+        cached_ms = min(timed(lambda: quiz_analytics(db, quiz_id, cache))[0] for _ in range(args.repeat))
+
+        attempt = QuizAttempt(id=uuid.uuid4(), user_id=user_id, quiz_id=quiz_id, score=0,
+                              submitted_at=datetime.now(timezone.utc))
+        db.add(attempt)
+        db.add_all(UserAnswer(user_id=user_id, attempt_id=attempt.id, question_id=q["id"],
+                              answer="Something else", is_correct=False) for q in questions)
+        record_score(db, quiz_id, 0)
+        db.commit()
+        after_ms, refreshed = timed(lambda: quiz_analytics(db, quiz_id, cache))
+        full_ms, _ = timed(lambda: quiz_analytics(db, quiz_id, AnalyticsCache()))
+
+    hardest = result["questions"][0]
+    print(f"cold     {cold_ms:>9.2f} ms  ({result['total_attempts']:,} attempts)")
+    print(f"cached   {cached_ms:>9.2f} ms  (best of {args.repeat})")
+    print(f"after    {after_ms:>9.2f} ms  ({refreshed['total_attempts']:,} attempts, new attempt merged in)")
+    print(f"recount  {full_ms:>9.2f} ms  (same data, empty cache)")
+    print(f"\nhardest question: {hardest['correct_rate']:.1%} correct over {hardest['attempts']:,} answers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
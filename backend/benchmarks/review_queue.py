@@ -0,0 +1,146 @@
+"""
+Building a review set for a user with a long answer history.
+
+    cd backend
+    python -m benchmarks.review_queue
+    python -m benchmarks.review_queue --answers 50000 --other-users 20 --database-url postgresql://localhost/review_bench
+
+Seeds the probe user with --answers graded answers (10-question quizzes,
+attempted repeatedly over a year), and --other-users users with the same
+history, into an empty database (default: a temporary SQLite file). Then
+rebuilds question_mastery from those answers and times, best of --repeat:
+  mastery - review_set(): the indexed "due now" read on question_mastery
+  scan    - for comparison, only the first step of doing it at request time:
+            the latest answer to each question the user has answered, from user_answers
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, create_engine, func, insert, select
+from sqlalchemy.orm import Session
+
+from benchmarks.seed import _question_rows
+from db.models import Base, Question, Quiz, QuizAttempt, User, UserAnswer
+from services.mastery import rebuild_mastery, review_set
+
+CHUNK_SIZE = 20000
+QUESTIONS_PER_QUIZ = 10
+BASE_TIME = datetime.now(timezone.utc) - timedelta(days=365)
+
+
+def _uuid() -> uuid.UUID:
+    # See benchmarks.answer_storage: avoids NUMERIC-affinity collisions on SQLite
+    while True:
+        value = uuid.uuid4()
+        if not value.hex.replace("e", "", 1).isdigit():
+            return value
+
+
+def seed(engine, users: int, answers: int) -> uuid.UUID:
+    """Returns the probe user's id (user 0)."""
+    Base.metadata.create_all(bind=engine)
+    attempts_per_user = answers // QUESTIONS_PER_QUIZ
+    quizzes_per_user = max(1, attempts_per_user // 4)  # each quiz attempted about 4 times
+    rng_state = 0
+    with Session(bind=engine) as session:
+        user_ids = [_uuid() for _ in range(users)]
+        session.execute(insert(User), [
+            {"id": u, "email": f"review{n}@example.com", "full_name": f"Review {n}", "hashed_password": "x"}
+            for n, u in enumerate(user_ids)
+        ])
+        for user_id in user_ids:
+            quizzes = []
+            for _ in range(quizzes_per_user):
+                quiz_id = _uuid()
+                rows = [{**row, "id": _uuid()} for row in _question_rows(quiz_id, QUESTIONS_PER_QUIZ)]
+                quizzes.append((quiz_id, rows))
+            session.execute(insert(Quiz), [{"id": quiz_id} for quiz_id, _ in quizzes])
+            session.execute(insert(Question), [row for _, rows in quizzes for row in rows])
+
+            attempts, stored = [], []
+            for a in range(attempts_per_user):
+                quiz_id, rows = quizzes[a % quizzes_per_user]
+                attempt_id = _uuid()
+                submitted_at = BASE_TIME + timedelta(days=365 * a / attempts_per_user)
+                score = 0
+                for q in rows:
+                    rng_state = (rng_state * 1103515245 + 12345) % 2**31
+                    is_correct = rng_state % 4 != 0
+                    score += is_correct
+                    stored.append({"id": _uuid(), "user_id": user_id, "question_id": q["id"],
+                                   "attempt_id": attempt_id, "answer": "Alpha" if is_correct else "Beta",
+                                   "is_correct": is_correct, "submitted_at": submitted_at})
+                attempts.append({"id": attempt_id, "user_id": user_id, "quiz_id": quiz_id,
+                                 "score": score, "submitted_at": submitted_at})
+                if len(stored) >= CHUNK_SIZE:
+                    session.execute(insert(QuizAttempt), attempts)
+                    session.execute(insert(UserAnswer), stored)
+                    attempts, stored = [], []
+            if attempts:
+                session.execute(insert(QuizAttempt), attempts)
+                session.execute(insert(UserAnswer), stored)
+        session.commit()
+    return user_ids[0]
+
+
+def scan_latest_answers(db, user_id) -> list:
+    latest = (
+        select(UserAnswer.question_id, func.max(UserAnswer.submitted_at).label("answered_at"))
+        .where(UserAnswer.user_id == user_id)
+        .group_by(UserAnswer.question_id)
+        .subquery()
+    )
+    return (
+        db.query(UserAnswer.question_id, UserAnswer.is_correct, UserAnswer.submitted_at)
+        .join(latest, and_(UserAnswer.question_id == latest.c.question_id,
+                           UserAnswer.submitted_at == latest.c.answered_at))
+        .filter(UserAnswer.user_id == user_id)
+        .all()
+    )
+
+
+def best_of(repeat: int, fn):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000.0, result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=50_000, help="graded answers per user")
+    parser.add_argument("--other-users", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=20, help="review set size")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="empty database to seed (default: temporary SQLite)")
+    args = parser.parse_args(argv)
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='review-'), 'bench.db')}"
+    engine = create_engine(url)
+    started = time.perf_counter()
+    probe_user = seed(engine, args.other_users + 1, args.answers)
+    seeded_s = time.perf_counter() - started
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        mastery_rows = rebuild_mastery(connection)
+    print(f"Seeded {args.other_users + 1} users x {args.answers:,} answers in {seeded_s:.1f} s; "
+          f"rebuilt {mastery_rows:,} mastery rows in {time.perf_counter() - started:.1f} s\n")
+
+    with Session(bind=engine) as db:
+        mastery_ms, due = best_of(args.repeat, lambda: review_set(db, probe_user, args.limit))
+        scan_ms, latest = best_of(max(1, args.repeat // 4), lambda: scan_latest_answers(db, probe_user))
+
+    print(f"mastery  {mastery_ms:>9.2f} ms  ({len(due)} questions due, best of {args.repeat})")
+    print(f"scan     {scan_ms:>9.2f} ms  ({len(latest):,} answered questions, latest answer only)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Endpoint benchmark with SQL query budgets.
+
+    cd backend
+    python -m benchmarks.run_benchmarks --scale medium
+    python -m benchmarks.run_benchmarks --database-url postgresql://localhost/quiz_bench
+    python -m benchmarks.run_benchmarks --scale medium --update-baseline
+
+Exits non-zero when a route exceeds its max_queries in budgets.json or its
+p95 latency regresses against baseline.json (same scale and dialect only).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.harness import BASELINE_PATH, BenchmarkApp, check_results, load_budgets
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Empty database to seed (default: temporary SQLite file)")
+    parser.add_argument("--scale", default="medium", choices=["small", "medium", "large"])
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--routes", nargs="*", help="Only run these route names")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative p95 regression")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="quiz-bench-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    bench = BenchmarkApp(database_url, workdir)
+    try:
+        probe = bench.seed(args.scale)
+        print(f"Seeded ({args.scale}): " + ", ".join(f"{k}={v}" for k, v in probe["counts"].items()))
+
+        specs = bench.applicable_routes(load_budgets())
+        if args.routes:
+            specs = [s for s in specs if s["name"] in args.routes]
+        results = [bench.run_route(spec, args.iterations) for spec in specs]
+        dialect = bench.engine.dialect.name
+    finally:
+        bench.close()
+
+    print(f"\n{'route':<24}{'queries':>9}{'budget':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['name']:<24}{r['queries']:>9}{r['max_queries']:>8}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}")
+
+    baseline_key = f"{dialect}:{args.scale}"
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+
+    if args.update_baseline:
+        stored[baseline_key] = {r["name"]: {"p50_ms": r["p50_ms"], "p95_ms": r["p95_ms"]} for r in results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(stored, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline '{baseline_key}' written to {args.baseline}")
+
+    failures = check_results(results, stored.get(baseline_key), tolerance=args.tolerance)
+    for failure in failures:
+        print("FAIL:", failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
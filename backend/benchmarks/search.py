@@ -0,0 +1,160 @@
+"""
+Search latency over one million questions.
+
+    cd backend
+    python -m benchmarks.search
+    python -m benchmarks.search --users 100 --files 100 --questions 100 --database-url postgresql://localhost/search_bench
+
+Seeds --users users, each with --files uploads of --questions questions and
+one extracted-text region per upload (1M questions with the defaults), into
+an empty database (default: a temporary SQLite file). Words are drawn from a
+Zipf-distributed vocabulary, so there are common and rare terms. For one
+user's library it then times services.search.search():
+  build  - SQLite only: first search in a worker, which builds the user's in-process index
+  query  - best-of and median per query, with the index warm (SQLite) or from the GIN indexes (PostgreSQL)
+  like   - for comparison: counting the same matches with LIKE '%word%' over the user's questions
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import and_, create_engine, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from db.models import Base, DocumentRegion, Question, Quiz, UploadedFile, User
+from services.search import SearchIndexCache, search
+
+CHUNK_SIZE = 20000
+VOCABULARY = 20000
+SYLLABLES = ["ba", "ce", "di", "fo", "gu", "ka", "le", "mi", "no", "pu", "ra", "se", "ti", "vo", "zu", "xy"]
+
+QUERIES = [
+    ("common word", "{common}"),
+    ("rare word", "{rare}"),
+    ("two words", "{common} {middle}"),
+    ("prefix", "{prefix}"),
+    ("deep page", "{common}"),  # offset 200
+]
+
+
+def _uuid() -> uuid.UUID:
+    # See benchmarks.answer_storage: avoids NUMERIC-affinity collisions on SQLite
+    while True:
+        value = uuid.uuid4()
+        if not value.hex.replace("e", "", 1).isdigit():
+            return value
+
+
+def vocabulary(size: int, rng: random.Random) -> list:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words, key=lambda _: rng.random())
+
+
+def seed(engine, users: int, files: int, questions: int, rng: random.Random):
+    """Returns (probe user id, vocabulary); word i has weight 1 / (i + 1)."""
+    Base.metadata.create_all(bind=engine)
+    words = vocabulary(VOCABULARY, rng)
+    weights = [1.0 / (rank + 1) for rank in range(len(words))]
+    cumulative = list(itertools.accumulate(weights))
+
+    def sentence(count):
+        return " ".join(rng.choices(words, cum_weights=cumulative, k=count))
+
+    user_ids = [_uuid() for _ in range(users)]
+    with Session(bind=engine) as session:
+        session.execute(insert(User), [
+            {"id": u, "email": f"search{n}@example.com", "full_name": f"Search {n}", "hashed_password": "x"}
+            for n, u in enumerate(user_ids)
+        ])
+        uploads, quizzes, regions, items = [], [], [], []
+        for user_id in user_ids:
+            for f in range(files):
+                file_id, quiz_id = _uuid(), _uuid()
+                uploads.append({"id": file_id, "user_id": user_id, "filename": f"{file_id.hex}.pdf",
+                                "original_name": f"{sentence(3)} {f}.pdf", "file_type": "pdf"})
+                quizzes.append({"id": quiz_id, "file_id": file_id})
+                text = sentence(400)
+                regions.append({"id": _uuid(), "file_id": file_id, "region_index": 0, "first_unit": 1,
+                                "last_unit": 1, "char_count": len(text), "text": text})
+                items.extend(
+                    {"id": _uuid(), "quiz_id": quiz_id, "text": sentence(12) + "?", "explanation": sentence(25) + ".",
+                     "correct_answer": "A", "question_type": "text"}
+                    for _ in range(questions)
+                )
+                if len(items) >= CHUNK_SIZE:
+                    for model, rows in ((UploadedFile, uploads), (Quiz, quizzes), (DocumentRegion, regions),
+                                        (Question, items)):
+                        session.execute(insert(model), rows)
+                    session.commit()
+                    uploads, quizzes, regions, items = [], [], [], []
+        for model, rows in ((UploadedFile, uploads), (Quiz, quizzes), (DocumentRegion, regions), (Question, items)):
+            if rows:
+                session.execute(insert(model), rows)
+        session.commit()
+    return user_ids[0], words
+
+
+def like_scan(db, user_id, query: str) -> int:
+    conditions = [
+        or_(Question.text.ilike(f"%{word}%"), Question.explanation.ilike(f"%{word}%")) for word in query.split()
+    ]
+    files = select(UploadedFile.id).where(UploadedFile.user_id == user_id).scalar_subquery()
+    return (
+        db.query(func.count(Question.id)).join(Quiz, Question.quiz_id == Quiz.id)
+        .filter(Quiz.file_id.in_(files), and_(*conditions)).scalar()
+    )
+
+
+def timings(repeat: int, fn):
+    samples, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return min(samples), statistics.median(samples), result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--files", type=int, default=100, help="uploads per user")
+    parser.add_argument("--questions", type=int, default=100, help="questions per upload")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--database-url", default=None, help="empty database to seed (default: temporary SQLite)")
+    args = parser.parse_args(argv)
+
+    url = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='search-'), 'bench.db')}"
+    engine = create_engine(url)
+    rng = random.Random(7)
+    started = time.perf_counter()
+    probe_user, words = seed(engine, args.users, args.files, args.questions, rng)
+    total = args.users * args.files * args.questions
+    print(f"Seeded {total:,} questions ({args.files * args.questions:,} for the probe user) "
+          f"in {time.perf_counter() - started:.1f} s on {engine.dialect.name}\n")
+
+    terms = {"common": words[3], "middle": words[40], "rare": words[5000], "prefix": words[3][:3]}
+    cache = SearchIndexCache()
+    with Session(bind=engine) as db:
+        if engine.dialect.name != "postgresql":
+            build_ms, _, _ = timings(1, lambda: search(db, probe_user, terms["common"], cache=cache))
+            print(f"build    {build_ms:>9.1f} ms  (in-process index for the probe user, once per worker)\n")
+        print(f"{'query':<12} {'q':<22} {'matches':>8} {'best ms':>8} {'p50 ms':>8} {'like ms':>8}")
+        for label, template in QUERIES:
+            query = template.format(**terms)
+            offset = 200 if label == "deep page" else 0
+            best, median, result = timings(args.repeat, lambda: search(db, probe_user, query, offset=offset, cache=cache))
+            like_ms, _, _ = timings(1, lambda: like_scan(db, probe_user, query))
+            print(f"{label:<12} {query:<22} {result['total']:>8,} {best:>8.2f} {median:>8.2f} {like_ms:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
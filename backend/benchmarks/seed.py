@@ -0,0 +1,123 @@
+"""
+Seeds a benchmark database with users x files x sections x attempts.
+
+All rows are inserted with bulk INSERT ... executemany, so even the "large"
+scale seeds in seconds on SQLite or a local Postgres.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from db.models import Base, User, UploadedFile, Quiz, Question, QuizAttempt, UserAnswer
+from services.mastery import rebuild_mastery
+
+# users, files per user, sections per file, questions per section, attempts per section
+SCALES = {
+    "small": dict(users=3, files=4, sections=3, questions=10, attempts=2),
+    "medium": dict(users=20, files=20, sections=5, questions=10, attempts=3),
+    "large": dict(users=50, files=40, sections=8, questions=10, attempts=5),
+}
+
+CHUNK_SIZE = 5000
+
+
+def _insert_chunked(session, model, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        session.execute(insert(model), rows[start:start + CHUNK_SIZE])
+
+
+def _question_rows(quiz_id, count):
+    rows = []
+    for i in range(count):
+        if i % 2 == 0:
+            rows.append({
+                "id": uuid.uuid4(), "quiz_id": quiz_id,
+                "text": f"Which option describes concept {i}? " + "Context sentence. " * 8,
+                "options": ["Alpha", "Beta", "Gamma", "Delta"],
+                "correct_answer": "Alpha",
+                "explanation": "Alpha is described in the source material. " * 4,
+                "question_type": "mcq",
+            })
+        else:
+            rows.append({
+                "id": uuid.uuid4(), "quiz_id": quiz_id,
+                "text": f"Explain concept {i} in your own words.",
+                "options": None,
+                "correct_answer": f"Concept {i} is the process described in section {i}.",
+                "explanation": "The material defines it directly. " * 4,
+                "question_type": "text",
+            })
+    return rows
+
+
+def seed_database(engine, scale: str = "small") -> dict:
+    """
+    Creates the schema and seeds it. Returns ids for a "probe" user that the
+    benchmark requests run as: the user, one of their files, and one quiz.
+    """
+    spec = SCALES[scale]
+    Base.metadata.create_all(bind=engine)
+    base_time = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    users, files, quizzes, questions, attempts, answers = [], [], [], [], [], []
+    for u in range(spec["users"]):
+        user_id = uuid.uuid4()
+        users.append({
+            "id": user_id, "email": f"bench{u}-{user_id.hex[:8]}@example.com",
+            "full_name": f"Bench User {u}", "hashed_password": "not-used", "is_active": True,
+        })
+        for f in range(spec["files"]):
+            file_id = uuid.uuid4()
+            files.append({
+                "id": file_id, "user_id": user_id, "filename": f"{file_id.hex}.txt",
+                "original_name": f"lecture-notes-{f}.pdf", "file_type": "txt",
+                "uploaded_at": base_time + timedelta(hours=f),
+            })
+            for s in range(spec["sections"]):
+                quiz_id = uuid.uuid4()
+                created_at = base_time + timedelta(hours=f, minutes=s)
+                quizzes.append({"id": quiz_id, "file_id": file_id, "created_at": created_at})
+                quiz_questions = _question_rows(quiz_id, spec["questions"])
+                questions.extend(quiz_questions)
+                for a in range(spec["attempts"]):
+                    attempt_id = uuid.uuid4()
+                    submitted_at = created_at + timedelta(days=a + 1)
+                    correct = 0
+                    for q_index, q in enumerate(quiz_questions):
+                        is_correct = (q_index + a) % 3 != 0
+                        correct += is_correct
+                        answers.append({
+                            "id": uuid.uuid4(), "user_id": user_id, "question_id": q["id"],
+                            "attempt_id": attempt_id,
+                            "answer": q["correct_answer"] if is_correct else "Something else",
+                            "is_correct": is_correct, "submitted_at": submitted_at,
+                        })
+                    attempts.append({
+                        "id": attempt_id, "user_id": user_id, "quiz_id": quiz_id,
+                        "score": correct, "submitted_at": submitted_at,
+                    })
+
+    with Session(bind=engine) as session:
+        for model, rows in (
+            (User, users), (UploadedFile, files), (Quiz, quizzes),
+            (Question, questions), (QuizAttempt, attempts), (UserAnswer, answers),
+        ):
+            _insert_chunked(session, model, rows)
+        rebuild_mastery(session.connection())
+        session.commit()
+
+    probe_file = files[0]
+    probe_quiz = quizzes[0]
+    return {
+        "user_id": users[0]["id"],
+        "file_id": probe_file["id"],
+        "file_name": probe_file["filename"],
+        "quiz_id": probe_quiz["id"],
+        "quiz_questions": [q for q in questions if q["quiz_id"] == probe_quiz["id"]],
+        "counts": {
+            "users": len(users), "files": len(files), "sections": len(quizzes),
+            "questions": len(questions), "attempts": len(attempts), "answers": len(answers),
+        },
+    }
@@ -0,0 +1,128 @@
+"""
+Serialization cost of the hot read routes, before and after response models.
+
+    cd backend
+    python -m benchmarks.serialization
+    python -m benchmarks.serialization --sections 50 --questions 10 --rows 1000 --repeat 20
+
+Each route's handler output is rebuilt in memory at a large size (no database,
+no HTTP) and serialized the two ways FastAPI would:
+  before  - no response_model: jsonable_encoder reflection over ORM rows and
+            dicts, rendered by JSONResponse (json.dumps)
+  after   - the route's response_model: Pydantic validation + dump, rendered
+            by ORJSONResponse
+
+Prints the best-of-N time per route and the body sizes (the "after" body is
+smaller where ORM rows used to leak internal columns).
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+
+from db.models import Question, UploadedFile
+from routes.quizzes_logic import router as quizzes_router
+from routes.responses_handler import router as answers_router
+from routes.user_dashboard import router as dashboard_router
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def orm_question(n: int) -> Question:
+    return Question(
+        id=uuid.uuid4(), quiz_id=uuid.uuid4(), text=f"Which statement about topic {n} is true?",
+        options=[f"Option {k} for question {n}" for k in "ABCD"], correct_answer=f"Option A for question {n}",
+        explanation=f"The material explains topic {n} in section {n % 7}. " * 3, question_type="mcq",
+    )
+
+
+def build_payloads(sections: int, questions: int, rows: int) -> dict:
+    """Route path -> what its handler returns, at benchmark scale."""
+    return {
+        "/dashboard/files/{file_id}/sections": [
+            {"section_number": s + 1, "quiz_id": uuid.uuid4(), "region_index": s,
+             "questions": [orm_question(s * questions + q) for q in range(questions)]}
+            for s in range(sections)
+        ],
+        "/dashboard/files": [
+            UploadedFile(id=uuid.uuid4(), user_id=uuid.uuid4(), filename=f"{uuid.uuid4().hex}.pdf",
+                         original_name=f"Lecture notes {n}.pdf", file_type="pdf", content_hash="ab" * 32,
+                         uploaded_at=NOW, region_count=12, region_cursor=3)
+            for n in range(rows)
+        ],
+        "/dashboard": [
+            {"quiz_id": uuid.uuid4(), "file_name": f"Lecture notes {n}.pdf", "created_at": NOW, "question_count": 10}
+            for n in range(rows)
+        ],
+        "/dashboard/history": [
+            {"quiz_id": uuid.uuid4(), "label": f"Lecture notes {n}.pdf - Section {n % 9 + 1}", "score": n % 10,
+             "submitted_at": NOW - timedelta(minutes=n), "num_questions": 10}
+            for n in range(rows)
+        ],
+        "/{quiz_id}": {
+            "quiz_id": uuid.uuid4(), "created_at": NOW,
+            "questions": [{"id": q.id, "text": q.text, "options": q.options, "question_type": q.question_type,
+                           "correct_answer": q.correct_answer, "explanation": q.explanation}
+                          for q in map(orm_question, range(sections * questions))],
+        },
+        "/attempts": [
+            {"question": f"Which statement about topic {n} is true?", "user_answer": "B",
+             "correct_answer": "A", "explanation": "Because the material says so. " * 3, "is_correct": n % 3 == 0}
+            for n in range(rows * 5)
+        ],
+    }
+
+
+def response_fields() -> dict:
+    fields = {}
+    for router in (dashboard_router, quizzes_router, answers_router):
+        for route in router.routes:
+            if "GET" in getattr(route, "methods", ()) and getattr(route, "response_field", None) is not None:
+                fields[route.path] = route.response_field
+    return fields
+
+
+def render(field, content, response_class) -> bytes:
+    serialized = asyncio.run(serialize_response(field=field, response_content=content))
+    return response_class(content=serialized).body
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000.0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=50, help="sections in the file (and quiz size / 10)")
+    parser.add_argument("--questions", type=int, default=10, help="questions per section")
+    parser.add_argument("--rows", type=int, default=1000, help="rows in list routes")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    payloads = build_payloads(args.sections, args.questions, args.rows)
+    fields = response_fields()
+
+    print(f"{'route':<38} {'before ms':>10} {'after ms':>9} {'speedup':>8} {'before KB':>10} {'after KB':>9}")
+    for path, content in payloads.items():
+        field = fields[path]
+        before_body = render(None, content, JSONResponse)
+        after_body = render(field, content, ORJSONResponse)
+        before = best_of(args.repeat, lambda: render(None, content, JSONResponse))
+        after = best_of(args.repeat, lambda: render(field, content, ORJSONResponse))
+        print(f"{path:<38} {before:>10.2f} {after:>9.2f} {before / after:>7.1f}x "
+              f"{len(before_body) / 1024:>10.1f} {len(after_body) / 1024:>9.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
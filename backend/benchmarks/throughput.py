@@ -0,0 +1,186 @@
+"""
+Throughput of the production launcher against the single-process default.
+
+    cd backend
+    python -m benchmarks.throughput                       # both servers, 20s each
+    python -m benchmarks.throughput --servers gunicorn --concurrency 64 --duration 60
+    python -m benchmarks.throughput --database-url postgresql://localhost/quiz_bench
+
+Seeds a database, starts each server as a real subprocess with the fake LLM
+provider (log-normal latency, like Gemini), and drives a mix of dashboard
+reads and LLM-bound submissions with concurrent keep-alive clients. Reports
+requests/s, error count and p50/p95/p99 latency per server.
+"""
+import argparse
+import asyncio
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.harness import percentile, submission_payload
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+SERVERS = {
+    "uvicorn": ["uvicorn", "main:app", "--host", "127.0.0.1", "--port", "{port}", "--log-level", "warning"],
+    "gunicorn": ["gunicorn", "main:app", "-c", "gunicorn.conf.py", "--bind", "127.0.0.1:{port}"],
+}
+
+
+def seed(database_url: str, scale: str) -> dict:
+    from sqlalchemy import create_engine
+    from benchmarks.seed import seed_database
+
+    engine = create_engine(database_url)
+    try:
+        return seed_database(engine, scale)
+    finally:
+        engine.dispose()
+
+
+def start_server(name: str, port: int, env: dict, log_path: str) -> subprocess.Popen:
+    command = [part.format(port=port) for part in SERVERS[name]]
+    # Logs go to a file: an unread pipe fills up and stalls the server
+    with open(log_path, "w") as log:
+        return subprocess.Popen(
+            [sys.executable, "-m", *command], cwd=BACKEND_DIR, env=env,
+            stdout=log, stderr=subprocess.STDOUT,
+        )
+
+
+async def wait_until_ready(base_url: str, proc: subprocess.Popen, log_path: str, timeout: float = 60.0):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"server exited early, see {log_path}")
+            try:
+                if (await client.get(f"{base_url}/")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+async def drive(base_url: str, headers: dict, probe: dict, concurrency: int, duration: float, llm_share: float):
+    import httpx
+
+    read_paths = [
+        "/user/dashboard",
+        "/user/dashboard/files",
+        f"/user/dashboard/files/{probe['file_id']}/sections",
+        f"/api/quizzes/{probe['quiz_id']}",
+    ]
+    latencies, errors = [], 0
+    stop_at = time.monotonic() + duration
+
+    async def client_loop(client):
+        nonlocal errors
+        rng = random.Random()
+        while time.monotonic() < stop_at:
+            started = time.perf_counter()
+            try:
+                if rng.random() < llm_share:
+                    response = await client.post("/api/answers/", json=submission_payload(probe))
+                else:
+                    response = await client.get(rng.choice(read_paths))
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - started) * 1000.0)
+            else:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, headers=headers, limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def stop_server(proc: subprocess.Popen):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=90)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="Empty database to seed (default: temporary SQLite file)")
+    parser.add_argument("--scale", default="small", choices=["small", "medium", "large"])
+    parser.add_argument("--servers", nargs="*", default=["uvicorn", "gunicorn"], choices=sorted(SERVERS))
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per server")
+    parser.add_argument("--llm-share", type=float, default=0.2, help="fraction of requests that grade answers")
+    parser.add_argument("--llm-median-ms", type=float, default=800)
+    parser.add_argument("--llm-p95-ms", type=float, default=2500)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="quiz-throughput-")
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ.setdefault("DATABASE_URL", database_url)
+    os.environ.setdefault("EMAIL_USERNAME", "bench@example.com")
+    os.environ.setdefault("EMAIL_PASSWORD", "unused")
+
+    probe = seed(database_url, args.scale)
+    from auth.utils import create_access_token
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(probe['user_id'])})}"}
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "LLM_PROVIDER": "fake",
+        "FAKE_LLM_LATENCY_MEDIAN_MS": str(args.llm_median_ms),
+        "FAKE_LLM_LATENCY_P95_MS": str(args.llm_p95_ms),
+        "GEMINI_REQUESTS_PER_MINUTE": "1000000",
+        "GEMINI_RATE_BURST": "100000",
+        "LOG_LEVEL": "WARNING",
+    }
+
+    results = {}
+    for name in args.servers:
+        base_url = f"http://127.0.0.1:{args.port}"
+        log_path = os.path.join(workdir, f"{name}.log")
+        proc = start_server(name, args.port, env, log_path)
+        try:
+            asyncio.run(wait_until_ready(base_url, proc, log_path))
+            results[name] = asyncio.run(
+                drive(base_url, headers, probe, args.concurrency, args.duration, args.llm_share)
+            )
+        finally:
+            stop_server(proc)
+
+    print(f"\n{'server':<10} {'req/s':>8} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, r in results.items():
+        print(f"{name:<10} {r['rps']:>8.1f} {r['requests']:>9} {r['errors']:>7} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    if "uvicorn" in results and "gunicorn" in results and results["uvicorn"]["rps"]:
+        print(f"\ngunicorn / uvicorn throughput: {results['gunicorn']['rps'] / results['uvicorn']['rps']:.2f}x")
+    print(f"Server logs: {workdir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
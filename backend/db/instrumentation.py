@@ -0,0 +1,44 @@
+import logging
+import time
+
+from sqlalchemy import event
+
+from services.request_context import current_timings
+
+logger = logging.getLogger("nexera.sql")
+
+
+def install_sql_instrumentation(engine, slow_query_ms: float = 200.0):
+    """
+    Counts statements and DB time into the current request's timings and logs
+    statements slower than `slow_query_ms` together with the route that ran them.
+    Only call this when instrumentation is enabled: no listeners, no overhead.
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - conn.info["query_started_at"].pop()) * 1000.0
+        timings = current_timings()
+        if timings is not None:
+            timings.db_statements += 1
+            timings.add("db", elapsed_ms)
+        if elapsed_ms >= slow_query_ms:
+            route = timings.route if timings is not None else "-"
+            logger.warning(
+                "slow query %.1f ms on %s: %s",
+                elapsed_ms,
+                route,
+                " ".join(statement.split())[:500],
+                extra={"event": "db.slow_query", "duration_ms": round(elapsed_ms, 1), "route": route},
+            )
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        # Keep the start-time stack balanced when a statement fails
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_started_at"):
+            conn.info["query_started_at"].pop()
@@ -1,6 +1,6 @@
-from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, DateTime, Text, JSON
+from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, DateTime, Text, JSON, UniqueConstraint, LargeBinary, Index
 from sqlalchemy.orm import relationship, declarative_base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 import uuid
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -9,6 +9,21 @@ Base = declarative_base()
 def generate_uuid():
     return uuid.uuid4()
 
+
+# Full-text search on PostgreSQL: GIN indexes over these to_tsvector
+# expressions, and services.search matches with the very same expressions so
+# the planner uses them. Other databases skip the indexes (see services.search).
+SEARCH_CONFIG = "english"
+
+
+def search_vector(*columns):
+    """to_tsvector(SEARCH_CONFIG, col1 || ' ' || col2 ...), NULLs read as ''. Rendered with literals only."""
+    document = func.coalesce(columns[0], literal_column("''"))
+    for column in columns[1:]:
+        document = document.op("||")(literal_column("' '")).op("||")(func.coalesce(column, literal_column("''")))
+    return func.to_tsvector(literal_column(f"'{SEARCH_CONFIG}'"), document)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -30,22 +45,57 @@ class UploadedFile(Base):
     __tablename__ = "uploaded_files"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
     filename = Column(String, nullable=False)
     original_name = Column(String, nullable=True)
     file_type = Column(String)
+    content_hash = Column(String(64), ForeignKey("stored_blobs.content_hash"), nullable=True, index=True)  # None for pre-dedup uploads
     uploaded_at = Column(DateTime(timezone=True), server_default=func.now())
+    region_count = Column(Integer, nullable=True)  # None until the document is split into regions
+    region_cursor = Column(Integer, nullable=False, default=0, server_default="0")  # next region for "generate more"
+    __table_args__ = (
+        Index("ix_uploaded_files_search", search_vector(original_name), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     user = relationship("User", back_populates="uploads")
     quizzes = relationship("Quiz", back_populates="file")
+    regions = relationship("DocumentRegion", back_populates="file", order_by="DocumentRegion.region_index")
+
+
+class StoredBlob(Base):
+    __tablename__ = "stored_blobs"
+
+    content_hash = Column(String(64), primary_key=True)  # SHA-256 of the file content
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class DocumentRegion(Base):
+    __tablename__ = "document_regions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
+    file_id = Column(UUID(as_uuid=True), ForeignKey("uploaded_files.id"), nullable=False, index=True)
+    region_index = Column(Integer, nullable=False)
+    first_unit = Column(Integer, nullable=False)  # first page (PDF) / paragraph (DOCX) / block (TXT)
+    last_unit = Column(Integer, nullable=False)
+    char_count = Column(Integer, nullable=False)
+    text = Column(Text, nullable=False)
+    __table_args__ = (
+        UniqueConstraint("file_id", "region_index", name="uq_document_regions_file_region"),
+        Index("ix_document_regions_search", search_vector(text), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+
+    file = relationship("UploadedFile", back_populates="regions")
 
 
 class Quiz(Base):
     __tablename__ = "quizzes"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
-    file_id = Column(UUID(as_uuid=True), ForeignKey("uploaded_files.id"))
+    file_id = Column(UUID(as_uuid=True), ForeignKey("uploaded_files.id"), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    region_index = Column(Integer, nullable=True)  # None: generated from the whole document
 
     file = relationship("UploadedFile", back_populates="quizzes")
     questions = relationship("Question", back_populates="quiz")
@@ -56,12 +106,15 @@ class Question(Base):
     __tablename__ = "questions"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
-    quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id"))
+    quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id"), index=True)
     text = Column(Text)
     options = Column(JSON, nullable=True)  # Only for MCQ
     correct_answer = Column(String)
     explanation = Column(Text)
     question_type = Column(String, nullable=False, default="mcq")  # "mcq" or "text"
+    __table_args__ = (
+        Index("ix_questions_search", search_vector(text, explanation), postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
 
     quiz = relationship("Quiz", back_populates="questions")
     answers = relationship("UserAnswer", back_populates="question")
@@ -69,12 +122,19 @@ class Question(Base):
 
 class QuizAttempt(Base):
     __tablename__ = "quiz_attempts"
+    __table_args__ = (
+        # Per-quiz reads, and analytics catching up on attempts submitted since its last pass
+        Index("ix_quiz_attempts_quiz_submitted", "quiz_id", "submitted_at"),
+        # A user's attempts in time order (history, export)
+        Index("ix_quiz_attempts_user_submitted", "user_id", "submitted_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id"))
     score = Column(Integer,nullable=True)
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
+    answers_blob = Column(LargeBinary, nullable=True)  # ANSWER_STORAGE_MODE=compact: all answers, see services.answer_storage
 
     user = relationship("User", back_populates="attempts")
     quiz = relationship("Quiz", back_populates="attempts")
@@ -86,8 +146,8 @@ class UserAnswer(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=generate_uuid)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
-    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"))
-    attempt_id = Column(UUID(as_uuid=True), ForeignKey("quiz_attempts.id"))
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), index=True)
+    attempt_id = Column(UUID(as_uuid=True), ForeignKey("quiz_attempts.id"), index=True)
     answer = Column(String)
     is_correct = Column(Boolean)
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -95,3 +155,41 @@ class UserAnswer(Base):
     user = relationship("User", back_populates="answers")       # ✅ New (optional)
     question = relationship("Question", back_populates="answers")
     attempt = relationship("QuizAttempt", back_populates="answers")
+
+
+class QuizScoreHistogram(Base):
+    __tablename__ = "quiz_score_histograms"
+
+    # One row per score reached on a quiz; attempts counts how many times (see services.score_histograms)
+    quiz_id = Column(UUID(as_uuid=True), ForeignKey("quizzes.id"), primary_key=True)
+    score = Column(Integer, primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+
+
+class QuestionMastery(Base):
+    __tablename__ = "question_mastery"
+    # Review mode reads a user's due questions straight off this index
+    __table_args__ = (Index("ix_question_mastery_user_due", "user_id", "next_due_at"),)
+
+    # One row per question a user has answered, updated by every submission (see services.mastery)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    question_id = Column(UUID(as_uuid=True), ForeignKey("questions.id"), primary_key=True)
+    last_correct = Column(Boolean, nullable=False)
+    streak = Column(Integer, nullable=False, default=0)  # correct answers in a row, 0 after a miss
+    attempts = Column(Integer, nullable=False, default=0)
+    last_answered_at = Column(DateTime(timezone=True), nullable=False)
+    next_due_at = Column(DateTime(timezone=True), nullable=False)
+
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # One row per Idempotency-Key a user sent within the replay window, shared by
+    # every worker; response stays None while the request runs (see services.request_coalescing)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    scope = Column(String, nullable=False)  # "grade", "generate"
+    payload_hash = Column(String(64), nullable=False)
+    response = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
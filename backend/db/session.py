@@ -1,8 +1,9 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 import os
 from dotenv import load_dotenv
+from db.instrumentation import install_sql_instrumentation
 
 
 load_dotenv()  # Load from .env file
@@ -12,11 +13,17 @@ DATABASE_URL = os.getenv("DATABASE_URL", "")
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
-engine = create_engine(DATABASE_URL, echo=True)
-# Thread-safe session
-SessionLocal = scoped_session(
-    sessionmaker(autocommit=False, autoflush=False, bind=engine)
-)
+# SQL_ECHO logs every statement; REQUEST_TIMING counts them per request instead
+SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() in ("1", "true", "yes")
+REQUEST_TIMING = os.getenv("REQUEST_TIMING", "false").lower() in ("1", "true", "yes")
+
+engine = create_engine(DATABASE_URL, echo=SQL_ECHO)
+if REQUEST_TIMING:
+    install_sql_instrumentation(engine, slow_query_ms=float(os.getenv("SLOW_QUERY_MS", "200")))
+# One session per request. A thread-local scoped_session is shared by
+# concurrent requests whose dependencies ran on the same threadpool thread,
+# and the first one to finish closes it under the others.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Base class (optional if you want to import from here too)
 Base = declarative_base()
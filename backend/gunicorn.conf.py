@@ -0,0 +1,120 @@
+"""
+Production launcher: gunicorn managing uvicorn workers.
+
+    cd backend && gunicorn main:app -c gunicorn.conf.py
+
+Every setting can be overridden with the environment variables read below
+(WEB_CONCURRENCY, WORKER_MEMORY_MB, MAX_REQUESTS, ...), or on the gunicorn
+command line.
+"""
+import os
+
+from uvicorn.workers import UvicornWorker
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# === Worker count: one event loop per core, capped by what memory allows ===
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    # Container CPU quota (cgroup v2), e.g. "200000 100000" -> 2 CPUs
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def available_memory_mb() -> int | None:
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limit = f.read().strip()
+        if limit != "max":
+            return int(limit) // (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_workers() -> int:
+    # Requests mostly wait on Gemini and the database, which the event loop
+    # overlaps; extra processes buy CPU for PDF parsing and JSON work.
+    workers = available_cpus() + 1
+    memory_mb = available_memory_mb()
+    if memory_mb:
+        # PyMuPDF can push a worker to a few hundred MB on a large upload
+        per_worker_mb = _env_int("WORKER_MEMORY_MB", 350)
+        workers = min(workers, max(1, memory_mb // per_worker_mb))
+    return max(1, workers)
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    """
+    Stops accepting connections on SIGTERM, lets in-flight requests finish for
+    up to SHUTDOWN_DRAIN_SECONDS, then runs the app's lifespan shutdown.
+    """
+
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "timeout_graceful_shutdown": _env_int("SHUTDOWN_DRAIN_SECONDS", 45),
+    }
+
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = _env_int("WEB_CONCURRENCY", default_workers())
+worker_class = DrainingUvicornWorker
+
+# The Gemini quota is per API key: ResilientCaller splits it by WEB_CONCURRENCY
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Import the app once in the master and fork it: faster boots, shared pages
+preload_app = os.getenv("PRELOAD_APP", "True").lower() in ("1", "true", "yes")
+
+# Recycle workers to cap slow memory growth (PyMuPDF, fragmentation);
+# jitter keeps them from all restarting at once
+max_requests = _env_int("MAX_REQUESTS", 1000)
+max_requests_jitter = _env_int("MAX_REQUESTS_JITTER", 100)
+
+# A request can wait on the LLM for the full retry deadline (30s by default)
+timeout = _env_int("WORKER_TIMEOUT", 120)
+graceful_timeout = _env_int("SHUTDOWN_DRAIN_SECONDS", 45) + 15
+keepalive = _env_int("KEEPALIVE_SECONDS", 5)
+
+accesslog = os.getenv("ACCESS_LOG") or None
+errorlog = "-"
+
+
+def on_starting(server):
+    multiproc_dir = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # With preload_app the engine was created in the master; never share its
+    # pooled connections across processes.
+    from db.session import engine
+    from services.structured_logging import restart_logging_listener
+
+    engine.dispose(close=False)
+    # The log listener thread started in the master does not survive the fork
+    restart_logging_listener()
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -1,8 +1,14 @@
-from fastapi import FastAPI, Depends
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, Request
+from fastapi.routing import APIRoute
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 from dotenv import load_dotenv
 from db.models import Base
-from db.session import engine, get_db
+from db.session import engine, get_db, REQUEST_TIMING
 from sqlalchemy.orm import Session
 
 # Updated routes based on your renamed files
@@ -10,16 +16,45 @@ from routes.responses_handler import router as answer_router
 from routes.file_processor import router as upload_db_router
 from routes.user_dashboard import router as me_router
 from routes.quizzes_logic import router as quizzes_router
+from routes.service_status import router as status_router, metrics_router
 from auth.routes import router, auth_router
+from services.llm_resilience import LLMUnavailableError
+from services.admission import AdmissionRejected, handle_admission_rejected
+from middleware.server_timing import ServerTimingMiddleware
+from middleware.metrics import PrometheusMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.request_id import RequestIdMiddleware
+from services.structured_logging import configure_logging
+from services.lifecycle import drain_llm_bound_requests, llm_bound_requests
 
 # Load environment variables
 load_dotenv()
 
-# Create tables (replace with Alembic in production)
-Base.metadata.create_all(bind=engine)
+# JSON logs via a background queue listener; request ids correlate route, service and SQL lines
+configure_logging()
+
+logger = logging.getLogger("nexera.startup")
+
+# Schema work happens once the server starts, not whenever `main` is imported.
+# Deployments that run `alembic upgrade head` can switch it off.
+CREATE_TABLES_ON_STARTUP = os.getenv("CREATE_TABLES_ON_STARTUP", "True").lower() in ("1", "true", "yes")
 
-# Initialize FastAPI app
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    llm_bound_requests.draining = False
+    if CREATE_TABLES_ON_STARTUP:
+        Base.metadata.create_all(bind=engine)
+    for r in list_routes(app):
+        logger.debug("route %s -> %s (name: %s)", sorted(r["methods"]), r["path"], r["name"])
+    yield
+    # Let uploads / grading that are still waiting on the LLM finish before exiting
+    await drain_llm_bound_requests()
+    engine.dispose()
+
+
+# Initialize FastAPI app; responses are rendered with orjson unless a route says otherwise
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Enable CORS for local frontend or deployed frontend
 app.add_middleware(
@@ -28,8 +63,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Request-ID", "Retry-After"],
 )
 
+# gzip / brotli for large JSON bodies (sections, attempts, quizzes); streams pass through
+app.add_middleware(CompressionMiddleware)
+
+# Per-request db / llm / extract timings as a Server-Timing header (opt-in)
+if REQUEST_TIMING:
+    app.add_middleware(ServerTimingMiddleware)
+
+# Route-level latency / in-flight metrics for /metrics
+app.add_middleware(PrometheusMiddleware)
+
+# Outermost, so every log line of the request (including SQL) carries its id
+app.add_middleware(RequestIdMiddleware)
+
 # Register route groups
 app.include_router(auth_router)
 app.include_router(router)
@@ -37,14 +86,26 @@ app.include_router(answer_router, prefix="/api/answers", tags=["Answers"])
 app.include_router(upload_db_router, prefix="/upload-db", tags=["Upload & Store"])
 app.include_router(me_router, prefix="/user", tags=["Dashboard"])
 app.include_router(quizzes_router, prefix="/api/quizzes", tags=["Quizzes"])
+app.include_router(status_router, prefix="/status", tags=["Status"])
+app.include_router(metrics_router)
+
+# Gemini is rate limited or unhealthy: fail fast and tell clients when to retry
+@app.exception_handler(LLMUnavailableError)
+async def handle_llm_unavailable(request: Request, exc: LLMUnavailableError):
+    return JSONResponse(
+        status_code=503,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+# No admission slot came free for an LLM-bound route: 429 / 503 + Retry-After
+app.add_exception_handler(AdmissionRejected, handle_admission_rejected)
 
 @app.get("/")
 def read_root(db: Session = Depends(get_db)):
     return {"message": "Nexera Quiz backend is operational!"}
 
-# Utility: Print all active routes at server start
-from fastapi.routing import APIRoute
-
+# Utility: list all active routes (logged at DEBUG level on startup)
 def list_routes(app):
     routes = []
     for route in app.routes:
@@ -56,5 +117,3 @@ def list_routes(app):
             })
     return routes
 
-for r in list_routes(app):
-    print(f"{r['methods']} -> {r['path']} (name: {r['name']})")
@@ -0,0 +1,146 @@
+import gzip
+import os
+
+import anyio
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+# Bodies smaller than this are sent as they are: the headers would eat the saving
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_LEVEL = int(os.getenv("BROTLI_LEVEL", "4"))
+# Brotli is used only when the optional `brotli` package is installed
+BROTLI_ENABLED = os.getenv("BROTLI_ENABLED", "true").lower() in ("1", "true", "yes")
+COMPRESSIBLE_TYPES = tuple(
+    t.strip() for t in os.getenv(
+        "COMPRESSION_CONTENT_TYPES", "application/json,text/html,text/plain,text/csv,application/x-ndjson",
+    ).split(",") if t.strip()
+)
+# Larger bodies are compressed in a worker thread instead of on the event loop
+THREAD_OFFLOAD_BYTES = 256 * 1024
+
+_brotli_module = None
+
+
+def _brotli():
+    global _brotli_module
+    if _brotli_module is None:
+        try:
+            import brotli
+        except ImportError:
+            brotli = False
+        _brotli_module = brotli
+    return _brotli_module or None
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """{"gzip": 1.0, "br": 0.8, ...}; q=0 (explicitly refused) is kept as 0.0."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header: str, brotli_available: bool) -> str | None:
+    accepted = parse_accept_encoding(header)
+    candidates = ["br", "gzip"] if brotli_available else ["gzip"]
+    ranked = [
+        (accepted.get(coding, accepted.get("*", 0)), -index, coding)
+        for index, coding in enumerate(candidates)
+    ]
+    quality, _, coding = max(ranked)
+    return coding if quality > 0 else None
+
+
+def compress(body: bytes, encoding: str, gzip_level: int = GZIP_LEVEL, brotli_level: int = BROTLI_LEVEL) -> bytes:
+    if encoding == "br":
+        return _brotli().compress(body, quality=brotli_level)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compresses complete JSON/text responses with brotli or gzip, whichever the
+    client's Accept-Encoding prefers. Left untouched: bodies under
+    COMPRESSION_MIN_BYTES, content types outside COMPRESSIBLE_TYPES, responses
+    that already carry a Content-Encoding, and streamed responses (downloads,
+    exports, server-sent events), which are passed through chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES, content_types=COMPRESSIBLE_TYPES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_types = tuple(content_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        accept = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept, BROTLI_ENABLED and _brotli() is not None) if accept else None
+
+        start = None
+        passthrough = encoding is None
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip().lower()
+                if b"content-encoding" in headers or content_type not in self.content_types:
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message  # held until we know whether the body is complete
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            start_headers = list(start.get("headers", []))
+            start_headers.append((b"vary", b"Accept-Encoding"))
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # Streaming response, or too small to be worth it
+                passthrough = True
+                await send({**start, "headers": start_headers})
+                await send(message)
+                return
+
+            if len(body) >= THREAD_OFFLOAD_BYTES:
+                compressed = await anyio.to_thread.run_sync(compress, body, encoding)
+            else:
+                compressed = compress(body, encoding)
+            if len(compressed) >= len(body):
+                await send({**start, "headers": start_headers})
+                await send(message)
+                return
+            start_headers = [(k, v) for k, v in start_headers if k.lower() != b"content-length"]
+            start_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+            ]
+            await send({**start, "headers": start_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,39 @@
+import re
+import uuid
+
+from services.structured_logging import reset_request_id, set_request_id
+
+# Accept a caller-supplied id (load balancer, frontend) only if it is short and safe to log
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,128}$")
+
+
+class RequestIdMiddleware:
+    """
+    Binds an `X-Request-ID` to the request's context so route, service and SQL
+    log lines can be correlated, and echoes it back on the response.
+    """
+
+    def __init__(self, app, header_name: str = "x-request-id"):
+        self.app = app
+        self.header_name = header_name.lower().encode("latin-1")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers", [])).get(self.header_name, b"").decode("latin-1")
+        request_id = incoming if _VALID_REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((self.header_name, request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = set_request_id(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            reset_request_id(token)
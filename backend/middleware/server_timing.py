@@ -0,0 +1,30 @@
+from services.request_context import begin_request_timings, end_request_timings
+
+
+class ServerTimingMiddleware:
+    """
+    Collects per-request DB / LLM / extraction time and reports it to the
+    browser as a `Server-Timing` response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings, token = begin_request_timings(scope)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing_header().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            end_request_timings(token)
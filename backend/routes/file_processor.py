@@ -1,36 +1,37 @@
-from fastapi import APIRouter, File, UploadFile, Depends, HTTPException
+from typing import Annotated
+from fastapi import APIRouter, File, UploadFile, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-import os, uuid
+import os
 from db.session import get_db
 from db.models import UploadedFile, Quiz, Question
 from services.gemini_service import build_quiz_from_content as generate_quiz_from_text
 from auth.utils import get_current_user
 from db.models import User
-import docx
-from docx.opc.exceptions import PackageNotFoundError
-from fitz import open as open_pdf, FileDataError
+from services.request_context import track
+from services.metrics import observe_extraction
+from services.lifecycle import llm_bound_request
+from services.admission import admission_slot
+from services.document_regions import build_regions
+from services.storage import discard_upload, ensure_blob, get_storage, retain_blob, uploaded_file_path
+from services.text_extraction import extract_text
 
 router = APIRouter()
-UPLOAD_DIR = "uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-def extract_text_from_uploaded_file(path: str, extension: str) -> str:
+def extract_text_from_uploaded_file(path: str, extension: str, first_page: int = 1, last_page: int | None = None,
+                                    txt_errors: str = "strict") -> str:
     """
     Extracts plain text from uploaded file depending on file type.
-    Supported types: PDF, DOCX, TXT.
+    Supported types: PDF, DOCX, TXT. Reads page by page and stops at the
+    EXTRACT_MAX_PAGES / EXTRACT_MAX_CHARS caps.
     """
-    extension = extension.lower()
+    # PyMuPDF and python-docx are imported on first use to keep worker boot fast
+    from docx.opc.exceptions import PackageNotFoundError
+    from pymupdf import FileDataError
+
     try:
-        if extension == ".pdf":
-            doc = open_pdf(path)
-            text = "\n".join([page.get_text() for page in doc])
-        elif extension == ".docx":
-            doc = docx.Document(path)
-            text = "\n".join([para.text for para in doc.paragraphs])
-        else:  # Assume .txt
-            with open(path, "r", encoding="utf-8", errors="strict") as f:
-                text = f.read()
+        text = extract_text(path, extension, first_page, last_page, txt_errors=txt_errors).text
 
         if not text.strip():
             raise HTTPException(status_code=400, detail="Uploaded file has no readable content.")
@@ -46,14 +47,18 @@ def extract_text_from_uploaded_file(path: str, extension: str) -> str:
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Error during text extraction: {str(e)}")
 
-@router.post("/", name="upload_file_and_generate_quiz")
+@router.post("/", name="upload_file_and_generate_quiz",
+             dependencies=[Depends(llm_bound_request), Depends(admission_slot("generation"))])
 async def handle_file_upload(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    first_page: Annotated[int, Query(ge=1)] = 1,
+    last_page: Annotated[int | None, Query(ge=1)] = None
 ):
     """
     Uploads a file, extracts text, generates quiz using Gemini, and stores result in DB.
+    `first_page` / `last_page` limit extraction to part of a PDF (paragraphs for DOCX).
     """
     # Validate file extension
     extension = os.path.splitext(file.filename)[1]
@@ -62,32 +67,43 @@ async def handle_file_upload(
     if extension.lower() not in allowed_exts:
         return JSONResponse(status_code=415, content={"error": "Unsupported file type."})
 
-    # Save the uploaded file to disk
-    unique_name = f"{uuid.uuid4().hex}{extension}"
-    saved_path = os.path.join(UPLOAD_DIR, unique_name)
-
-    with open(saved_path, "wb") as f:
-        f.write(await file.read())
+    # Store the content once per distinct file (streamed and hashed in chunks)
+    stored = await run_in_threadpool(get_storage().put, file.file)
+    retain_blob(db, stored)
 
     # Create DB record for file
     file_record = UploadedFile(
         user_id=current_user.id,
-        filename=unique_name,
+        filename=f"{stored.content_hash}{extension.lower()}",
         original_name=file.filename,
-        file_type=extension.lower().lstrip(".")
+        file_type=extension.lower().lstrip("."),
+        content_hash=stored.content_hash
     )
     db.add(file_record)
     db.commit()
     db.refresh(file_record)
+    await run_in_threadpool(ensure_blob, file.file, stored)
 
-    # Extract file content
-    extracted_text = extract_text_from_uploaded_file(saved_path, extension)
+    # Extract file content; an unreadable file is not kept
+    try:
+        with track("extract"), observe_extraction(file_record.file_type), uploaded_file_path(file_record) as saved_path:
+            extracted_text = await run_in_threadpool(
+                extract_text_from_uploaded_file, saved_path, extension, first_page, last_page
+            )
+    except HTTPException:
+        discard_upload(db, file_record)
+        raise
+
+    # Split the document into regions now, so its text is searchable straight away
+    file_id = file_record.id
+    file_record.region_count = await run_in_threadpool(build_regions, db, file_record)
+    db.commit()
 
     # Use Gemini to generate quiz questions
     quiz_items = await generate_quiz_from_text(extracted_text, db)
 
     # Create a new quiz entry
-    quiz_entry = Quiz(file_id=file_record.id)
+    quiz_entry = Quiz(file_id=file_id)
     db.add(quiz_entry)
     db.commit()
     db.refresh(quiz_entry)
@@ -105,10 +121,12 @@ async def handle_file_upload(
         )
         db.add(db_question)
 
+    # Read the id before commit expires it (saves a reload)
+    quiz_id = quiz_entry.id
     db.commit()
 
     return {
-        "quiz_id": quiz_entry.id,
+        "quiz_id": quiz_id,
         "questions": quiz_items,
-        "file_id": file_record.id
+        "file_id": file_id
     }
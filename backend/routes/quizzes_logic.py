@@ -1,15 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+import logging
+import time
+from typing import Literal
+
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from uuid import UUID
 
 from db.session import get_db
 from db.models import User, Quiz
 from auth.utils import get_current_user
+from routes.schemas import QuizDetailOut, QuizImportOut
+from services.bulk_import import QuizImportError, detect_format, import_quizzes, read_quizzes
+from services.structured_logging import log_event
 
 # Router to handle quiz data retrieval
 router = APIRouter()
 
-@router.get("/{quiz_id}")
+logger = logging.getLogger("nexera.import")
+
+
+@router.post("/import", response_model=QuizImportOut)
+def import_quiz_bank(
+    file: UploadFile = File(...),
+    format: Literal["json", "ndjson"] | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Imports an existing question bank (JSON or NDJSON, in the shape quiz
+    generation returns) as quizzes of the current user, without calling the
+    LLM. The format comes from `format` or the file extension. A quiz that
+    breaks the question rules is a 422 and nothing is imported.
+    """
+    fmt = detect_format(file.filename, format)
+    if fmt is None:
+        return JSONResponse(status_code=415, content={"error": "Unsupported file type."})
+
+    started = time.perf_counter()
+
+    def report(quizzes, questions):
+        log_event(logger, logging.INFO, "import.progress", quizzes=quizzes, questions=questions,
+                  seconds=round(time.perf_counter() - started, 3))
+
+    try:
+        result = import_quizzes(db, current_user.id, read_quizzes(file.file, fmt), file.filename, progress=report)
+    except QuizImportError as e:
+        db.rollback()
+        raise HTTPException(status_code=422, detail=str(e))
+    db.commit()
+    return result
+
+
+@router.get("/{quiz_id}", response_model=QuizDetailOut)
 def retrieve_quiz_details(
     quiz_id: UUID,
     db: Session = Depends(get_db),
@@ -1,95 +1,208 @@
-from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import JSONResponse
+from typing import Annotated, Literal
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from services.gemini_service import score_user_answers as score_user_responses
+from services.grading import grade_submission
+from services.quiz_cache import load_quiz_for_grading
+from services.answer_storage import compact_storage_enabled, decode_answers, encode_answers
+from services.score_histograms import record_score
+from services.export import MEDIA_TYPES, decode_cursor, export_attempts
+from services.mastery import record_answers
+from routes.schemas import AnsweredQuestionOut, SubmissionRequest
+from services.llm_resilience import LLMUnavailableError
+from services.request_coalescing import run_once
+from services.lifecycle import llm_bound_request
+from services.admission import admission_slot
+from services.structured_logging import log_event, summarize_payload
 from db.session import get_db
 from sqlalchemy.orm import Session
 from auth.utils import get_current_user
 from db.models import User, QuizAttempt, UserAnswer, Question
+import logging
 import uuid
 
+logger = logging.getLogger("nexera.grading")
+
 router = APIRouter()
 
-@router.post("/")
+@router.post("/", dependencies=[Depends(llm_bound_request), Depends(admission_slot("grading"))])
 async def evaluate_user_submission(
-    request: Request,
+    submission: SubmissionRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Annotated[str | None, Header(alias="Idempotency-Key")] = None
 ):
-    data = await request.json()
-    quiz_data = data.get("quizData")
-    user_answers = data.get("userAnswers")
-
-    if not isinstance(user_answers, (list, dict)):
-        raise HTTPException(status_code=422, detail="userAnswers must be a list or dict.")
-    
-    question_ids = [q["id"] for q in quiz_data["questions"]]
-    full_answer_list = []
-    for q in quiz_data["questions"]:
-        qid = str(q["id"])
-        matched = next((a for a in user_answers if str(a["id"]) == qid), None)
-        full_answer_list.append({
-            "id": qid,
-            "answer": matched["answer"] if matched else "Unanswered"
-        })
-    print("✅ Full answer list sent to Gemini:", full_answer_list)
-    
+    """
+    Grades {"quiz_id", "answers": {question_id: answer}}. Questions and answer
+    keys come from the server-side quiz, never from the client.
+    """
+    quiz_data = load_quiz_for_grading(db, submission.quiz_id)
+    if quiz_data is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
 
-    try:
-        evaluation = score_user_responses(quiz_data, user_answers)
-        print("📨 userAnswers received:", user_answers)
-        print("📨 quizData.questions count:", len(quiz_data.get("questions", [])))
-        print("🐞 Evaluation returned from Gemini scoring service:", evaluation)
-    except Exception as e:
-        print("Error while evaluating answers with Gemini:", e)
-        return JSONResponse(status_code=500, content={"error": "Failed to evaluate answers."})
-
-    new_attempt = QuizAttempt(user_id=current_user.id, quiz_id=quiz_data["quiz_id"], score=0)
-    db.add(new_attempt)
-    db.commit()
-    db.refresh(new_attempt)
-
-    score = 0
-    for res in evaluation["results"]:
-        is_correct = True if res.get("is_correct") is True else False if res.get("is_correct") is False else None
-        if is_correct:
-            score += 1
-        db.add(UserAnswer(
-            user_id=current_user.id,
-            attempt_id=new_attempt.id,
-            question_id=uuid.UUID(str(res["id"])),
-            answer=res.get("user_answer", "Unanswered"),
-            is_correct=is_correct
-        ))
-
-    new_attempt.score = score
-    db.commit()
-
-    # Return only the most recent attempt
-    return {
-        "quiz_id": quiz_data["quiz_id"],
-        "score": score,
-        "submitted_at": new_attempt.submitted_at,
-        "results": evaluation["results"]
-    }
-
-@router.get("/attempts")
+    submitted = {str(qid): answer for qid, answer in submission.answers.items()}
+    question_ids = {q["id"] for q in quiz_data["questions"]}
+    unknown = sorted(set(submitted) - question_ids)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Questions not in this quiz: {', '.join(unknown)}")
+
+    user_answers = [
+        {"id": q["id"], "answer": submitted.get(q["id"]) or "Unanswered"}
+        for q in quiz_data["questions"]
+    ]
+    log_event(logger, logging.DEBUG, "grading.payload", quiz_id=quiz_data["quiz_id"],
+              answers=lambda: summarize_payload(user_answers))
+
+    user_id = current_user.id
+
+    async def grade_and_store(db):
+        try:
+            # Runs off the event loop: retries may back off for several seconds.
+            # Answers already graded for the same question skip the LLM.
+            evaluation = await run_in_threadpool(grade_submission, quiz_data, user_answers, score_user_responses)
+            log_event(logger, logging.DEBUG, "grading.evaluation", quiz_id=quiz_data.get("quiz_id"),
+                      question_count=len(quiz_data.get("questions", [])),
+                      evaluation=lambda: summarize_payload(evaluation))
+        except LLMUnavailableError:
+            raise  # surfaced as 503 + Retry-After by the app-level handler
+        except Exception:
+            logger.exception("grading failed", extra={"event": "grading.failed", "quiz_id": quiz_data.get("quiz_id")})
+            return JSONResponse(status_code=500, content={"error": "Failed to evaluate answers."})
+
+        # Attempt and answers go in one flush; the score is known up front
+        new_attempt = QuizAttempt(id=uuid.uuid4(), user_id=user_id, quiz_id=submission.quiz_id, score=0)
+        db.add(new_attempt)
+
+        score = 0
+        stored = []
+        for res in evaluation["results"]:
+            is_correct = True if res.get("is_correct") is True else False if res.get("is_correct") is False else None
+            if is_correct:
+                score += 1
+            stored.append((uuid.UUID(str(res["id"])), res.get("user_answer", "Unanswered"), is_correct))
+
+        if compact_storage_enabled():
+            # One record on the attempt instead of a row per answer
+            new_attempt.answers_blob = encode_answers(stored)
+        else:
+            for question_id, answer, is_correct in stored:
+                db.add(UserAnswer(
+                    user_id=user_id,
+                    attempt_id=new_attempt.id,
+                    question_id=question_id,
+                    answer=answer,
+                    is_correct=is_correct
+                ))
+
+        new_attempt.score = score
+        record_score(db, submission.quiz_id, score)
+        record_answers(db, user_id, stored)
+        db.commit()
+        db.refresh(new_attempt)
+        log_event(logger, logging.INFO, "grading.completed", quiz_id=quiz_data.get("quiz_id"),
+                  attempt_id=new_attempt.id, score=score, question_count=len(evaluation["results"]),
+                  cache_hits=evaluation["cache"]["hits"])
+
+        # Return only the most recent attempt
+        return {
+            "quiz_id": quiz_data["quiz_id"],
+            "score": score,
+            "submitted_at": new_attempt.submitted_at,
+            "results": evaluation["results"]
+        }
+
+    # Double-clicks and client retries share one grading run and one attempt
+    return await run_once(
+        "grade", user_id, quiz_data["quiz_id"], submission.model_dump(mode="json"),
+        grade_and_store, idempotency_key=idempotency_key,
+    )
+
+@router.get("/attempts", response_model=list[AnsweredQuestionOut])
 def retrieve_all_attempts(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    attempts = db.query(QuizAttempt).filter(
-        QuizAttempt.user_id == current_user.id
-    ).order_by(QuizAttempt.submitted_at.desc()).all()
-
-    response_data = []
-    for attempt in attempts:
-        for ans in attempt.answers:
-            question = db.query(Question).get(ans.question_id)
-            response_data.append({
+    # One joined query instead of a Question lookup per stored answer. Attempts
+    # stored compactly (ANSWER_STORAGE_MODE=compact) come back as a single row
+    # carrying answers_blob; their questions are fetched in one extra query.
+    rows = (
+        db.query(
+            QuizAttempt.id.label("attempt_id"),
+            QuizAttempt.answers_blob,
+            UserAnswer.id.label("answer_id"),
+            UserAnswer.answer,
+            UserAnswer.is_correct,
+            Question.text,
+            Question.correct_answer,
+            Question.explanation,
+        )
+        .outerjoin(UserAnswer, UserAnswer.attempt_id == QuizAttempt.id)
+        .outerjoin(Question, UserAnswer.question_id == Question.id)
+        .filter(QuizAttempt.user_id == current_user.id)
+        .order_by(QuizAttempt.submitted_at.desc())
+        .all()
+    )
+
+    blobs = {}
+    for row in rows:
+        if row.answers_blob is not None and row.attempt_id not in blobs:
+            blobs[row.attempt_id] = decode_answers(row.answers_blob)
+    questions = {}
+    if blobs:
+        question_ids = {a.question_id for answers in blobs.values() for a in answers}
+        questions = {
+            q.id: q for q in db.query(
+                Question.id, Question.text, Question.correct_answer, Question.explanation
+            ).filter(Question.id.in_(question_ids)).all()
+        }
+
+    results = []
+    for row in rows:
+        if row.answer_id is not None:
+            results.append({
+                "question": row.text,
+                "user_answer": row.answer,
+                "correct_answer": row.correct_answer,
+                "explanation": row.explanation,
+                "is_correct": row.is_correct
+            })
+        for stored in blobs.pop(row.attempt_id, ()):
+            question = questions.get(stored.question_id)
+            if question is None:
+                continue  # same as the inner join for rows: answers to deleted questions are dropped
+            results.append({
                 "question": question.text,
-                "user_answer": ans.answer,
+                "user_answer": stored.answer,
                 "correct_answer": question.correct_answer,
                 "explanation": question.explanation,
-                "is_correct": ans.is_correct
+                "is_correct": stored.is_correct
             })
-    return response_data
+    return results
+
+
+@router.get("/attempts/export")
+def export_attempt_history(
+    format: Literal["csv", "ndjson"] = "csv",
+    after: Annotated[str | None, Query(max_length=200)] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Streams the user's whole attempt history, oldest first: CSV with one row
+    per answer, or NDJSON with one line per attempt. Rows are read through a
+    server-side cursor, so memory does not grow with the history.
+
+    Each row carries a `cursor`. To resume an interrupted download, pass the
+    cursor of the last attempt received in full as `?after=`.
+    """
+    try:
+        position = decode_cursor(after) if after else None
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    return StreamingResponse(
+        export_attempts(db.get_bind(), current_user.id, format, position),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="attempts.{format}"'},
+    )
@@ -0,0 +1,190 @@
+from datetime import datetime
+from typing import Annotated
+from uuid import UUID
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+# Largest quiz a single submission may answer, and longest answer per question
+MAX_ANSWERS = 500
+MAX_ANSWER_CHARS = 5000
+
+
+# ============================
+# Pydantic Schemas for Quiz Submissions
+# ============================
+
+# Answers for one quiz. Questions and answer keys are loaded server-side.
+class SubmissionRequest(BaseModel):
+    quiz_id: UUID
+    answers: dict[UUID, Annotated[str, Field(max_length=MAX_ANSWER_CHARS)] | None] = Field(
+        default_factory=dict, max_length=MAX_ANSWERS
+    )
+
+    @model_validator(mode="before")
+    @classmethod
+    def from_legacy_payload(cls, data):
+        """
+        Older clients POST {"quizData": {...}, "userAnswers": [...]}. Only the
+        quiz id and the answers are kept; the client's copy of the questions
+        and answer keys is ignored.
+        """
+        if not isinstance(data, dict) or "quizData" not in data:
+            return data
+        user_answers = data.get("userAnswers")
+        if isinstance(user_answers, list):
+            pairs = ((a.get("id"), a.get("answer")) for a in user_answers if isinstance(a, dict))
+        elif isinstance(user_answers, dict):
+            pairs = user_answers.items()
+        else:
+            raise ValueError("userAnswers must be a list or dict.")
+        return {
+            "quiz_id": (data.get("quizData") or {}).get("quiz_id"),
+            "answers": {qid: None if answer is None else str(answer) for qid, answer in pairs},
+        }
+
+
+# ============================
+# Response Schemas for Dashboard, Quiz and History Routes
+# ============================
+# Only the listed fields are sent; ORM rows are read through from_attributes,
+# so internal columns (stored filename, content hash, owner id) never leak.
+
+class QuestionOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    text: str | None = None
+    options: list | None = None
+    correct_answer: str | None = None
+    explanation: str | None = None
+    question_type: str = "mcq"
+
+
+class QuizSectionOut(BaseModel):
+    section_number: int
+    quiz_id: UUID
+    region_index: int | None = None
+    questions: list[QuestionOut]
+
+
+class QuizDetailOut(BaseModel):
+    quiz_id: UUID
+    created_at: datetime | None = None
+    questions: list[QuestionOut]
+
+
+class QuizImportOut(BaseModel):
+    quizzes: int
+    questions: int
+    quiz_ids: list[UUID]
+
+
+class DashboardQuizOut(BaseModel):
+    quiz_id: UUID
+    file_name: str | None = None
+    created_at: datetime | None = None
+    question_count: int
+
+
+class UploadedFileOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    original_name: str | None = None
+    file_type: str | None = None
+    uploaded_at: datetime | None = None
+
+
+class HistoryEntryOut(BaseModel):
+    quiz_id: UUID
+    label: str
+    score: int | None = None
+    submitted_at: datetime | None = None
+    num_questions: int
+
+
+class AttemptSummaryOut(BaseModel):
+    label: str
+    score: int | None = None
+    submitted_at: datetime | None = None
+    num_questions: int
+
+
+class AnsweredQuestionOut(BaseModel):
+    question: str | None = None
+    user_answer: str | None = None
+    correct_answer: str | None = None
+    explanation: str | None = None
+    is_correct: bool | None = None
+
+
+class WeeklyScoreOut(BaseModel):
+    week_start: str
+    avg_score: float
+
+
+class ScoreBucketOut(BaseModel):
+    score: int
+    attempts: int
+
+
+class ScoreDistributionOut(BaseModel):
+    quiz_id: UUID
+    total_attempts: int
+    score: int | None = None  # the user's latest score on the quiz
+    percentile: float | None = None
+    histogram: list[ScoreBucketOut]
+
+
+class QuestionAnalyticsOut(BaseModel):
+    question_id: UUID
+    quiz_id: UUID
+    text: str | None = None
+    question_type: str = "mcq"
+    attempts: int
+    correct: int
+    correct_rate: float | None = None
+    answer_distribution: dict[str, int] | None = None  # MCQ only: answer -> times picked
+
+
+class QuizAnalyticsOut(BaseModel):
+    quiz_id: UUID
+    total_attempts: int
+    questions: list[QuestionAnalyticsOut]
+
+
+class FileAnalyticsOut(BaseModel):
+    file_id: UUID
+    total_attempts: int
+    questions: list[QuestionAnalyticsOut]
+
+
+class ReviewQuestionOut(QuestionOut):
+    quiz_id: UUID
+    last_correct: bool
+    streak: int
+    last_answered_at: datetime
+    next_due_at: datetime
+
+
+class ReviewSetOut(BaseModel):
+    generated_at: datetime
+    questions: list[ReviewQuestionOut]
+
+
+class SearchHitOut(BaseModel):
+    kind: str  # "file", "question" or "document" (a region of the extracted text)
+    rank: float
+    file_id: UUID
+    file_name: str | None = None
+    quiz_id: UUID | None = None  # questions only
+    question_id: UUID | None = None
+    region_index: int | None = None  # documents only
+    title: str | None = None
+    snippet: str | None = None
+
+
+class SearchResultsOut(BaseModel):
+    query: str
+    total: int
+    results: list[SearchHitOut]
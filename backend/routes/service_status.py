@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Response
+
+from auth.utils import get_current_user
+from db.session import engine
+from services.grading_cache import get_grading_cache
+from services.llm_resilience import get_resilience_state
+from services.metrics import render_metrics, update_pool_gauges
+
+# Router exposing operational state for dashboards and health checks
+router = APIRouter()
+# Prometheus scrape target, mounted at the root path
+metrics_router = APIRouter()
+
+
+@router.get("/llm")
+def llm_resilience_status():
+    """
+    Returns the Gemini circuit breaker state, rate limiter fill level and
+    retry counters for this worker process.
+    """
+    return get_resilience_state()
+
+
+@router.get("/grading-cache", dependencies=[Depends(get_current_user)])
+def grading_cache_status():
+    """
+    Size of this worker's grading cache and how many answers, across all
+    quizzes, were served from it versus sent to the LLM. Signed-in users only.
+    """
+    return get_grading_cache().stats()
+
+
+@metrics_router.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """
+    Request latency per route template, LLM call latency and payload sizes,
+    extraction time per file type and DB pool usage, in Prometheus text format.
+    """
+    update_pool_gauges(engine)
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
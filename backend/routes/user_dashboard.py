@@ -1,18 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from auth.utils import get_current_user
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.orm import Session, contains_eager, selectinload
+from sqlalchemy import func, select, and_
 from db.session import get_db
 from db.models import Quiz, UploadedFile, Question, User, QuizAttempt
 
 from services.gemini_service import expand_quiz_with_new_items as generate_additional_questions
+from services.request_coalescing import run_once
+from services.request_context import track
+from services.metrics import observe_extraction
+from services.lifecycle import llm_bound_request
+from services.admission import admission_slot
+from services.storage import uploaded_file_chunks, uploaded_file_path
+from services.document_regions import build_regions, claim_next_region, release_region
+from services.score_histograms import score_distribution
+from services.question_analytics import file_analytics, quiz_analytics
+from services.mastery import REVIEW_SET_SIZE, review_set
+from services.search import search
+from services.bulk_import import IMPORTED_FILE_TYPE
+from services.text_extraction import extract_text
 import json
-import fitz  # PyMuPDF
-from docx import Document
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pydantic import BaseModel
 from auth.schemas import ProfileUpdate
+from routes.schemas import (
+    AttemptSummaryOut,
+    DashboardQuizOut,
+    FileAnalyticsOut,
+    HistoryEntryOut,
+    QuizAnalyticsOut,
+    QuizSectionOut,
+    ReviewSetOut,
+    ScoreDistributionOut,
+    SearchResultsOut,
+    UploadedFileOut,
+    WeeklyScoreOut,
+)
 
 
 
@@ -27,12 +54,19 @@ def get_current_user_details(current_user: User = Depends(get_current_user)):
     return {"id": current_user.id, "email": current_user.email}
 
 
-@router.get("/dashboard")
+@router.get("/dashboard", response_model=list[DashboardQuizOut])
 def fetch_dashboard_summary(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Returns metadata for all quizzes created from user's uploaded files."""
+    # File name and question count come back in the same row (no per-quiz lazy loads)
+    question_count = (
+        select(func.count(Question.id))
+        .where(Question.quiz_id == Quiz.id)
+        .correlate(Quiz)
+        .scalar_subquery()
+    )
     associated_quizzes = (
-        db.query(Quiz)
-        .join(UploadedFile)
+        db.query(Quiz.id, Quiz.created_at, UploadedFile.original_name, question_count.label("question_count"))
+        .join(UploadedFile, Quiz.file_id == UploadedFile.id)
         .filter(UploadedFile.user_id == current_user.id)
         .all()
     )
@@ -40,37 +74,83 @@ def fetch_dashboard_summary(db: Session = Depends(get_db), current_user: User =
     return [
         {
             "quiz_id": q.id,
-            "file_name": q.file.original_name,
+            "file_name": q.original_name,
             "created_at": q.created_at,
-            "question_count": len(q.questions),
+            "question_count": q.question_count,
         }
         for q in associated_quizzes
     ]
 
 
-@router.get("/dashboard/files")
+@router.get("/dashboard/files", response_model=list[UploadedFileOut])
 def list_user_files(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     return db.query(UploadedFile).filter(UploadedFile.user_id == current_user.id).all()
 
 
-@router.get("/dashboard/files/{file_id}/sections")
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "txt": "text/plain; charset=utf-8",
+}
+
+
+@router.get("/dashboard/files/{file_id}/download")
+def download_user_file(file_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Streams the original upload back in chunks, from local disk or object storage."""
+    file_record = db.query(UploadedFile).filter(
+        UploadedFile.id == file_id,
+        UploadedFile.user_id == current_user.id
+    ).first()
+    if not file_record:
+        raise HTTPException(status_code=404, detail="File not found")
+    if file_record.file_type == IMPORTED_FILE_TYPE:
+        raise HTTPException(status_code=409, detail="Imported question banks have no document to download.")
+
+    download_name = (file_record.original_name or file_record.filename).replace('"', "")
+    return StreamingResponse(
+        uploaded_file_chunks(file_record),
+        media_type=CONTENT_TYPES.get(file_record.file_type, "application/octet-stream"),
+        headers={"Content-Disposition": f'attachment; filename="{download_name}"'},
+    )
+
+
+@router.get("/dashboard/files/{file_id}/sections", response_model=list[QuizSectionOut])
 def get_quiz_sections_by_file(file_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Returns quizzes and their questions derived from a specific uploaded file."""
-    file_quizzes = db.query(Quiz).filter(Quiz.file_id == file_id).all()
+    file_quizzes = (
+        db.query(Quiz)
+        .filter(Quiz.file_id == file_id)
+        .options(selectinload(Quiz.questions))
+        .order_by(Quiz.created_at.asc())
+        .all()
+    )
     section_data = []
     for index, quiz in enumerate(file_quizzes):
-        questions = db.query(Question).filter(Question.quiz_id == quiz.id).all()
         section_data.append({
             "section_number": index + 1,
             "quiz_id": quiz.id,
-            "questions": questions
+            "region_index": quiz.region_index,
+            "questions": quiz.questions
         })
     return section_data
 
 
-@router.post("/dashboard/files/{file_id}/generate")
-async def create_additional_quiz(file_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    """Generates new quiz section using Gemini and stores in DB."""
+@router.post("/dashboard/files/{file_id}/generate",
+             dependencies=[Depends(llm_bound_request), Depends(admission_slot("generation"))])
+async def create_additional_quiz(
+    file_id: UUID,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    idempotency_key: Annotated[str | None, Header(alias="Idempotency-Key")] = None,
+    first_page: Annotated[int, Query(ge=1)] = 1,
+    last_page: Annotated[int | None, Query(ge=1)] = None
+):
+    """
+    Generates new quiz section using Gemini and stores in DB. By default each
+    call takes the next region of the document (split once, on first use), so
+    the prompt stays the same size however long the file is. `first_page` /
+    `last_page` instead generate from that part of the document.
+    """
     file_record = db.query(UploadedFile).filter(
         UploadedFile.id == file_id,
         UploadedFile.user_id == current_user.id
@@ -78,66 +158,95 @@ async def create_additional_quiz(file_id: UUID, db: Session = Depends(get_db), c
 
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
+    if file_record.file_type == IMPORTED_FILE_TYPE:
+        raise HTTPException(status_code=409, detail="Imported question banks have no document to generate questions from.")
+
+    use_regions = first_page == 1 and last_page is None
+    file_type = file_record.file_type
+
+    async def store_section(db, raw_text, region):
+        # Only questions from the same region can repeat its material
+        prior_questions = db.query(Question.text).join(Quiz).filter(Quiz.file_id == file_id)
+        if region is not None:
+            prior_questions = prior_questions.filter(Quiz.region_index == region.index)
+        existing_texts = [q.text for q in prior_questions.all()]
+
+        # Generate questions from Gemini
+        response = await generate_additional_questions(raw_text, existing_texts, db)
+
+        try:
+            if isinstance(response, str):
+                response = response.strip("```json").strip("```").strip()
+                questions = json.loads(response)
+            elif isinstance(response, list):
+                questions = response
+            else:
+                raise ValueError("Unsupported Gemini response format")
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            raise HTTPException(status_code=500, detail=f"Gemini returned invalid JSON: {e}")
+
+        # Save new quiz section
+        new_quiz = Quiz(file_id=file_id, region_index=region.index if region else None)
+        db.add(new_quiz)
+        db.flush()
+
+        for item in questions:
+            db.add(Question(
+                quiz_id=new_quiz.id,
+                text=item["question"],
+                options=item.get("options"),
+                correct_answer=item["answer"],
+                explanation=item.get("explanation", ""),
+                question_type=item.get("question_type", "mcq")
+            ))
+        quiz_id = new_quiz.id
+        db.commit()
+        section_number = db.query(func.count(Quiz.id)).filter(Quiz.file_id == file_id).scalar()
+
+        return {
+            "quiz_id": quiz_id,
+            "section_number": section_number,
+            "region_index": region.index if region else None,
+            "questions": questions
+        }
 
-    # Extract file content
-    try:
-        path = f"uploads/{file_record.filename}"
-        if file_record.file_type == 'pdf':
-            doc = fitz.open(path)
-            raw_text = "\n".join([p.get_text() for p in doc])
-        elif file_record.file_type == 'docx':
-            doc = Document(path)
-            raw_text = "\n".join([p.text for p in doc.paragraphs])
-        else:
-            with open(path, "r", encoding="utf-8", errors="ignore") as file:
-                raw_text = file.read()
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error reading {file_record.file_type} file: {e}")
-
-    existing_texts = [
-        q.text for q in db.query(Question.text)
-        .join(Quiz).filter(Quiz.file_id == file_id)
-        .all()
-    ]
-
-    # Generate questions from Gemini
-    response = await generate_additional_questions(raw_text, existing_texts, db)
-
-    try:
-        if isinstance(response, str):
-            response = response.strip("```json").strip("```").strip()
-            questions = json.loads(response)
-        elif isinstance(response, list):
-            questions = response
-        else:
-            raise ValueError("Unsupported Gemini response format")
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Gemini returned invalid JSON: {e}")
-
-    # Save new quiz section
-    new_quiz = Quiz(file_id=file_id)
-    db.add(new_quiz)
-    db.commit()
-    db.refresh(new_quiz)
-
-    for item in questions:
-        db.add(Question(
-            quiz_id=new_quiz.id,
-            text=item["question"],
-            options=item.get("options"),
-            correct_answer=item["answer"],
-            explanation=item.get("explanation", ""),
-            question_type=item.get("question_type", "mcq")
-        ))
-    db.commit()
-
-    return {
-        "quiz_id": new_quiz.id,
-        "section_number": len(existing_texts) // 5 + 1,
-        "questions": questions
-    }
+    async def generate_section(db):
+        # The request's copy of the row, attached to this session without reloading it
+        upload = db.merge(file_record, load=False)
+        # Extract file content: the next region, or the requested page range
+        region = None
+        try:
+            with track("extract"), observe_extraction(file_type):
+                if use_regions:
+                    region_count = await run_in_threadpool(build_regions, db, upload)
+                    region = claim_next_region(db, upload, region_count)
+                if region is None:
+                    with uploaded_file_path(upload) as path:
+                        extracted = await run_in_threadpool(
+                            extract_text, path, file_type, first_page, last_page, txt_errors="ignore"
+                        )
+                    raw_text = extracted.text
+                else:
+                    raw_text = region.text
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error reading {file_type} file: {e}")
+
+        try:
+            return await store_section(db, raw_text, region)
+        except BaseException:
+            if region is not None:
+                # No section was stored for the region: hand it to the next call
+                db.rollback()
+                release_region(db, file_id, region)
+            raise
+
+    # A double-click must not call Gemini twice or create a duplicate Quiz
+    return await run_once(
+        "generate", current_user.id, file_id, {"first_page": first_page, "last_page": last_page},
+        generate_section, idempotency_key=idempotency_key,
+    )
 
 
 @router.get("/profile")
@@ -168,13 +277,53 @@ def edit_profile(update: ProfileUpdate, db: Session = Depends(get_db), current_u
     }
 
 
-@router.get("/dashboard/history")
+def section_numbers_for_files(db: Session, file_ids) -> dict:
+    """Maps quiz_id -> 1-based section number within its file (by creation order)."""
+    if not file_ids:
+        return {}
+    rows = (
+        db.query(Quiz.id, Quiz.file_id)
+        .filter(Quiz.file_id.in_(file_ids))
+        .order_by(Quiz.created_at.asc())
+        .all()
+    )
+    sections, seen_per_file = {}, {}
+    for quiz_id, file_id in rows:
+        seen_per_file[file_id] = seen_per_file.get(file_id, 0) + 1
+        sections[quiz_id] = seen_per_file[file_id]
+    return sections
+
+
+def question_counts_for_quizzes(db: Session, quiz_ids) -> dict:
+    if not quiz_ids:
+        return {}
+    rows = (
+        db.query(Question.quiz_id, func.count(Question.id))
+        .filter(Question.quiz_id.in_(quiz_ids))
+        .group_by(Question.quiz_id)
+        .all()
+    )
+    return dict(rows)
+
+
+@router.get("/dashboard/history", response_model=list[HistoryEntryOut])
 def get_user_quiz_history(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Get the most recent quiz attempts per quiz by the user."""
+    latest_per_quiz = (
+        select(QuizAttempt.quiz_id, func.max(QuizAttempt.submitted_at).label("latest_at"))
+        .where(QuizAttempt.user_id == current_user.id)
+        .group_by(QuizAttempt.quiz_id)
+        .subquery()
+    )
     attempts = (
         db.query(QuizAttempt)
-        .join(Quiz)
-        .join(UploadedFile)
+        .join(latest_per_quiz, and_(
+            QuizAttempt.quiz_id == latest_per_quiz.c.quiz_id,
+            QuizAttempt.submitted_at == latest_per_quiz.c.latest_at,
+        ))
+        .join(QuizAttempt.quiz)
+        .join(Quiz.file)
+        .options(contains_eager(QuizAttempt.quiz).contains_eager(Quiz.file))
         .filter(QuizAttempt.user_id == current_user.id)
         .order_by(QuizAttempt.submitted_at.desc())
         .all()
@@ -185,29 +334,27 @@ def get_user_quiz_history(db: Session = Depends(get_db), current_user: User = De
         if a.quiz_id not in latest_attempts:
             latest_attempts[a.quiz_id] = a
 
+    # Section numbers and question counts for every quiz in two grouped queries
+    sections = section_numbers_for_files(db, {a.quiz.file_id for a in latest_attempts.values()})
+    question_counts = question_counts_for_quizzes(db, list(latest_attempts))
+
     history = []
     for attempt in latest_attempts.values():
-        quiz = db.query(Quiz).filter(Quiz.id == attempt.quiz_id).first()
-        file = db.query(UploadedFile).filter(UploadedFile.id == quiz.file_id).first()
-
-        if not quiz or not file:
-            continue
-
-        quizzes_for_file = db.query(Quiz).filter(Quiz.file_id == file.id).order_by(Quiz.created_at.asc()).all()
-        section = next((i + 1 for i, q in enumerate(quizzes_for_file) if q.id == quiz.id), None)
+        quiz = attempt.quiz
+        file = quiz.file
 
         history.append({
             "quiz_id": quiz.id,
-            "label": f"{file.original_name} - Section {section}",
+            "label": f"{file.original_name} - Section {sections.get(quiz.id)}",
             "score": attempt.score,
             "submitted_at": attempt.submitted_at,
-            "num_questions": len(quiz.questions)
+            "num_questions": question_counts.get(quiz.id, 0)
         })
 
     return history
 
 
-@router.get("/dashboard/quiz/{quiz_id}/attempts")
+@router.get("/dashboard/quiz/{quiz_id}/attempts", response_model=list[AttemptSummaryOut])
 def get_attempt_details(quiz_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Returns all attempts made by user for a given quiz."""
     quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
@@ -237,7 +384,87 @@ def get_attempt_details(quiz_id: UUID, db: Session = Depends(get_db), current_us
     ]
 
 
-@router.get("/dashboard/weekly-scores")
+@router.get("/dashboard/quiz/{quiz_id}/percentile", response_model=ScoreDistributionOut)
+def get_score_percentile(quiz_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """
+    Where the user's latest score on a quiz sits among all attempts at it.
+    Served from the quiz's score histogram, so the cost does not grow with the
+    number of attempts.
+    """
+    latest = (
+        db.query(QuizAttempt.score)
+        .filter(QuizAttempt.user_id == current_user.id, QuizAttempt.quiz_id == quiz_id)
+        .order_by(QuizAttempt.submitted_at.desc())
+        .first()
+    )
+    distribution = score_distribution(db, quiz_id)
+    score = latest.score if latest is not None else None
+
+    return {
+        "quiz_id": quiz_id,
+        "total_attempts": distribution.total,
+        "score": score,
+        "percentile": distribution.percentile(score) if score is not None else None,
+        "histogram": [{"score": bucket, "attempts": count} for bucket, count in distribution.buckets],
+    }
+
+
+@router.get("/dashboard/quiz/{quiz_id}/analytics", response_model=QuizAnalyticsOut)
+def get_quiz_analytics(quiz_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Per-question correct rate, attempt count and MCQ answer distribution, hardest first."""
+    owned = db.query(Quiz.id).join(UploadedFile, UploadedFile.id == Quiz.file_id).filter(
+        Quiz.id == quiz_id,
+        UploadedFile.user_id == current_user.id
+    ).first()
+    if not owned:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    return quiz_analytics(db, quiz_id)
+
+
+@router.get("/dashboard/files/{file_id}/analytics", response_model=FileAnalyticsOut)
+def get_file_analytics(file_id: UUID, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Question analytics across every section generated from a file, hardest first."""
+    owned = db.query(UploadedFile.id).filter(
+        UploadedFile.id == file_id,
+        UploadedFile.user_id == current_user.id
+    ).first()
+    if not owned:
+        raise HTTPException(status_code=404, detail="File not found")
+    return file_analytics(db, file_id)
+
+
+@router.get("/dashboard/review", response_model=ReviewSetOut)
+def get_review_set(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    limit: Annotated[int, Query(ge=1, le=100)] = REVIEW_SET_SIZE
+):
+    """
+    A review quiz across all the user's files: questions they got wrong last
+    time or have not seen for longer than their review interval, most overdue
+    first. Read from the question_mastery table that submissions keep current.
+    """
+    now = datetime.now(timezone.utc)
+    return {"generated_at": now, "questions": review_set(db, current_user.id, limit, now)}
+
+
+@router.get("/dashboard/search", response_model=SearchResultsOut)
+def search_user_content(
+    q: Annotated[str, Query(min_length=1, max_length=200)],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    limit: Annotated[int, Query(ge=1, le=50)] = 20,
+    offset: Annotated[int, Query(ge=0)] = 0
+):
+    """
+    Searches the user's file names, questions, explanations and extracted
+    document text. Best matches first; every word of `q` must match the start
+    of a word.
+    """
+    return search(db, current_user.id, q, limit, offset)
+
+
+@router.get("/dashboard/weekly-scores", response_model=list[WeeklyScoreOut])
 def weekly_average_scores(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     """Returns weekly average scores for the last 3 months (approx. 13 weeks)."""
     start = datetime.utcnow().date() - timedelta(days=90)
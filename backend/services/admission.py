@@ -0,0 +1,170 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+
+from fastapi import Depends, Request
+from fastapi.responses import JSONResponse
+
+from auth.utils import get_current_user
+from db.models import User
+from services.metrics import ADMISSION_IN_USE, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT
+
+# Admission control for the LLM-bound routes, per worker process. Each route
+# class has its own concurrency limit and a short wait queue; all classes share
+# ADMISSION_TOTAL_CONCURRENCY slots, and a freed slot goes to queued grading
+# before queued generation. A full queue is an immediate 429; a request that
+# waits longer than ADMISSION_QUEUE_TIMEOUT is a 503. Both carry Retry-After.
+# The slot is taken by a route dependency once the request is authenticated and
+# its body read; everything else (dashboards, /user/me, ...) is never queued.
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+ADMISSION_TOTAL_CONCURRENCY = int(os.getenv("ADMISSION_TOTAL_CONCURRENCY", "8"))
+ADMISSION_GRADING_CONCURRENCY = int(os.getenv("ADMISSION_GRADING_CONCURRENCY", "8"))
+ADMISSION_GRADING_QUEUE = int(os.getenv("ADMISSION_GRADING_QUEUE", "32"))
+# Below the total, so generation can never take the slots grading needs
+ADMISSION_GENERATION_CONCURRENCY = int(os.getenv("ADMISSION_GENERATION_CONCURRENCY", "4"))
+ADMISSION_GENERATION_QUEUE = int(os.getenv("ADMISSION_GENERATION_QUEUE", "8"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+
+MAX_RETRY_AFTER = 60
+SERVICE_TIME_SMOOTHING = 0.2  # weight of the newest request in a class's average service time
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, message: str, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+async def handle_admission_rejected(request: Request, exc: AdmissionRejected):
+    """Exception handler: the rejection as {"error": ...} with its status and Retry-After."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+class Pool:
+    def __init__(self, name: str, concurrency: int, queue_limit: int, priority: int, service_time: float = 5.0):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_limit = queue_limit
+        self.priority = priority  # lower is served first
+        self.in_use = 0
+        self.waiters = deque()
+        self.service_time = service_time  # seconds, smoothed; for Retry-After
+
+    def retry_after(self) -> int:
+        """Seconds until the queue ahead has likely drained."""
+        estimate = self.service_time * (len(self.waiters) + 1) / max(self.concurrency, 1)
+        return min(MAX_RETRY_AFTER, max(1, math.ceil(estimate)))
+
+
+class AdmissionController:
+    """Slots for LLM-bound requests. Runs on the event loop only, so it needs no lock."""
+
+    def __init__(self, pools: list, total: int, queue_timeout: float):
+        self.pools = {pool.name: pool for pool in pools}
+        self._by_priority = sorted(pools, key=lambda pool: pool.priority)
+        self.total = total
+        self.in_use = 0
+        self.queue_timeout = queue_timeout
+
+    def _can_start(self, pool: Pool) -> bool:
+        return pool.in_use < pool.concurrency and self.in_use < self.total
+
+    def _take(self, pool: Pool):
+        pool.in_use += 1
+        self.in_use += 1
+        ADMISSION_IN_USE.labels(pool.name).inc()
+
+    def _dispatch(self):
+        """Hands free slots to queued requests, higher-priority classes first."""
+        for pool in self._by_priority:
+            while pool.waiters and self._can_start(pool):
+                waiter = pool.waiters.popleft()
+                ADMISSION_QUEUE_DEPTH.labels(pool.name).dec()
+                if not waiter.done():
+                    self._take(pool)
+                    waiter.set_result(None)
+
+    def _reject(self, pool: Pool, status_code: int, reason: str, message: str):
+        ADMISSION_REJECTED.labels(pool.name, reason).inc()
+        raise AdmissionRejected(status_code, message, pool.retry_after())
+
+    async def acquire(self, name: str) -> float:
+        """Waits for a slot of class `name`; returns the seconds waited. AdmissionRejected if none comes."""
+        pool = self.pools[name]
+        if len(pool.waiters) >= pool.queue_limit and not self._can_start(pool):
+            ADMISSION_WAIT.labels(name, "queue_full").observe(0)
+            self._reject(pool, 429, "queue_full", "Too many requests of this kind are waiting, retry later.")
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        pool.waiters.append(waiter)
+        ADMISSION_QUEUE_DEPTH.labels(name).inc()
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # Admitted just as the wait ended: give the slot back
+                self.release(name)
+            else:
+                waiter.cancel()
+                pool.waiters.remove(waiter)
+                ADMISSION_QUEUE_DEPTH.labels(name).dec()
+            waited = time.perf_counter() - started
+            if isinstance(e, asyncio.CancelledError):
+                ADMISSION_WAIT.labels(name, "cancelled").observe(waited)
+                raise
+            ADMISSION_WAIT.labels(name, "timeout").observe(waited)
+            self._reject(pool, 503, "timeout", "The server is busy, retry later.")
+        waited = time.perf_counter() - started
+        ADMISSION_WAIT.labels(name, "admitted").observe(waited)
+        return waited
+
+    def release(self, name: str, service_time: float | None = None):
+        pool = self.pools[name]
+        pool.in_use -= 1
+        self.in_use -= 1
+        ADMISSION_IN_USE.labels(name).dec()
+        if service_time is not None:
+            pool.service_time += SERVICE_TIME_SMOOTHING * (service_time - pool.service_time)
+        self._dispatch()
+
+
+def default_controller() -> AdmissionController:
+    return AdmissionController(
+        [Pool("grading", ADMISSION_GRADING_CONCURRENCY, ADMISSION_GRADING_QUEUE, priority=0),
+         Pool("generation", ADMISSION_GENERATION_CONCURRENCY, ADMISSION_GENERATION_QUEUE, priority=1)],
+        total=ADMISSION_TOTAL_CONCURRENCY,
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+    )
+
+
+admission_controller = default_controller()
+
+
+def admission_slot(name: str, controller: AdmissionController | None = None, enabled: bool | None = None):
+    """
+    Route dependency holding a `name` slot until the route returns. FastAPI
+    reads the body before it solves dependencies and this one waits for
+    get_current_user, so uploads in progress and unauthenticated requests
+    never take a slot. AdmissionRejected when none comes (see main).
+    """
+    async def hold_slot(current_user: User = Depends(get_current_user)):
+        if not (ADMISSION_ENABLED if enabled is None else enabled):
+            yield
+            return
+        slots = controller or admission_controller
+        await slots.acquire(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            slots.release(name, time.perf_counter() - started)
+
+    return hold_slot
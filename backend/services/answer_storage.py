@@ -0,0 +1,170 @@
+import os
+import struct
+import uuid
+import zlib
+from typing import NamedTuple
+
+# "rows": one user_answers row per answered question (the original layout).
+# "compact": the attempt's answers in a single encoded record on
+# quiz_attempts.answers_blob, no user_answers rows. Readers handle both, so the
+# mode can be switched at any time.
+ANSWER_STORAGE_MODE = os.getenv("ANSWER_STORAGE_MODE", "rows").lower()
+
+FORMAT_VERSION = 1
+FLAG_ZLIB = 0x80  # answers section is zlib-compressed
+_HEADER = struct.Struct(">BH")  # version | flags, answer count
+
+
+class StoredAnswer(NamedTuple):
+    question_id: uuid.UUID
+    answer: str | None
+    is_correct: bool | None
+
+
+def compact_storage_enabled() -> bool:
+    return ANSWER_STORAGE_MODE == "compact"
+
+
+# === Encoding ===
+# version|flags (1 byte) | count (2 bytes)
+# question ids          count x 16 bytes
+# graded bitmap         ceil(count / 8) bytes: is_correct is not None
+# correct bitmap        ceil(count / 8) bytes: is_correct is True
+# answers               count x (varint length + UTF-8), zlib'd when smaller
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _read_varint(data: bytes, offset: int):
+    shift = result = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
+
+
+def encode_answers(answers) -> bytes:
+    """Packs (question_id, answer, is_correct) triples into one record."""
+    answers = list(answers)
+    count = len(answers)
+    bitmap_len = (count + 7) // 8
+    graded, correct = bytearray(bitmap_len), bytearray(bitmap_len)
+    ids, texts = bytearray(), bytearray()
+    for index, (question_id, answer, is_correct) in enumerate(answers):
+        ids += uuid.UUID(str(question_id)).bytes
+        if is_correct is not None:
+            graded[index // 8] |= 1 << (index % 8)
+            if is_correct:
+                correct[index // 8] |= 1 << (index % 8)
+        # 0 means NULL, otherwise length + 1
+        encoded = None if answer is None else str(answer).encode("utf-8")
+        texts += _varint(0 if encoded is None else len(encoded) + 1)
+        if encoded:
+            texts += encoded
+
+    flags = 0
+    packed = zlib.compress(bytes(texts), 6)
+    if len(packed) < len(texts):
+        texts, flags = packed, FLAG_ZLIB
+    return _HEADER.pack(FORMAT_VERSION | flags, count) + bytes(ids) + bytes(graded) + bytes(correct) + bytes(texts)
+
+
+def decode_answers(blob: bytes) -> list:
+    """Inverse of encode_answers; returns StoredAnswer tuples in stored order."""
+    version_flags, count = _HEADER.unpack_from(blob, 0)
+    if version_flags & ~FLAG_ZLIB != FORMAT_VERSION:
+        raise ValueError(f"Unknown answer record version {version_flags & ~FLAG_ZLIB}")
+    offset = _HEADER.size
+    ids = [uuid.UUID(bytes=bytes(blob[offset + 16 * i: offset + 16 * (i + 1)])) for i in range(count)]
+    offset += 16 * count
+    bitmap_len = (count + 7) // 8
+    graded = blob[offset: offset + bitmap_len]
+    correct = blob[offset + bitmap_len: offset + 2 * bitmap_len]
+    texts = bytes(blob[offset + 2 * bitmap_len:])
+    if version_flags & FLAG_ZLIB:
+        texts = zlib.decompress(texts)
+
+    answers, position = [], 0
+    for index in range(count):
+        length, position = _read_varint(texts, position)
+        answer = None
+        if length:
+            answer = texts[position: position + length - 1].decode("utf-8")
+            position += length - 1
+        is_correct = None
+        if graded[index // 8] >> (index % 8) & 1:
+            is_correct = bool(correct[index // 8] >> (index % 8) & 1)
+        answers.append(StoredAnswer(ids[index], answer, is_correct))
+    return answers
+
+
+# === Conversion between the two layouts (the 0003 migration has its own copy) ===
+def convert_rows_to_compact(connection, batch_size: int = 1000) -> int:
+    """
+    Moves user_answers rows into quiz_attempts.answers_blob, `batch_size`
+    attempts at a time, deleting the rows it converted. Returns attempts converted.
+    """
+    from sqlalchemy import bindparam, delete, select, update
+
+    from db.models import QuizAttempt, UserAnswer
+
+    answers, attempts = UserAnswer.__table__, QuizAttempt.__table__
+    set_blob = update(attempts).where(attempts.c.id == bindparam("attempt_id")).values(answers_blob=bindparam("blob"))
+
+    converted = 0
+    while True:
+        attempt_ids = connection.execute(
+            select(answers.c.attempt_id).where(answers.c.attempt_id.is_not(None)).distinct().limit(batch_size)
+        ).scalars().all()
+        if not attempt_ids:
+            return converted
+        grouped = {}
+        rows = connection.execute(
+            select(answers.c.attempt_id, answers.c.question_id, answers.c.answer, answers.c.is_correct)
+            .where(answers.c.attempt_id.in_(attempt_ids))
+        )
+        for attempt_id, question_id, answer, is_correct in rows:
+            grouped.setdefault(attempt_id, []).append((question_id, answer, is_correct))
+        connection.execute(set_blob, [{"attempt_id": a, "blob": encode_answers(r)} for a, r in grouped.items()])
+        connection.execute(delete(answers).where(answers.c.attempt_id.in_(attempt_ids)))
+        converted += len(grouped)
+
+
+def expand_compact_to_rows(connection, batch_size: int = 1000) -> int:
+    """Inverse of convert_rows_to_compact, for downgrades. Returns attempts expanded."""
+    from sqlalchemy import bindparam, insert, select, update
+
+    from db.models import QuizAttempt, UserAnswer
+
+    answers, attempts = UserAnswer.__table__, QuizAttempt.__table__
+    clear_blob = update(attempts).where(attempts.c.id == bindparam("attempt_id")).values(answers_blob=None)
+
+    expanded = 0
+    while True:
+        batch = connection.execute(
+            select(attempts.c.id, attempts.c.user_id, attempts.c.submitted_at, attempts.c.answers_blob)
+            .where(attempts.c.answers_blob.is_not(None)).limit(batch_size)
+        ).all()
+        if not batch:
+            return expanded
+        rows = [
+            {"id": uuid.uuid4(), "user_id": user_id, "question_id": answer.question_id, "attempt_id": attempt_id,
+             "answer": answer.answer, "is_correct": answer.is_correct, "submitted_at": submitted_at}
+            for attempt_id, user_id, submitted_at, blob in batch
+            for answer in decode_answers(blob)
+        ]
+        if rows:
+            connection.execute(insert(answers), rows)
+        connection.execute(clear_blob, [{"attempt_id": attempt_id} for attempt_id, *_ in batch])
+        expanded += len(batch)
@@ -0,0 +1,212 @@
+"""
+Bulk import of existing question banks, without calling the LLM. Input is
+the shape build_quiz_from_content produces, one quiz per object:
+
+    {"name": "Cell biology.pdf", "questions": [{"question": "...", "options": [...], "answer": "...",
+                                                 "explanation": "...", "question_type": "mcq"}, ...]}
+
+NDJSON has one quiz per line. JSON is one quiz, a list of quizzes or
+{"quizzes": [...]}. Questions follow the same MCQ / text rules as generated
+ones (services.gemini_service.validate_question). Each quiz becomes an
+UploadedFile (no stored content) with one Quiz section; rows are written
+IMPORT_BATCH questions at a time with COPY on PostgreSQL and executemany
+elsewhere, all in the caller's transaction, so a bad quiz imports nothing.
+
+    cd backend
+    python -m services.bulk_import bank.ndjson --user-email student@example.com
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import orjson
+from sqlalchemy import insert
+
+from db.models import Question, Quiz, UploadedFile, User, generate_uuid
+from services.gemini_service import validate_question
+
+IMPORT_BATCH = 5000  # questions per COPY / executemany
+FORMATS = {".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+IMPORTED_FILE_TYPE = "import"  # UploadedFile.file_type of an imported quiz: there is no document behind it
+
+
+class QuizImportError(ValueError):
+    """A quiz that can't be imported; the message says which one (line or position) and why."""
+
+
+# === Reading ===
+def read_quizzes(stream, fmt: str):
+    """(where, quiz) for each quiz of a binary stream; `where` is "line 3" (NDJSON) or "quiz 3" (JSON)."""
+    if fmt == "ndjson":
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield f"line {number}", orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                raise QuizImportError(f"line {number}: invalid JSON ({e})")
+        return
+
+    try:
+        document = orjson.loads(stream.read())
+    except orjson.JSONDecodeError as e:
+        raise QuizImportError(f"invalid JSON ({e})")
+    if isinstance(document, dict):
+        document = document["quizzes"] if "quizzes" in document else [document]
+    if not isinstance(document, list):
+        raise QuizImportError("expected a quiz, a list of quizzes or {\"quizzes\": [...]}")
+    for number, quiz in enumerate(document, 1):
+        yield f"quiz {number}", quiz
+
+
+def question_row(item, quiz_id) -> dict:
+    """A questions row from one item; ValueError when it breaks the rules generated questions follow."""
+    if not isinstance(item, dict):
+        raise ValueError("Question must be an object.")
+    validate_question(item)
+    if not isinstance(item.get("question"), str) or not item["question"].strip():
+        raise ValueError("Missing question text.")
+    if not isinstance(item.get("answer"), str):
+        raise ValueError("Missing answer.")
+    return {
+        "id": generate_uuid(),
+        "quiz_id": quiz_id,
+        "text": item["question"],
+        "options": item["options"],
+        "correct_answer": item["answer"],
+        "explanation": item.get("explanation", "No explanation provided."),
+        "question_type": item["question_type"],
+    }
+
+
+# === Writing ===
+def _copy_field(value) -> str:
+    """One COPY ... (FORMAT csv) field: strings quoted, so only an unquoted empty field is NULL."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (list, dict)):
+        value = orjson.dumps(value).decode()
+    elif not isinstance(value, str):
+        return str(value)
+    return '"' + value.replace('"', '""') + '"'
+
+
+def copy_rows(connection, table, rows: list):
+    """COPY rows into `table` over the psycopg2 connection behind a SQLAlchemy connection."""
+    columns = list(rows[0])
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(",".join(_copy_field(row[column]) for column in columns))
+        buffer.write("\n")
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def write_rows(connection, table, rows: list):
+    if not rows:
+        return
+    if connection.dialect.name == "postgresql":
+        copy_rows(connection, table, rows)
+    else:
+        connection.execute(insert(table), rows)
+
+
+def import_quizzes(db, user_id, quizzes, source_name: str = "import", progress=None,
+                   batch_size: int = IMPORT_BATCH) -> dict:
+    """
+    Writes the (where, quiz) pairs of read_quizzes for `user_id` in the
+    session's transaction; the caller commits, or rolls back on
+    QuizImportError. progress(quizzes, questions), if given, is called after
+    each batch. Returns the counts and the new quiz ids.
+    """
+    connection = db.connection()
+    files, sections, questions = [], [], []
+    quiz_ids, question_count = [], 0
+
+    def flush():
+        if not files:
+            return
+        write_rows(connection, UploadedFile.__table__, files)
+        write_rows(connection, Quiz.__table__, sections)
+        write_rows(connection, Question.__table__, questions)
+        files.clear()
+        sections.clear()
+        questions.clear()
+        if progress is not None:
+            progress(len(quiz_ids), question_count)
+
+    for where, quiz in quizzes:
+        if not isinstance(quiz, dict) or not isinstance(quiz.get("questions"), list) or not quiz["questions"]:
+            raise QuizImportError(f"{where}: expected an object with a non-empty \"questions\" list")
+        name = quiz.get("name") or f"{source_name} #{len(quiz_ids) + 1}"
+        file_id, quiz_id = generate_uuid(), generate_uuid()
+        for number, item in enumerate(quiz["questions"], 1):
+            try:
+                questions.append(question_row(item, quiz_id))
+            except ValueError as e:
+                raise QuizImportError(f"{where}, question {number}: {e}")
+        files.append({"id": file_id, "user_id": user_id, "filename": f"import-{file_id.hex}",
+                      "original_name": str(name), "file_type": IMPORTED_FILE_TYPE, "content_hash": None})
+        sections.append({"id": quiz_id, "file_id": file_id, "region_index": None})
+        quiz_ids.append(quiz_id)
+        question_count += len(quiz["questions"])
+        if len(questions) >= batch_size:
+            flush()
+    flush()
+    return {"quizzes": len(quiz_ids), "questions": question_count, "quiz_ids": quiz_ids}
+
+
+def detect_format(filename: str | None, fmt: str | None = None) -> str | None:
+    """`fmt` if given, else from the file extension; None if neither says."""
+    return fmt or FORMATS.get(os.path.splitext(filename or "")[1].lower())
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="JSON or NDJSON question bank")
+    parser.add_argument("--user-email", required=True, help="owner of the imported quizzes")
+    parser.add_argument("--format", choices=["json", "ndjson"], default=None, help="default: from the extension")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH)
+    args = parser.parse_args(argv)
+
+    fmt = detect_format(args.path, args.format)
+    if fmt is None:
+        parser.error("can't tell the format from the extension; pass --format")
+
+    from db.session import SessionLocal
+
+    started = time.perf_counter()
+
+    def report(quizzes, questions):
+        elapsed = time.perf_counter() - started
+        print(f"\r{quizzes:,} quizzes, {questions:,} questions ({questions / (elapsed or 1):,.0f}/s)",
+              end="", file=sys.stderr, flush=True)
+
+    with SessionLocal() as db, open(args.path, "rb") as stream:
+        user = db.query(User.id).filter(User.email == args.user_email).first()
+        if user is None:
+            print(f"No user with email {args.user_email}", file=sys.stderr)
+            return 1
+        try:
+            result = import_quizzes(db, user.id, read_quizzes(stream, fmt), os.path.basename(args.path),
+                                    progress=report, batch_size=args.batch_size)
+        except QuizImportError as e:
+            db.rollback()
+            print(f"\nNothing imported: {e}", file=sys.stderr)
+            return 1
+        db.commit()
+    print(f"\nImported {result['quizzes']:,} quizzes with {result['questions']:,} questions "
+          f"in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import os
+from dataclasses import dataclass
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from db.models import DocumentRegion, UploadedFile
+from services.storage import uploaded_file_path
+from services.text_extraction import iter_document_text
+
+# Target size of one region. A "generate more" prompt carries a single region,
+# so this (not the document size) bounds the prompt.
+REGION_CHARS = int(os.getenv("REGION_CHARS", "12000"))
+
+INSERT_BATCH = 100
+
+
+@dataclass
+class Region:
+    first_unit: int
+    last_unit: int
+    text: str
+    index: int | None = None  # region_index once stored
+    cursor: int | None = None  # the file's region_cursor when this region was claimed
+
+
+# === Splitting ===
+def _split_long_unit(text: str, limit: int):
+    """Cuts one oversized page/paragraph/block at the last line break or space before `limit`."""
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        if cut < limit // 2:
+            cut = text.rfind(" ", 0, limit)
+        if cut < limit // 2:
+            cut = limit
+        yield text[:cut].strip()
+        text = text[cut:].strip()
+    if text:
+        yield text
+
+
+def split_into_regions(units, target_chars: int = REGION_CHARS):
+    """
+    Groups consecutive units (pages, paragraphs or text blocks) into regions of
+    about `target_chars`. Yields regions as they fill, so the whole document is
+    never held in memory; unit numbers are 1-based.
+    """
+    parts, size, first, last = [], 0, None, None
+    for number, unit in enumerate(units, start=1):
+        for piece in _split_long_unit(unit.strip(), target_chars):
+            if parts and size + len(piece) > target_chars:
+                yield Region(first, last, "\n".join(parts))
+                parts, size = [], 0
+            if not parts:
+                first = number
+            parts.append(piece)
+            size += len(piece) + 1
+            last = number
+    if parts:
+        yield Region(first, last, "\n".join(parts))
+
+
+# === Persistence ===
+def build_regions(db: Session, file_record: UploadedFile, target_chars: int = REGION_CHARS) -> int:
+    """
+    Splits the file into regions once and stores them. Returns the region count;
+    a file that is already split (or split concurrently) is left as it is.
+
+    The new rows are not committed here: claim_next_region records the count on
+    the file and commits both in one transaction.
+    """
+    if file_record.region_count is not None:
+        return file_record.region_count
+
+    count, batch = 0, []
+    try:
+        with uploaded_file_path(file_record) as path:
+            units = iter_document_text(path, file_record.file_type, txt_errors="ignore")
+            for region in split_into_regions(units, target_chars):
+                batch.append({
+                    "file_id": file_record.id,
+                    "region_index": count,
+                    "first_unit": region.first_unit,
+                    "last_unit": region.last_unit,
+                    "char_count": len(region.text),
+                    "text": region.text,
+                })
+                count += 1
+                if len(batch) >= INSERT_BATCH:
+                    db.execute(insert(DocumentRegion), batch)
+                    batch = []
+        if batch:
+            db.execute(insert(DocumentRegion), batch)
+    except IntegrityError:
+        # Another request split the same file first; use its regions
+        db.rollback()
+        db.refresh(file_record)
+        return file_record.region_count
+    return count
+
+
+def claim_next_region(db: Session, file_record: UploadedFile, region_count: int):
+    """
+    Advances the file's region cursor and returns the region it pointed at.
+    Once every region has had a section the cursor wraps around to the first.
+    Returns None for a file with no text.
+
+    Commits straight away, so no lock on the file row is held while the LLM
+    call runs; if no section gets stored, hand the region back with
+    release_region.
+    """
+    file_id, cursor = file_record.id, file_record.region_cursor
+    if not region_count:
+        db.commit()
+        return None
+
+    # Compare-and-swap so two concurrent "generate" calls get different regions
+    while True:
+        claimed = db.query(UploadedFile).filter(
+            UploadedFile.id == file_id,
+            UploadedFile.region_cursor == cursor,
+        ).update({UploadedFile.region_cursor: cursor + 1, UploadedFile.region_count: region_count},
+                 synchronize_session=False)
+        if claimed:
+            break
+        cursor = db.query(UploadedFile.region_cursor).filter(UploadedFile.id == file_id).scalar()
+
+    row = db.query(DocumentRegion).filter(
+        DocumentRegion.file_id == file_id,
+        DocumentRegion.region_index == cursor % region_count,
+    ).one()
+    region = Region(row.first_unit, row.last_unit, row.text, index=row.region_index, cursor=cursor)
+    db.commit()
+    return region
+
+
+def release_region(db: Session, file_id, region: Region):
+    """
+    Undoes claim_next_region after a failed generation, so the next call
+    takes the same region. If another call has claimed a region since, the
+    cursor is left alone (rolling back would hand out that region twice) and
+    this one comes round again on the next pass.
+    """
+    db.query(UploadedFile).filter(
+        UploadedFile.id == file_id,
+        UploadedFile.region_cursor == region.cursor + 1,
+    ).update({UploadedFile.region_cursor: region.cursor}, synchronize_session=False)
+    db.commit()
@@ -0,0 +1,178 @@
+import base64
+import csv
+import io
+import json
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+import orjson
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from db.models import Question, Quiz, QuizAttempt, UploadedFile, UserAnswer
+from services.answer_storage import decode_answers
+
+STREAM_BATCH = 1000  # rows fetched per round trip (yield_per)
+CHUNK_BYTES = 64 * 1024  # output is sent in chunks of about this size
+QUIZ_CACHE = 256  # quizzes whose questions are kept for decoding compact records
+
+CSV_COLUMNS = [
+    "cursor", "attempt_id", "submitted_at", "file_name", "quiz_id", "score",
+    "question_id", "question", "question_type", "user_answer", "correct_answer", "is_correct",
+]
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+# Spreadsheets run a cell starting with one of these as a formula
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+CSV_FREE_TEXT = {"file_name", "question", "user_answer", "correct_answer"}
+
+
+# === Cursors: the position after an attempt, as (submitted_at, attempt id) ===
+def encode_cursor(submitted_at: datetime, attempt_id) -> str:
+    raw = json.dumps([submitted_at.isoformat(), str(attempt_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    """(submitted_at, attempt_id); ValueError for anything that is not a cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        submitted_at, attempt_id = json.loads(raw)
+        return datetime.fromisoformat(submitted_at), uuid.UUID(attempt_id)
+    except Exception as e:
+        raise ValueError("Invalid export cursor") from e
+
+
+# === Reading ===
+class _QuizQuestions:
+    """Question text / answer key per quiz for compact records, LRU-bounded so memory stays flat."""
+
+    def __init__(self, db: Session, max_quizzes: int = QUIZ_CACHE):
+        self.db = db
+        self.max_quizzes = max_quizzes
+        self._quizzes = OrderedDict()
+
+    def get(self, quiz_id) -> dict:
+        questions = self._quizzes.get(quiz_id)
+        if questions is None:
+            questions = {
+                q.id: q for q in self.db.query(
+                    Question.id, Question.text, Question.question_type, Question.correct_answer
+                ).filter(Question.quiz_id == quiz_id)
+            }
+            self._quizzes[quiz_id] = questions
+            if len(self._quizzes) > self.max_quizzes:
+                self._quizzes.popitem(last=False)
+        else:
+            self._quizzes.move_to_end(quiz_id)
+        return questions
+
+
+def iter_attempts(db: Session, user_id, after=None):
+    """
+    Yields the user's attempts oldest first, each as a dict with its answers,
+    from one query over quiz_attempts, user_answers, questions, quizzes and
+    uploaded_files streamed STREAM_BATCH rows at a time. Attempts stored as
+    compact records are decoded as they come. `after` is a decoded cursor.
+    """
+    query = (
+        db.query(
+            QuizAttempt.id.label("attempt_id"), QuizAttempt.submitted_at, QuizAttempt.quiz_id,
+            QuizAttempt.score, QuizAttempt.answers_blob, UploadedFile.original_name.label("file_name"),
+            UserAnswer.question_id, UserAnswer.answer, UserAnswer.is_correct,
+            Question.text, Question.question_type, Question.correct_answer,
+        )
+        .outerjoin(UserAnswer, UserAnswer.attempt_id == QuizAttempt.id)
+        .outerjoin(Question, UserAnswer.question_id == Question.id)
+        .outerjoin(Quiz, QuizAttempt.quiz_id == Quiz.id)
+        .outerjoin(UploadedFile, Quiz.file_id == UploadedFile.id)
+        .filter(QuizAttempt.user_id == user_id)
+        .order_by(QuizAttempt.submitted_at, QuizAttempt.id, UserAnswer.id)
+    )
+    if after is not None:
+        submitted_at, attempt_id = after
+        query = query.filter(or_(
+            QuizAttempt.submitted_at > submitted_at,
+            and_(QuizAttempt.submitted_at == submitted_at, QuizAttempt.id > attempt_id),
+        ))
+
+    quiz_questions = _QuizQuestions(db)
+    attempt = None
+    for row in query.execution_options(yield_per=STREAM_BATCH):
+        if attempt is None or attempt["attempt_id"] != row.attempt_id:
+            if attempt is not None:
+                yield attempt
+            attempt = {
+                "cursor": encode_cursor(row.submitted_at, row.attempt_id),
+                "attempt_id": row.attempt_id, "submitted_at": row.submitted_at, "quiz_id": row.quiz_id,
+                "file_name": row.file_name, "score": row.score, "answers": [],
+            }
+            if row.answers_blob is not None:
+                questions = quiz_questions.get(row.quiz_id)
+                for stored in decode_answers(row.answers_blob):
+                    question = questions.get(stored.question_id)
+                    attempt["answers"].append({
+                        "question_id": stored.question_id,
+                        "question": question.text if question else None,
+                        "question_type": question.question_type if question else None,
+                        "user_answer": stored.answer,
+                        "correct_answer": question.correct_answer if question else None,
+                        "is_correct": stored.is_correct,
+                    })
+        if row.question_id is not None:
+            attempt["answers"].append({
+                "question_id": row.question_id, "question": row.text, "question_type": row.question_type,
+                "user_answer": row.answer, "correct_answer": row.correct_answer, "is_correct": row.is_correct,
+            })
+    if attempt is not None:
+        yield attempt
+
+
+# === Formats ===
+def _csv_cell(column: str, value):
+    """Free text starting like a formula is prefixed with ' so spreadsheets show it as text."""
+    if column in CSV_FREE_TEXT and isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_lines(attempts):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for attempt in attempts:
+        head = [attempt["cursor"], attempt["attempt_id"], attempt["submitted_at"].isoformat(),
+                attempt["file_name"], attempt["quiz_id"], attempt["score"]]
+        # An attempt without answers still gets a row
+        for answer in attempt["answers"] or [{}]:
+            row = head + [answer.get(column) for column in CSV_COLUMNS[len(head):]]
+            writer.writerow([_csv_cell(column, value) for column, value in zip(CSV_COLUMNS, row)])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _ndjson_lines(attempts):
+    for attempt in attempts:
+        yield orjson.dumps(attempt, option=orjson.OPT_APPEND_NEWLINE).decode()
+
+
+def export_attempts(bind, user_id, fmt: str, after=None):
+    """
+    The export body, in chunks of about CHUNK_BYTES. Opens its own session on
+    `bind`: the request's session is closed before a streamed body is sent.
+    CSV has one row per answer; NDJSON one line per attempt with its answers.
+    Every row / line carries the cursor that resumes after its attempt.
+    """
+    lines = _csv_lines if fmt == "csv" else _ndjson_lines
+    with Session(bind=bind) as db:
+        pending, size = [], 0
+        for text in lines(iter_attempts(db, user_id, after)):
+            pending.append(text)
+            size += len(text)
+            if size >= CHUNK_BYTES:
+                yield "".join(pending).encode("utf-8")
+                pending, size = [], 0
+        if pending:
+            yield "".join(pending).encode("utf-8")
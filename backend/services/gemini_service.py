@@ -1,22 +1,36 @@
-import os
 import uuid
 import json
+import logging
 import re
-import google.generativeai as genai
+import asyncio
 from dotenv import load_dotenv
 from sqlalchemy.future import select
 from sqlalchemy.orm import Session
-from db.models import Quiz, Question
+from db.models import Question
+from services.llm_resilience import gemini_caller
+from services.llm_providers import get_llm_provider
+from services.request_context import track
+from services.metrics import observe_llm_call
+from services.structured_logging import log_event, summarize_payload
 
 load_dotenv()
 
-# === Generate a unique UUID not present in the table ===
-def get_unique_id(session, model, column):
-    while True:
-        potential_id = str(uuid.uuid4())
-        existing = session.execute(select(model).where(column == potential_id))
-        if not existing.scalars().first():
-            return potential_id
+logger = logging.getLogger("nexera.llm")
+
+# === Call the configured LLM provider through the shared rate limiter / retry / circuit breaker ===
+def generate_with_resilience(operation: str, prompt: str, context: dict | None = None) -> str:
+    with track("llm"), observe_llm_call(operation, prompt) as observed:
+        observed["text"] = gemini_caller.call(get_llm_provider().generate, operation, prompt, context)
+        return observed["text"]
+
+# === Generate UUIDs not present in the table (one query per batch, not per id) ===
+def get_unique_ids(session, column, count: int):
+    unique_ids = []
+    while len(unique_ids) < count:
+        candidates = [uuid.uuid4() for _ in range(count - len(unique_ids))]
+        taken = set(session.execute(select(column).where(column.in_(candidates))).scalars().all())
+        unique_ids.extend(c for c in candidates if c not in taken)
+    return unique_ids
 
 # === Safely parse JSON structure from Gemini's response ===
 def parse_json_from_response(response_text: str):
@@ -24,13 +38,21 @@ def parse_json_from_response(response_text: str):
         json_payload = re.search(r'\{.*\}', response_text, re.DOTALL).group(0)
         return json.loads(json_payload)
     except Exception as e:
-        print("❌ Raw Gemini Response:\n", response_text)
+        log_event(logger, logging.WARNING, "llm.unparsable_response", response=summarize_payload(response_text))
         raise ValueError(f"Gemini returned unparsable JSON: {e}")
 
+# === MCQ / text rules for a question, generated or imported (services.bulk_import) ===
+def validate_question(q: dict) -> dict:
+    q["question_type"] = q.get("question_type", "mcq")  # default to MCQ
+    if q["question_type"] == "mcq":
+        if "options" not in q or not isinstance(q["options"], list):
+            raise ValueError("Missing valid options for MCQ.")
+    else:
+        q["options"] = None
+    return q
+
 # === Build a full quiz (MCQ + open-ended) from text ===
 async def build_quiz_from_content(raw_text: str, db: Session):
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    model = genai.GenerativeModel("models/gemini-1.5-flash")
 
     prompt = f"""
 You are an assistant helping students learn. Based on the following content, generate a quiz with 5 multiple-choice questions and 5 text-based open-ended questions.
@@ -61,27 +83,23 @@ Return JSON in the following format:
 }}
 """
 
-    response = model.generate_content(prompt)
-    print("📤 Gemini Output:", response.text)
-    parsed = parse_json_from_response(response.text)
+    response_text = await asyncio.to_thread(
+        generate_with_resilience, "build_quiz_from_content", prompt, {"text": raw_text}
+    )
+    log_event(logger, logging.DEBUG, "llm.response", operation="build_quiz_from_content",
+              response=lambda: summarize_payload(response_text))
+    parsed = parse_json_from_response(response_text)
 
     questions = parsed.get("questions", [])
 
-    for q in questions:
-        q["id"] = get_unique_id(db, Question, Question.id)
-        q["question_type"] = q.get("question_type", "mcq")  # default to MCQ
-        if q["question_type"] == "mcq":
-            if "options" not in q or not isinstance(q["options"], list):
-                raise ValueError("Missing valid options for MCQ.")
-        else:
-            q["options"] = None
+    for q, question_id in zip(questions, get_unique_ids(db, Question.id, len(questions))):
+        q["id"] = question_id
+        validate_question(q)
 
     return questions
 
 # === Evaluate user's answers against Gemini's solution ===
 def score_user_answers(quiz_payload, user_inputs):
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    model = genai.GenerativeModel("models/gemini-1.5-flash")
 
     prompt = f"""
 You are an AI tutor.
@@ -113,13 +131,13 @@ User Answers:
 {user_inputs}
 """
 
-    response = model.generate_content(prompt)
-    return parse_json_from_response(response.text)
+    response_text = generate_with_resilience(
+        "score_user_answers", prompt, {"quiz": quiz_payload, "answers": user_inputs}
+    )
+    return parse_json_from_response(response_text)
 
 # === Generate new questions (no duplicates) from existing content ===
 async def expand_quiz_with_new_items(text_block, prior_questions, db: Session):
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    model = genai.GenerativeModel("models/gemini-1.5-flash")
 
     prompt = f"""
 You are a quiz-generating assistant.
@@ -151,19 +169,18 @@ Return JSON in the format:
 }}
 """
 
-    response = model.generate_content(prompt)
-    print("📤 Gemini Response (New Questions):", response.text)
-    parsed = parse_json_from_response(response.text)
+    response_text = await asyncio.to_thread(
+        generate_with_resilience, "expand_quiz_with_new_items", prompt,
+        {"text": text_block, "prior_questions": prior_questions},
+    )
+    log_event(logger, logging.DEBUG, "llm.response", operation="expand_quiz_with_new_items",
+              response=lambda: summarize_payload(response_text))
+    parsed = parse_json_from_response(response_text)
 
     new_questions = parsed.get("questions", [])
 
-    for q in new_questions:
-        q["id"] = get_unique_id(db, Question, Question.id)
-        q["question_type"] = q.get("question_type", "mcq")
-        if q["question_type"] == "mcq":
-            if "options" not in q or not isinstance(q["options"], list):
-                raise ValueError("MCQ question missing options.")
-        else:
-            q["options"] = None
+    for q, question_id in zip(new_questions, get_unique_ids(db, Question.id, len(new_questions))):
+        q["id"] = question_id
+        validate_question(q)
 
     return new_questions
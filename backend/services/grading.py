@@ -0,0 +1,112 @@
+from services import pregrader
+from services.grading_cache import GradingCache, get_grading_cache, question_version
+
+# Verdict fields worth keeping; the rest of a result comes from the submission
+CACHED_FIELDS = ("is_correct", "correct_answer", "explanation")
+
+
+def answers_by_question(user_answers) -> dict:
+    """question_id -> submitted answer, from either a list of {"id", "answer"} or a dict."""
+    if isinstance(user_answers, dict):
+        return {str(qid): answer for qid, answer in user_answers.items()}
+    return {str(a["id"]): a.get("answer") for a in user_answers}
+
+
+def _reference_answer(question: dict):
+    return question.get("correct_answer") or question.get("answer")
+
+
+def pregrade_text_questions(questions: list, answers: dict) -> dict:
+    """
+    Grades text questions whose answer is a clear match or clear miss of the
+    stored answer, without the LLM. Returns question_id -> result for those;
+    ambiguous answers are left out.
+    """
+    candidates = [
+        q for q in questions
+        if q.get("question_type") == "text" and _reference_answer(q)
+    ]
+    if not pregrader.PREGRADE_ENABLED or not candidates:
+        return {}
+
+    submitted = [str(answers.get(str(q["id"]), "Unanswered")) for q in candidates]
+    decisions = pregrader.pregrade(submitted, [str(_reference_answer(q)) for q in candidates])
+
+    results = {}
+    for question, answer, decision in zip(candidates, submitted, decisions):
+        if decision.is_correct is None:
+            continue
+        reference = _reference_answer(question)
+        results[str(question["id"])] = {
+            "id": str(question["id"]),
+            "question": question.get("text") or question.get("question"),
+            "user_answer": answer,
+            "correct_answer": reference,
+            "is_correct": decision.is_correct,
+            "explanation": (
+                "Your answer matches the expected answer." if decision.is_correct
+                else f"The expected answer is: {reference}."
+            ),
+        }
+    return results
+
+
+def grade_submission(quiz_data: dict, user_answers, scorer, cache: GradingCache | None = None) -> dict:
+    """
+    Grades a submission in three stages, each only seeing what the previous
+    one could not decide:
+      1. the grading cache (same question, same normalized answer)
+      2. the local similarity pre-grader (clear matches / misses of text answers)
+      3. `scorer(quiz, answers)`, i.e. the LLM
+    When the first two settle every answer no LLM call is made.
+
+    Returns the scorer's {"results": [...]} shape, in question order, plus
+    "cache": {"hits", "misses"} and "pregraded": count.
+    """
+    cache = get_grading_cache() if cache is None else cache
+    questions = quiz_data.get("questions", [])
+    answers = answers_by_question(user_answers)
+
+    cached, missed, keys = {}, [], {}
+    for question in questions:
+        qid = str(question["id"])
+        answer = answers.get(qid, "Unanswered")
+        keys[qid] = cache.key(qid, question_version(question), answer)
+        verdict = cache.get(keys[qid])
+        if verdict is None:
+            missed.append(question)
+        else:
+            cached[qid] = {
+                "id": qid,
+                "question": question.get("text") or question.get("question"),
+                "user_answer": answer,
+                **verdict,
+            }
+
+    pregraded = pregrade_text_questions(missed, answers)
+    remaining = [q for q in missed if str(q["id"]) not in pregraded]
+
+    graded = {}
+    if remaining:
+        if len(remaining) == len(questions):
+            evaluation = scorer(quiz_data, user_answers)
+        else:
+            remaining_ids = {str(q["id"]) for q in remaining}
+            evaluation = scorer(
+                {**quiz_data, "questions": remaining},
+                [{"id": qid, "answer": answer} for qid, answer in answers.items() if qid in remaining_ids],
+            )
+        for result in evaluation.get("results", []):
+            qid = str(result.get("id"))
+            graded[qid] = result
+            # Only definite verdicts are reused
+            if qid in keys and isinstance(result.get("is_correct"), bool):
+                cache.put(keys[qid], {field: result.get(field) for field in CACHED_FIELDS})
+
+    results = [cached.get(str(q["id"])) or pregraded.get(str(q["id"])) or graded.get(str(q["id"])) for q in questions]
+    cache.record(hits=len(cached), misses=len(missed))
+    return {
+        "results": [r for r in results if r is not None],
+        "cache": {"hits": len(cached), "misses": len(missed)},
+        "pregraded": len(pregraded),
+    }
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from prometheus_client import Counter
+
+# 0 disables the cache. Each worker process keeps its own.
+GRADING_CACHE_SIZE = int(os.getenv("GRADING_CACHE_SIZE", "10000"))
+
+GRADING_CACHE_LOOKUPS = Counter(
+    "grading_cache_lookups_total", "Answer verdicts looked up in the grading cache", ["result"],
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+# Kept at the start of an answer when something follows: "-5" is not "5", ".5" is not "5"
+_LEADING_KEPT = frozenset("-+.")
+
+
+def _is_punctuation(ch: str) -> bool:
+    return ch.isspace() or unicodedata.category(ch).startswith("P")
+
+
+def normalize_answer(answer) -> str:
+    """
+    Folds answers that only differ trivially onto one key: Unicode
+    compatibility forms (NFKC), case, runs of whitespace and punctuation
+    around the answer. "  Photosynthesis. " and "photosynthesis" normalize to
+    the same string; punctuation inside an answer ("x-1", "3.14") and a
+    leading sign ("-5") are kept, since they change its meaning.
+    """
+    text = _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", str(answer)).casefold())
+    start, end = 0, len(text)
+    while end > start and _is_punctuation(text[end - 1]):
+        end -= 1
+    while start < end and _is_punctuation(text[start]):
+        if text[start] in _LEADING_KEPT and start + 1 < end and not text[start + 1].isspace():
+            break
+        start += 1
+    return text[start:end]
+
+
+def question_version(question: dict) -> str:
+    """
+    Hash of everything that decides a verdict. Editing the question text,
+    options or expected answer changes it, so stale verdicts are never served.
+    """
+    fields = {
+        "text": question.get("text") or question.get("question"),
+        "options": question.get("options"),
+        "answer": question.get("correct_answer") or question.get("answer"),
+        "type": question.get("question_type"),
+    }
+    encoded = json.dumps(fields, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:16]
+
+
+# === LRU of verdicts keyed by (question, question version, normalized answer) ===
+class GradingCache:
+    def __init__(self, max_entries: int = GRADING_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(question_id, version: str, answer) -> tuple:
+        return str(question_id), version, normalize_answer(answer)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: tuple):
+        """Returns the cached verdict dict, or None."""
+        with self._lock:
+            verdict = self._entries.get(key)
+            if verdict is not None:
+                self._entries.move_to_end(key)
+        GRADING_CACHE_LOOKUPS.labels("hit" if verdict is not None else "miss").inc()
+        return dict(verdict) if verdict is not None else None
+
+    def put(self, key: tuple, verdict: dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = dict(verdict)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    # --- hit rate, across all quizzes ---
+    def record(self, hits: int, misses: int):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> dict:
+        """Size and overall hit rate only: nothing that identifies a quiz or a user."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            }
+
+
+_cache = GradingCache()
+
+
+def get_grading_cache() -> GradingCache:
+    return _cache
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from services.llm_resilience import LLMUnavailableError
+
+logger = logging.getLogger("nexera.lifecycle")
+
+# How long shutdown waits for uploads / generation / grading still waiting on the LLM.
+# Keep it below gunicorn's graceful_timeout so the worker exits before it is killed.
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv("SHUTDOWN_DRAIN_SECONDS", "45"))
+
+
+# === In-flight LLM-bound requests, so a deploy can wait for them instead of dropping them ===
+class InFlightTracker:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._count = 0
+        self.draining = False
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def enter(self):
+        with self._cond:
+            if self.draining:
+                raise LLMUnavailableError("Server is restarting, retry on another instance.", 1)
+            self._count += 1
+
+    def exit(self):
+        with self._cond:
+            self._count -= 1
+            if self._count == 0:
+                self._cond.notify_all()
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Stops admitting new requests and blocks until none are in flight or `timeout` passes."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self.draining = True
+            while self._count > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+
+llm_bound_requests = InFlightTracker()
+
+
+async def llm_bound_request():
+    """Route dependency: counts the request as in flight until its response is sent."""
+    llm_bound_requests.enter()
+    try:
+        yield
+    finally:
+        llm_bound_requests.exit()
+
+
+async def drain_llm_bound_requests(timeout: float = SHUTDOWN_DRAIN_SECONDS) -> bool:
+    pending = llm_bound_requests.count
+    if pending:
+        logger.info("draining %d in-flight LLM-bound requests (up to %.0fs)", pending, timeout,
+                    extra={"event": "shutdown.drain", "pending": pending})
+    drained = await asyncio.to_thread(llm_bound_requests.wait_idle, timeout)
+    if not drained:
+        logger.warning("shutdown deadline reached with %d LLM-bound requests still running",
+                       llm_bound_requests.count, extra={"event": "shutdown.drain_timeout"})
+    return drained
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+
+
+# === Provider interface used by gemini_service ===
+class LLMProvider(ABC):
+    """
+    Turns a prompt into raw model text. `operation` names the calling service
+    function and `context` carries the structured inputs the prompt was built
+    from, so offline providers can answer without parsing the prompt.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def generate(self, operation: str, prompt: str, context: dict | None = None) -> str:
+        ...
+
+
+# === Google Gemini (production) ===
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model_name: str = "models/gemini-1.5-flash", api_key: str | None = None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+
+                    genai.configure(api_key=self.api_key or os.getenv("GEMINI_API_KEY"))
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def generate(self, operation: str, prompt: str, context: dict | None = None) -> str:
+        return self._get_model().generate_content(prompt).text
+
+
+# === Deterministic offline provider for tests and capacity runs ===
+class FakeUpstreamError(Exception):
+    """Injected failure; carries an HTTP-like code so retries treat it as a 503."""
+
+    code = 503
+
+
+class FakeLLMProvider(LLMProvider):
+    """
+    Produces well-formed quiz / grading JSON derived from the request inputs.
+    Latency is drawn from a log-normal distribution given its median and p95,
+    and a fraction `failure_rate` of calls raise FakeUpstreamError. Draws come
+    from a seeded generator, so a run with the same call order is reproducible.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_median_ms: float = 0.0,
+        latency_p95_ms: float | None = None,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+        sleep=time.sleep,
+    ):
+        self.latency_median_ms = latency_median_ms
+        self.latency_p95_ms = latency_p95_ms or latency_median_ms
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sleep = sleep
+
+    def _draw(self):
+        with self._lock:
+            fails = self._rng.random() < self.failure_rate
+            if self.latency_median_ms <= 0:
+                return 0.0, fails
+            # p95 of a log-normal is median * exp(1.645 * sigma)
+            sigma = max(0.0, math.log(self.latency_p95_ms / self.latency_median_ms) / 1.645)
+            return self._rng.lognormvariate(math.log(self.latency_median_ms), sigma) / 1000.0, fails
+
+    def generate(self, operation: str, prompt: str, context: dict | None = None) -> str:
+        delay, fails = self._draw()
+        if delay:
+            self._sleep(delay)
+        if fails:
+            raise FakeUpstreamError(f"Injected failure for {operation}")
+
+        context = context or {}
+        if operation == "score_user_answers":
+            payload = self._grade(context.get("quiz") or {}, context.get("answers") or [])
+        else:
+            payload = self._questions(context.get("text") or prompt, salt=len(context.get("prior_questions") or []))
+        return json.dumps(payload)
+
+    @staticmethod
+    def _questions(text: str, salt: int = 0) -> dict:
+        sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+|\n+", text) if len(s.split()) >= 4]
+        if not sentences:
+            sentences = ["The provided material did not contain full sentences to quiz on."]
+        vocabulary = sorted({w for w in re.findall(r"[A-Za-z]{4,}", text)}) or ["alpha", "beta", "gamma", "delta"]
+
+        digest = int(hashlib.sha256(f"{salt}:{text}".encode("utf-8")).hexdigest(), 16)
+        start = digest % len(sentences)
+        picked = [sentences[(start + i) % len(sentences)] for i in range(10)]
+
+        questions = []
+        for i, sentence in enumerate(picked[:5]):
+            words = [w for w in re.findall(r"[A-Za-z]{4,}", sentence)] or ["material"]
+            answer = words[(digest >> i) % len(words)]
+            distractors = [w for w in vocabulary if w != answer]
+            offset = (digest >> (i + 8)) % max(1, len(distractors))
+            options = [answer] + [distractors[(offset + k) % len(distractors)] for k in range(3)] if distractors else [answer]
+            options = sorted(set(options))
+            questions.append({
+                "question": f"Which word completes: \"{sentence.replace(answer, '_____', 1)}\"?",
+                "options": options,
+                "answer": answer,
+                "explanation": f"The material states: \"{sentence}\"",
+                "question_type": "mcq",
+            })
+        for sentence in picked[5:]:
+            questions.append({
+                "question": f"Explain in your own words: {sentence}",
+                "answer": sentence,
+                "explanation": "Restates the corresponding passage of the material.",
+                "question_type": "text",
+            })
+        return {"questions": questions}
+
+    @staticmethod
+    def _grade(quiz: dict, answers) -> dict:
+        if isinstance(answers, dict):
+            submitted = {str(k): v for k, v in answers.items()}
+        else:
+            submitted = {str(a.get("id")): a.get("answer") for a in answers if isinstance(a, dict)}
+
+        def normalize(value):
+            return re.sub(r"\W+", " ", str(value or "")).strip().lower()
+
+        results = []
+        for q in quiz.get("questions", []):
+            qid = str(q.get("id"))
+            expected = q.get("correct_answer", q.get("answer", ""))
+            given = submitted.get(qid, "Unanswered")
+            results.append({
+                "id": qid,
+                "question": q.get("text", q.get("question", "")),
+                "user_answer": given,
+                "correct_answer": expected,
+                "is_correct": normalize(given) == normalize(expected) and given != "Unanswered",
+                "explanation": q.get("explanation") or "Compared with the stored answer.",
+            })
+        return {"results": results}
+
+
+# === Provider selection by configuration ===
+def build_provider_from_env() -> LLMProvider:
+    name = os.getenv("LLM_PROVIDER", "gemini").lower()
+    if name == "fake":
+        return FakeLLMProvider(
+            latency_median_ms=float(os.getenv("FAKE_LLM_LATENCY_MEDIAN_MS", "0")),
+            latency_p95_ms=float(os.getenv("FAKE_LLM_LATENCY_P95_MS", "0")) or None,
+            failure_rate=float(os.getenv("FAKE_LLM_FAILURE_RATE", "0")),
+            seed=int(os.getenv("FAKE_LLM_SEED", "0")),
+        )
+    if name == "gemini":
+        return GeminiProvider(model_name=os.getenv("GEMINI_MODEL", "models/gemini-1.5-flash"))
+    raise ValueError(f"Unknown LLM_PROVIDER '{name}' (expected 'gemini' or 'fake').")
+
+
+_provider = None
+
+
+def get_llm_provider() -> LLMProvider:
+    global _provider
+    if _provider is None:
+        _provider = build_provider_from_env()
+    return _provider
+
+
+def set_llm_provider(provider: LLMProvider | None):
+    """Swap the active provider (tests, load-test harnesses). None resets to config."""
+    global _provider
+    _provider = provider
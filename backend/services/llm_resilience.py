@@ -0,0 +1,251 @@
+import os
+import random
+import threading
+import time
+
+
+# === Error raised when the LLM upstream should not be called right now ===
+class LLMUnavailableError(Exception):
+    """
+    Raised when the circuit breaker is open, the rate limiter cannot grant a
+    slot before the deadline, or retries are exhausted on a retryable error.
+    `retry_after` is the number of seconds a client should wait.
+    """
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = max(1, int(round(retry_after)))
+
+
+# === Upstream errors worth retrying (quota and transient server failures) ===
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def is_retryable_error(exc: Exception) -> bool:
+    code = getattr(exc, "code", None)
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        code = None
+    if code in RETRYABLE_STATUS_CODES:
+        return True
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+# === Client-side token bucket shared by every call in this process ===
+class TokenBucket:
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self, timeout: float) -> bool:
+        """Take one token, waiting at most `timeout` seconds for it."""
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            remaining = deadline - time.monotonic()
+            if wait > remaining:
+                return False
+            time.sleep(wait)
+
+    def seconds_until_available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate_per_second": self.rate,
+                "capacity": self.capacity,
+                "available_tokens": round(self.tokens, 2),
+            }
+
+
+# === Circuit breaker: closed -> open after N failures -> half-open trial ===
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, cooldown_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.total_failures = 0
+        self.total_rejections = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown_seconds - time.monotonic())
+
+    def before_call(self):
+        """Raise LLMUnavailableError if the upstream should not be called."""
+        with self._lock:
+            if self.state == self.OPEN:
+                if self.retry_after() > 0:
+                    self.total_rejections += 1
+                    raise LLMUnavailableError("LLM upstream is unhealthy (circuit open).", self.retry_after())
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self.total_rejections += 1
+                    raise LLMUnavailableError("LLM upstream is recovering (trial call in flight).", 1)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self.consecutive_failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Free a half-open trial slot when the call ended without a verdict."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "cooldown_seconds": self.cooldown_seconds,
+                "retry_after_seconds": round(self.retry_after(), 2),
+                "total_failures": self.total_failures,
+                "total_rejections": self.total_rejections,
+            }
+
+
+# === Limiter + retries with jittered exponential backoff + breaker ===
+class ResilientCaller:
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        breaker: CircuitBreaker,
+        max_attempts: int = 4,
+        deadline_seconds: float = 30.0,
+        backoff_base_seconds: float = 1.0,
+        backoff_cap_seconds: float = 8.0,
+        sleep=time.sleep,
+    ):
+        self.limiter = limiter
+        self.breaker = breaker
+        self.max_attempts = max_attempts
+        self.deadline_seconds = deadline_seconds
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_cap_seconds = backoff_cap_seconds
+        self._sleep = sleep
+        self.total_calls = 0
+        self.total_retries = 0
+
+    @classmethod
+    def from_env(cls):
+        # The quota is per API key, so each worker process gets its share.
+        workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+        per_minute = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15")) / workers
+        burst = float(os.getenv("GEMINI_RATE_BURST", "3"))
+        return cls(
+            limiter=TokenBucket(rate_per_second=per_minute / 60.0, capacity=max(1.0, burst)),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURE_THRESHOLD", "5")),
+                cooldown_seconds=float(os.getenv("GEMINI_BREAKER_COOLDOWN_SECONDS", "30")),
+            ),
+            max_attempts=int(os.getenv("GEMINI_MAX_ATTEMPTS", "4")),
+            deadline_seconds=float(os.getenv("GEMINI_RETRY_DEADLINE_SECONDS", "30")),
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        # "Full jitter": uniform between 0 and the capped exponential step.
+        ceiling = min(self.backoff_cap_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Run `fn` under the rate limiter and circuit breaker, retrying
+        retryable upstream errors until `max_attempts` or the deadline.
+        """
+        self.total_calls += 1
+        deadline = time.monotonic() + self.deadline_seconds
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+
+            remaining = deadline - time.monotonic()
+            if not self.limiter.acquire(timeout=max(0.0, remaining)):
+                self.breaker.release_trial()
+                raise LLMUnavailableError(
+                    "LLM request quota exhausted, try again shortly.",
+                    self.limiter.seconds_until_available(),
+                )
+
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exc:
+                if not is_retryable_error(exc):
+                    self.breaker.release_trial()
+                    raise
+                self.breaker.record_failure()
+                attempt += 1
+                delay = self._backoff(attempt)
+                if attempt >= self.max_attempts or time.monotonic() + delay >= deadline:
+                    raise LLMUnavailableError(
+                        f"LLM upstream failed after {attempt} attempt(s): {exc}",
+                        max(delay, self.breaker.retry_after()),
+                    ) from exc
+                self.total_retries += 1
+                self._sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            return result
+
+    def snapshot(self) -> dict:
+        return {
+            "circuit_breaker": self.breaker.snapshot(),
+            "rate_limiter": self.limiter.snapshot(),
+            "max_attempts": self.max_attempts,
+            "deadline_seconds": self.deadline_seconds,
+            "total_calls": self.total_calls,
+            "total_retries": self.total_retries,
+        }
+
+
+gemini_caller = ResilientCaller.from_env()
+
+
+def get_resilience_state() -> dict:
+    return gemini_caller.snapshot()
@@ -0,0 +1,203 @@
+"""
+Per-user question mastery for review mode: the last result, the current
+streak of correct answers and when each question is next due. Submissions keep
+it current; the review set is a range read on (user_id, next_due_at), never a
+scan of the user's answers.
+
+A miss makes the question due straight away. Each correct answer in a row
+pushes it further out (REVIEW_INTERVALS).
+
+Rebuild from user_answers and compact answer records (after a restore or the
+first deploy):
+
+    cd backend
+    python -m services.mastery               # every user
+    python -m services.mastery --user-id <uuid>
+"""
+import argparse
+import heapq
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, delete, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from db.models import Question, QuestionMastery, QuizAttempt, UserAnswer
+from services.answer_storage import decode_answers
+
+# Due again this long after the 1st, 2nd, ... correct answer in a row
+REVIEW_INTERVALS = tuple(timedelta(days=d) for d in (1, 3, 7, 14, 30, 60))
+
+REVIEW_SET_SIZE = 20
+
+
+def next_due(is_correct: bool, streak: int, answered_at: datetime) -> datetime:
+    """When a question answered at `answered_at` comes up again; `streak` includes this answer."""
+    if not is_correct:
+        return answered_at
+    return answered_at + REVIEW_INTERVALS[min(streak, len(REVIEW_INTERVALS)) - 1]
+
+
+# === Write side (in the submission's transaction) ===
+def record_answers(db, user_id, answers, answered_at: datetime | None = None):
+    """
+    Applies one submission's (question_id, answer, is_correct) triples.
+    Ungraded answers leave mastery as it was. Runs in the caller's transaction.
+    """
+    graded = {question_id: is_correct for question_id, _, is_correct in answers if is_correct is not None}
+    if not graded:
+        return
+    answered_at = answered_at or datetime.now(timezone.utc)
+    rows = [
+        {"user_id": user_id, "question_id": question_id, "last_correct": is_correct,
+         "streak": 1 if is_correct else 0, "attempts": 1, "last_answered_at": answered_at,
+         "next_due_at": next_due(is_correct, 1, answered_at)}
+        for question_id, is_correct in graded.items()
+    ]
+
+    # The due date of a correct answer depends on the stored streak. Every
+    # possible outcome is bound up front so the database picks it in place.
+    streak = QuestionMastery.streak + 1
+    due_after_streak = case(
+        *((streak == n, next_due(True, n, answered_at)) for n in range(1, len(REVIEW_INTERVALS))),
+        else_=next_due(True, len(REVIEW_INTERVALS), answered_at),
+    )
+
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        # Single-statement upsert of the whole submission
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        statement = upsert(QuestionMastery).values(rows)
+        correct = statement.excluded.last_correct.is_(True)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[QuestionMastery.user_id, QuestionMastery.question_id],
+            set_={
+                "last_correct": statement.excluded.last_correct,
+                "streak": case((correct, streak), else_=0),
+                "attempts": QuestionMastery.attempts + 1,
+                "last_answered_at": statement.excluded.last_answered_at,
+                "next_due_at": case((correct, due_after_streak), else_=statement.excluded.next_due_at),
+            },
+        ))
+        return
+
+    for row in rows:
+        key = (QuestionMastery.user_id == user_id) & (QuestionMastery.question_id == row["question_id"])
+        changes = {
+            QuestionMastery.last_correct: row["last_correct"],
+            QuestionMastery.streak: streak if row["last_correct"] else 0,
+            QuestionMastery.attempts: QuestionMastery.attempts + 1,
+            QuestionMastery.last_answered_at: answered_at,
+            QuestionMastery.next_due_at: due_after_streak if row["last_correct"] else row["next_due_at"],
+        }
+        if db.query(QuestionMastery).filter(key).update(changes, synchronize_session=False):
+            continue
+        try:
+            with db.begin_nested():
+                db.add(QuestionMastery(**row))
+        except IntegrityError:
+            # Another submission answered the same question first
+            db.query(QuestionMastery).filter(key).update(changes, synchronize_session=False)
+
+
+# === Read side ===
+def review_set(db, user_id, limit: int = REVIEW_SET_SIZE, now: datetime | None = None) -> list:
+    """
+    Up to `limit` questions due for the user, most overdue first: misses and
+    questions not seen for longer than their interval, across all their
+    quizzes. One query, served by ix_question_mastery_user_due.
+    """
+    now = now or datetime.now(timezone.utc)
+    rows = (
+        db.query(
+            Question.id, Question.quiz_id, Question.text, Question.options, Question.correct_answer,
+            Question.explanation, Question.question_type, QuestionMastery.last_correct,
+            QuestionMastery.streak, QuestionMastery.last_answered_at, QuestionMastery.next_due_at,
+        )
+        .join(Question, Question.id == QuestionMastery.question_id)
+        .filter(QuestionMastery.user_id == user_id, QuestionMastery.next_due_at <= now)
+        .order_by(QuestionMastery.next_due_at)
+        .limit(limit)
+        .all()
+    )
+    return [dict(row._mapping) for row in rows]
+
+
+# === Rebuild from stored answers ===
+def _row_answers(connection, user_id):
+    answers = UserAnswer.__table__
+    answered_at = answers.c.submitted_at
+    query = (
+        select(answered_at, answers.c.user_id, answers.c.question_id, answers.c.is_correct)
+        .where(answers.c.is_correct.is_not(None), answered_at.is_not(None))
+        .order_by(answered_at)
+    )
+    if user_id is not None:
+        query = query.where(answers.c.user_id == user_id)
+    yield from connection.execution_options(yield_per=5000).execute(query)
+
+
+def _compact_answers(connection, user_id):
+    attempts = QuizAttempt.__table__
+    query = (
+        select(attempts.c.submitted_at, attempts.c.user_id, attempts.c.answers_blob)
+        .where(attempts.c.answers_blob.is_not(None), attempts.c.submitted_at.is_not(None))
+        .order_by(attempts.c.submitted_at)
+    )
+    if user_id is not None:
+        query = query.where(attempts.c.user_id == user_id)
+    for submitted_at, owner, blob in connection.execution_options(yield_per=1000).execute(query):
+        for stored in decode_answers(blob):
+            if stored.is_correct is not None:
+                yield submitted_at, owner, stored.question_id, stored.is_correct
+
+
+def rebuild_mastery(connection, user_id=None, batch_size: int = 5000) -> int:
+    """
+    Replaces the mastery rows of one user (or all) by replaying their graded
+    answers oldest first, from user_answers rows and compact records alike.
+    Returns the number of rows written.
+    """
+    table = QuestionMastery.__table__
+    clear = delete(table)
+    if user_id is not None:
+        clear = clear.where(table.c.user_id == user_id)
+    connection.execute(clear)
+
+    state = {}  # (user_id, question_id) -> [last_correct, streak, attempts, last_answered_at]
+    answers = heapq.merge(_row_answers(connection, user_id), _compact_answers(connection, user_id),
+                          key=lambda answer: answer[0])
+    for answered_at, owner, question_id, is_correct in answers:
+        entry = state.setdefault((owner, question_id), [False, 0, 0, None])
+        entry[:] = [is_correct, entry[1] + 1 if is_correct else 0, entry[2] + 1, answered_at]
+
+    rows = [
+        {"user_id": owner, "question_id": question_id, "last_correct": last_correct, "streak": streak,
+         "attempts": attempts, "last_answered_at": answered_at,
+         "next_due_at": next_due(last_correct, streak, answered_at)}
+        for (owner, question_id), (last_correct, streak, attempts, answered_at) in state.items()
+    ]
+    for start in range(0, len(rows), batch_size):
+        connection.execute(insert(table), rows[start:start + batch_size])
+    return len(rows)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=uuid.UUID, default=None, help="rebuild only this user")
+    args = parser.parse_args(argv)
+
+    from db.session import engine
+
+    with engine.begin() as connection:
+        written = rebuild_mastery(connection, args.user_id)
+    print(f"Rebuilt {written} mastery rows" + (f" for user {args.user_id}" if args.user_id else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# With several uvicorn/gunicorn workers set PROMETHEUS_MULTIPROC_DIR to an
+# empty, writable directory before start-up: every process then writes its
+# samples there and /metrics aggregates all of them, whichever worker answers.
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Request latency by route template",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being served",
+    ["route"], multiprocess_mode="livesum",
+)
+LLM_CALL_DURATION = Histogram(
+    "llm_call_duration_seconds", "LLM call latency including retries",
+    ["function", "outcome"], buckets=LLM_BUCKETS,
+)
+LLM_PROMPT_BYTES = Histogram(
+    "llm_prompt_bytes", "Size of prompts sent to the LLM", ["function"], buckets=SIZE_BUCKETS,
+)
+LLM_RESPONSE_BYTES = Histogram(
+    "llm_response_bytes", "Size of LLM responses", ["function"], buckets=SIZE_BUCKETS,
+)
+EXTRACTION_DURATION = Histogram(
+    "document_extraction_duration_seconds", "Text extraction time per file type",
+    ["file_type"], buckets=LATENCY_BUCKETS,
+)
+EXTRACTION_FAILURES = Counter(
+    "document_extraction_failures_total", "Extractions that raised", ["file_type"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth", "LLM-bound requests waiting for a slot", ["route_class"], multiprocess_mode="livesum",
+)
+ADMISSION_IN_USE = Gauge(
+    "admission_slots_in_use", "LLM-bound requests being served", ["route_class"], multiprocess_mode="livesum",
+)
+ADMISSION_WAIT = Histogram(
+    "admission_wait_seconds", "Time queued before admission or rejection",
+    ["route_class", "outcome"], buckets=LATENCY_BUCKETS,
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "LLM-bound requests turned away", ["route_class", "reason"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_connections_checked_out", "Connections currently in use", multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size", "Configured pool size", multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow", "Connections opened beyond the pool size", multiprocess_mode="livesum",
+)
+
+
+@contextmanager
+def observe_llm_call(function: str, prompt: str):
+    """Times an LLM call; the caller sets `result["text"]` to record response size."""
+    LLM_PROMPT_BYTES.labels(function).observe(len(prompt.encode("utf-8")))
+    result = {"text": None}
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield result
+        outcome = "ok"
+    finally:
+        LLM_CALL_DURATION.labels(function, outcome).observe(time.perf_counter() - started)
+        if result["text"] is not None:
+            LLM_RESPONSE_BYTES.labels(function).observe(len(result["text"].encode("utf-8")))
+
+
+@contextmanager
+def observe_extraction(file_type: str):
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTRACTION_FAILURES.labels(file_type).inc()
+        raise
+    finally:
+        EXTRACTION_DURATION.labels(file_type).observe(time.perf_counter() - started)
+
+
+def update_pool_gauges(engine):
+    pool = engine.pool
+    # SQLite's default pools do not implement the QueuePool counters
+    for gauge, reader in (
+        (DB_POOL_CHECKED_OUT, "checkedout"),
+        (DB_POOL_SIZE, "size"),
+        (DB_POOL_OVERFLOW, "overflow"),
+    ):
+        if hasattr(pool, reader):
+            gauge.set(max(0, getattr(pool, reader)()))
+
+
+def render_metrics():
+    """Returns (body, content_type) for the /metrics endpoint."""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,87 @@
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+from services.grading_cache import normalize_answer
+
+# Similarity at or above ACCEPT is graded correct locally, below REJECT
+# incorrect; anything in between (and anything negated) still goes to the LLM.
+# REJECT defaults to 0 (off): a synonym or abbreviation ("CO2" for "Carbon
+# dioxide") shares no words or trigrams with the reference, so a low score
+# alone is weak evidence. Blank answers are always graded incorrect locally.
+PREGRADE_ENABLED = os.getenv("PREGRADE_ENABLED", "true").lower() in ("1", "true", "yes")
+PREGRADE_ACCEPT = float(os.getenv("PREGRADE_ACCEPT", "0.85"))
+PREGRADE_REJECT = float(os.getenv("PREGRADE_REJECT", "0"))
+
+# A negation can flip the meaning of an otherwise near-identical answer
+NEGATIONS = frozenset({"not", "no", "never", "none", "isn't", "isnt", "doesn't", "doesnt", "cannot", "can't"})
+UNANSWERED = frozenset({"", "unanswered"})
+
+
+@dataclass
+class PregradeDecision:
+    similarity: float
+    is_correct: bool | None  # None: ambiguous, ask the LLM
+
+
+_WORD = re.compile(r"\w+")
+
+
+def _features(text: str) -> list:
+    """
+    Word unigrams plus padded character trigrams, so "mitochondrion" still
+    overlaps "mitochondria". Trigrams run over the whole normalized answer,
+    so a sign or inner punctuation ("-5", "x-1") is part of what is compared.
+    """
+    padded = f" {text} "
+    grams = [padded[i:i + 3] for i in range(len(padded) - 2)]
+    return [f"w:{w}" for w in _WORD.findall(text)] + [f"c:{g}" for g in grams]
+
+
+def _weights(text: str) -> dict:
+    """Sparse feature vector with sublinear TF (1 + log count), no IDF."""
+    return {feature: 1 + math.log(count) for feature, count in Counter(_features(normalize_answer(text))).items()}
+
+
+def _cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(weight * b.get(feature, 0.0) for feature, weight in a.items())
+    if not dot:
+        return 0.0
+    return dot / math.sqrt(sum(w * w for w in a.values()) * sum(w * w for w in b.values()))
+
+
+def similarities(answers: list, references: list) -> list:
+    """
+    Cosine similarity of each answer with its reference, one pair at a time
+    over sparse feature counts, so the cost follows the length of the pair
+    rather than the vocabulary of the whole batch.
+    """
+    return [_cosine(_weights(answer), _weights(reference)) for answer, reference in zip(answers, references)]
+
+
+def pregrade(answers: list, references: list, accept: float = None, reject: float = None) -> list:
+    """Returns one PregradeDecision per (answer, reference) pair."""
+    accept = PREGRADE_ACCEPT if accept is None else accept
+    reject = PREGRADE_REJECT if reject is None else reject
+    scores = similarities(answers, references)
+
+    decisions = []
+    for answer, reference, score in zip(answers, references, scores):
+        answer_words = set(normalize_answer(answer).split())
+        reference_words = set(normalize_answer(reference).split())
+        if normalize_answer(answer) in UNANSWERED:
+            verdict = False
+        elif answer_words & NEGATIONS != reference_words & NEGATIONS:
+            verdict = None
+        elif score >= accept or math.isclose(score, 1.0):
+            verdict = True
+        elif score < reject:
+            verdict = False
+        else:
+            verdict = None
+        decisions.append(PregradeDecision(round(score, 4), verdict))
+    return decisions
@@ -0,0 +1,202 @@
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from db.models import Question, Quiz, QuizAttempt, QuizScoreHistogram, UserAnswer
+from services.answer_storage import decode_answers
+
+# Per-worker entries (quizzes and files). Each entry remembers the attempt
+# count it was computed at (from quiz_score_histograms) and the newest attempt
+# it includes. A submission bumps the count; the next read then aggregates
+# only the attempts submitted since and adds them in. 0 disables.
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "1000"))
+
+
+# === Per-worker LRU of aggregated counts, keyed by ("quiz" | "file", id) ===
+class AnalyticsCache:
+    def __init__(self, max_entries: int = ANALYTICS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(version, snapshot) as last stored, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, snapshot):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, snapshot)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = AnalyticsCache()
+
+
+def get_analytics_cache() -> AnalyticsCache:
+    return _cache
+
+
+# === Versions: (sections, attempts recorded so far), O(score buckets) ===
+def _version(db: Session, quiz_filter):
+    row = (
+        db.query(func.count(func.distinct(Quiz.id)), func.coalesce(func.sum(QuizScoreHistogram.attempts), 0))
+        .outerjoin(QuizScoreHistogram, QuizScoreHistogram.quiz_id == Quiz.id)
+        .filter(quiz_filter)
+        .one()
+    )
+    return tuple(row)
+
+
+# === Aggregation ===
+def _aggregate(db: Session, quiz_ids, questions: dict, since=None):
+    """
+    Per-question counts over the attempts at `quiz_ids` submitted after
+    `since` (all of them when None), in one GROUP BY over user_answers. MCQ
+    answers are grouped by choice; text answers only by question. Answers
+    stored as compact records (ANSWER_STORAGE_MODE=compact) cannot be grouped
+    in SQL, so those records are decoded and added in.
+    Returns ({question_id: [answers, correct, {choice: picks}]}, attempts, newest submitted_at).
+    """
+    choice = case((Question.question_type == "mcq", UserAnswer.answer), else_=None)
+    query = (
+        db.query(
+            UserAnswer.question_id, choice.label("choice"), func.count().label("picked"),
+            func.sum(case((UserAnswer.is_correct.is_(True), 1), else_=0)).label("correct"),
+            func.max(QuizAttempt.submitted_at).label("newest"),
+        )
+        .join(QuizAttempt, UserAnswer.attempt_id == QuizAttempt.id)
+        .join(Question, UserAnswer.question_id == Question.id)
+        .filter(QuizAttempt.quiz_id.in_(quiz_ids))  # driven by ix_quiz_attempts_quiz_submitted
+    )
+    blobs = db.query(QuizAttempt.answers_blob, QuizAttempt.submitted_at).filter(
+        QuizAttempt.quiz_id.in_(quiz_ids), QuizAttempt.answers_blob.is_not(None)
+    )
+    if since is not None:
+        query = query.filter(QuizAttempt.submitted_at > since)
+        blobs = blobs.filter(QuizAttempt.submitted_at > since)
+
+    counts, newest = {}, since
+    for question_id, picked_choice, picked, correct, group_newest in query.group_by(UserAnswer.question_id, choice):
+        entry = counts.setdefault(question_id, [0, 0, {}])
+        entry[0] += picked
+        entry[1] += correct or 0
+        if picked_choice is not None:
+            entry[2][picked_choice] = entry[2].get(picked_choice, 0) + picked
+        if group_newest is not None and (newest is None or group_newest > newest):
+            newest = group_newest
+
+    # Every row-stored attempt answers each of its quiz's questions once
+    per_quiz = {}
+    for question_id, entry in counts.items():
+        quiz_id = questions[question_id]["quiz_id"]
+        per_quiz[quiz_id] = max(per_quiz.get(quiz_id, 0), entry[0])
+    attempts = sum(per_quiz.values())
+
+    for blob, submitted_at in blobs.all():
+        attempts += 1
+        if submitted_at is not None and (newest is None or submitted_at > newest):
+            newest = submitted_at
+        for stored in decode_answers(blob):
+            question = questions.get(stored.question_id)
+            if question is None:
+                continue
+            entry = counts.setdefault(stored.question_id, [0, 0, {}])
+            entry[0] += 1
+            entry[1] += stored.is_correct is True
+            if question["question_type"] == "mcq":
+                entry[2][stored.answer] = entry[2].get(stored.answer, 0) + 1
+    return counts, attempts, newest
+
+
+def _merge(total: dict, delta: dict) -> dict:
+    merged = {qid: [e[0], e[1], dict(e[2])] for qid, e in total.items()}
+    for question_id, (answers, correct, choices) in delta.items():
+        entry = merged.setdefault(question_id, [0, 0, {}])
+        entry[0] += answers
+        entry[1] += correct
+        for picked_choice, picks in choices.items():
+            entry[2][picked_choice] = entry[2].get(picked_choice, 0) + picks
+    return merged
+
+
+def _render(questions: dict, counts: dict) -> list:
+    rendered = []
+    for question_id, question in questions.items():
+        answers, correct, choices = counts.get(question_id, (0, 0, {}))
+        distribution = None
+        if question["question_type"] == "mcq":
+            distribution = {str(option): 0 for option in (question["options"] or [])}
+            for picked_choice, picks in choices.items():
+                distribution[picked_choice] = distribution.get(picked_choice, 0) + picks
+        rendered.append({
+            **{k: v for k, v in question.items() if k != "options"},
+            "attempts": answers,
+            "correct": correct,
+            "correct_rate": round(correct / answers, 4) if answers else None,
+            "answer_distribution": distribution,
+        })
+    # Hardest first; questions nobody has answered yet last
+    return sorted(rendered, key=lambda e: (e["correct_rate"] is None, e["correct_rate"] or 0.0))
+
+
+def _analytics(db: Session, key, quiz_filter, quiz_ids, cache: AnalyticsCache):
+    version = _version(db, quiz_filter)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]["result"], version
+
+    if cached is not None and cached[0][0] == version[0]:
+        # Same sections, more attempts: aggregate only the new ones
+        snapshot = cached[1]
+        delta, attempts, newest = _aggregate(db, quiz_ids, snapshot["questions"], since=snapshot["newest"])
+        if attempts == version[1] - cached[0][1]:
+            counts = _merge(snapshot["counts"], delta)
+            snapshot = {**snapshot, "counts": counts, "newest": newest,
+                        "result": _render(snapshot["questions"], counts)}
+            cache.put(key, version, snapshot)
+            return snapshot["result"], version
+        # An attempt committed out of submitted_at order: recount everything
+
+    questions = {
+        q.id: {"question_id": q.id, "quiz_id": q.quiz_id, "text": q.text,
+               "question_type": q.question_type, "options": q.options}
+        for q in db.query(Question.id, Question.quiz_id, Question.text, Question.question_type, Question.options)
+        .filter(Question.quiz_id.in_(quiz_ids))
+        .order_by(Question.quiz_id, Question.id)
+    }
+    counts, _, newest = _aggregate(db, quiz_ids, questions)
+    snapshot = {"questions": questions, "counts": counts, "newest": newest, "result": _render(questions, counts)}
+    cache.put(key, version, snapshot)
+    return snapshot["result"], version
+
+
+def quiz_analytics(db: Session, quiz_id, cache: AnalyticsCache | None = None) -> dict:
+    cache = get_analytics_cache() if cache is None else cache
+    result, version = _analytics(db, ("quiz", str(quiz_id)), Quiz.id == quiz_id, [quiz_id], cache)
+    return {"quiz_id": quiz_id, "total_attempts": version[1], "questions": result}
+
+
+def file_analytics(db: Session, file_id, cache: AnalyticsCache | None = None) -> dict:
+    cache = get_analytics_cache() if cache is None else cache
+    file_quizzes = db.query(Quiz.id).filter(Quiz.file_id == file_id).scalar_subquery()
+    result, version = _analytics(db, ("file", str(file_id)), Quiz.file_id == file_id, file_quizzes, cache)
+    return {"file_id": file_id, "total_attempts": version[1], "questions": result}
@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy.orm import Session
+
+from db.models import Question, Quiz
+
+# Questions never change after a quiz is generated, so the TTL only bounds how
+# long a deleted quiz can still be graded by a worker that cached it.
+QUIZ_CACHE_SIZE = int(os.getenv("QUIZ_CACHE_SIZE", "2000"))
+QUIZ_CACHE_TTL_SECONDS = float(os.getenv("QUIZ_CACHE_TTL_SECONDS", "300"))
+
+
+# === Per-worker LRU of quizzes as graded (questions with their answer keys) ===
+class QuizCache:
+    def __init__(self, max_entries: int = QUIZ_CACHE_SIZE, ttl_seconds: float = QUIZ_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id):
+        with self._lock:
+            entry = self._entries.get(str(quiz_id))
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] > self.ttl_seconds:
+                del self._entries[str(quiz_id)]
+                return None
+            self._entries.move_to_end(str(quiz_id))
+            return entry[1]
+
+    def put(self, quiz_id, quiz: dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[str(quiz_id)] = (time.monotonic(), quiz)
+            self._entries.move_to_end(str(quiz_id))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, quiz_id):
+        with self._lock:
+            self._entries.pop(str(quiz_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = QuizCache()
+
+
+def get_quiz_cache() -> QuizCache:
+    return _cache
+
+
+def load_quiz_for_grading(db: Session, quiz_id, cache: QuizCache | None = None):
+    """
+    The quiz as the grader needs it: {"quiz_id", "questions": [{"id", "text",
+    "options", "correct_answer", "question_type"}]}, ids as strings. Questions
+    have no stored order (neither here nor in /api/quizzes/{id}), so results are
+    matched to them by id. None when the quiz does not exist.
+    Callers must not mutate the returned dict; it is shared through the cache.
+    """
+    cache = get_quiz_cache() if cache is None else cache
+    quiz = cache.get(quiz_id)
+    if quiz is not None:
+        return quiz
+
+    rows = (
+        db.query(Quiz.id, Question.id, Question.text, Question.options,
+                 Question.correct_answer, Question.question_type)
+        .outerjoin(Question, Question.quiz_id == Quiz.id)
+        .filter(Quiz.id == quiz_id)
+        .all()
+    )
+    if not rows:
+        return None
+
+    quiz = {
+        "quiz_id": str(rows[0][0]),
+        "questions": [
+            {"id": str(question_id), "text": text, "options": options,
+             "correct_answer": correct_answer, "question_type": question_type}
+            for _, question_id, text, options, correct_answer, question_type in rows
+            if question_id is not None
+        ],
+    }
+    cache.put(quiz_id, quiz)
+    return quiz
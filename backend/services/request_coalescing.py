@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.exc import IntegrityError
+from starlette.responses import Response
+
+from db import session as db_session
+from db.models import IdempotencyKey
+
+
+def hash_payload(payload) -> str:
+    """Stable hash of a JSON-like payload (key order does not matter)."""
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+# === Single-flight: concurrent identical calls share one computation ===
+class SingleFlight:
+    def __init__(self):
+        self._in_flight = {}
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def running(self, key: str) -> bool:
+        return key in self._in_flight
+
+    async def run(self, key: str, factory):
+        """
+        Await `factory()` once per key. Callers arriving while it is running
+        await the same task and receive the same result (or exception).
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Shield so one caller disconnecting does not cancel the others' work
+        return await asyncio.shield(task)
+
+
+# === Replay store for requests carrying an Idempotency-Key header ===
+# Keys live in the idempotency_keys table so every worker sees them. A request
+# inserts its (user, key) row before running; the primary key lets exactly one
+# of two concurrent requests in. The row gets the response when the request
+# succeeds and is deleted when it fails, so a retry runs again.
+IDEMPOTENCY_WINDOW_SECONDS = float(os.getenv("IDEMPOTENCY_WINDOW_SECONDS", "600"))
+MAX_KEY_LENGTH = 255
+
+RESERVED, IN_PROGRESS = "reserved", "in_progress"
+
+_session_factory = None
+
+
+def open_session():
+    """A session of the coalesced work's own: the request's is closed when its client disconnects."""
+    return (_session_factory or db_session.SessionLocal)()
+
+
+def set_session_factory(factory):
+    """Swap the sessionmaker used here (tests, benchmarks); None goes back to db.session's."""
+    global _session_factory
+    _session_factory = factory
+
+
+def reserve_key(db, scope: str, user_id, key: str, payload_hash: str, now: datetime | None = None):
+    """
+    Claims `key` for this request. Returns RESERVED when the caller should run
+    it, IN_PROGRESS while an earlier request with the key runs, or the stored
+    response of one that finished. 422 if the key came with another request.
+    """
+    now = now or datetime.now(timezone.utc)
+    # A key can be reused once its window has passed
+    db.query(IdempotencyKey).filter(
+        IdempotencyKey.user_id == user_id,
+        IdempotencyKey.created_at < now - timedelta(seconds=IDEMPOTENCY_WINDOW_SECONDS),
+    ).delete(synchronize_session=False)
+    # If the conflicting row is gone by the time it is read (its request
+    # failed and freed the key), the key is free again: try once more
+    for _ in range(2):
+        db.add(IdempotencyKey(user_id=user_id, key=key, scope=scope, payload_hash=payload_hash, created_at=now))
+        try:
+            db.commit()
+            return RESERVED
+        except IntegrityError:
+            db.rollback()
+        stored = db.get(IdempotencyKey, (user_id, key))
+        if stored is not None:
+            break
+    else:
+        return IN_PROGRESS
+    if (stored.scope, stored.payload_hash) != (scope, payload_hash):
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request.")
+    return IN_PROGRESS if stored.response is None else stored.response
+
+
+def finish_key(user_id, key: str, response=None):
+    """Stores the response for replay, or frees the key (response None) so a retry runs again."""
+    db = open_session()
+    try:
+        row = db.query(IdempotencyKey).filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+        if response is None:
+            row.delete(synchronize_session=False)
+        else:
+            row.update({IdempotencyKey.response: jsonable_encoder(response)}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+single_flight = SingleFlight()
+
+
+async def run_once(scope: str, user_id, resource_id, payload, factory, idempotency_key: str | None = None):
+    """
+    Run `factory(db)` for a (scope, user, resource, payload) combination at
+    most once at a time, with a session of its own, and replay its stored
+    result for repeated requests that send the same Idempotency-Key within
+    the configured window, whichever worker they reach.
+    """
+    payload_hash = hash_payload(payload)
+    flight_key = f"{scope}:{user_id}:{resource_id}:{payload_hash}"
+
+    async def work():
+        db = open_session()
+        try:
+            return await factory(db)
+        finally:
+            db.close()
+
+    if not idempotency_key:
+        return await single_flight.run(flight_key, work)
+    if len(idempotency_key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=422, detail=f"Idempotency-Key is longer than {MAX_KEY_LENGTH} characters.")
+
+    db = open_session()
+    try:
+        reservation = reserve_key(db, scope, user_id, idempotency_key, payload_hash)
+    finally:
+        db.close()
+    if reservation is IN_PROGRESS:
+        if not single_flight.running(flight_key):
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress.")
+        return await single_flight.run(flight_key, work)  # a double-click on this worker: share the run
+    if reservation is not RESERVED:
+        return reservation
+
+    async def run_and_record():
+        try:
+            result = await single_flight.run(flight_key, work)
+        except BaseException:
+            finish_key(user_id, idempotency_key)
+            raise
+        # Error responses are not stored, so a retry after a failure runs again
+        finish_key(user_id, idempotency_key, None if isinstance(result, Response) else result)
+        return result
+
+    # Shielded, so the key is settled even if this client disconnects
+    return await asyncio.shield(asyncio.ensure_future(run_and_record()))
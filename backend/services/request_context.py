@@ -0,0 +1,59 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+# === Per-request timing totals (db, llm, extract), shared across threads ===
+class RequestTimings:
+    def __init__(self, scope: dict | None = None):
+        self.scope = scope or {}
+        self.started_at = time.perf_counter()
+        self.db_statements = 0
+        self.phases = {}
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path", "-")
+
+    def add(self, phase: str, elapsed_ms: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + elapsed_ms
+
+    def server_timing_header(self) -> str:
+        total_ms = (time.perf_counter() - self.started_at) * 1000.0
+        entries = [f'db;dur={self.phases.get("db", 0.0):.1f};desc="{self.db_statements} queries"']
+        for phase in ("llm", "extract"):
+            if phase in self.phases:
+                entries.append(f"{phase};dur={self.phases[phase]:.1f}")
+        entries.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(entries)
+
+
+_current_timings = ContextVar("request_timings", default=None)
+
+
+def begin_request_timings(scope: dict):
+    timings = RequestTimings(scope)
+    return timings, _current_timings.set(timings)
+
+
+def end_request_timings(token):
+    _current_timings.reset(token)
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+@contextmanager
+def track(phase: str):
+    """Adds the block's wall time to `phase` of the current request, if any."""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, (time.perf_counter() - started) * 1000.0)
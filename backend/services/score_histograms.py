@@ -0,0 +1,124 @@
+"""
+Per-quiz score histograms: one row per (quiz, score) with the number of
+attempts that scored it, kept current by the submission that creates each
+attempt. Reads are O(distinct scores), never a scan of quiz_attempts.
+
+Rebuild from quiz_attempts (after a restore, a manual fix, or the first deploy):
+
+    cd backend
+    python -m services.score_histograms               # every quiz
+    python -m services.score_histograms --quiz-id <uuid>
+"""
+import argparse
+import sys
+import uuid
+from dataclasses import dataclass
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from db.models import QuizAttempt, QuizScoreHistogram
+
+
+@dataclass
+class ScoreDistribution:
+    buckets: list  # (score, attempts), lowest score first
+    total: int
+
+    def percentile(self, score: int) -> float | None:
+        """
+        Percentile rank of `score`: the share of attempts below it plus half of
+        those tied with it, 0-100. None when nobody has attempted the quiz.
+        """
+        if not self.total:
+            return None
+        below = sum(count for bucket, count in self.buckets if bucket < score)
+        tied = sum(count for bucket, count in self.buckets if bucket == score)
+        return round(100.0 * (below + tied / 2) / self.total, 1)
+
+
+# === Write side (in the submission's transaction) ===
+def record_score(db, quiz_id, score: int):
+    """Counts one more attempt at `score`. Runs in the caller's transaction."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        # Single-statement upsert: INSERT ... ON CONFLICT DO UPDATE attempts + 1
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        statement = upsert(QuizScoreHistogram).values(quiz_id=quiz_id, score=score, attempts=1)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[QuizScoreHistogram.quiz_id, QuizScoreHistogram.score],
+            set_={"attempts": QuizScoreHistogram.attempts + 1},
+        ))
+        return
+
+    bucket = (QuizScoreHistogram.quiz_id == quiz_id) & (QuizScoreHistogram.score == score)
+    bumped = db.query(QuizScoreHistogram).filter(bucket).update(
+        {QuizScoreHistogram.attempts: QuizScoreHistogram.attempts + 1}, synchronize_session=False
+    )
+    if bumped:
+        return
+    try:
+        with db.begin_nested():
+            db.add(QuizScoreHistogram(quiz_id=quiz_id, score=score, attempts=1))
+    except IntegrityError:
+        # Another submission created the bucket first
+        db.query(QuizScoreHistogram).filter(bucket).update(
+            {QuizScoreHistogram.attempts: QuizScoreHistogram.attempts + 1}, synchronize_session=False
+        )
+
+
+# === Read side ===
+def score_distribution(db, quiz_id) -> ScoreDistribution:
+    buckets = [
+        (row.score, row.attempts)
+        for row in db.query(QuizScoreHistogram.score, QuizScoreHistogram.attempts)
+        .filter(QuizScoreHistogram.quiz_id == quiz_id, QuizScoreHistogram.attempts > 0)
+        .order_by(QuizScoreHistogram.score)
+        .all()
+    ]
+    return ScoreDistribution(buckets=buckets, total=sum(count for _, count in buckets))
+
+
+# === Rebuild from quiz_attempts ===
+def rebuild_histograms(connection, quiz_id=None) -> int:
+    """
+    Replaces the histograms of one quiz (or all) with a GROUP BY over
+    quiz_attempts, in two statements. Returns the number of buckets written.
+    Attempts with no score yet are not counted, as on the write side.
+    """
+    table = QuizScoreHistogram.__table__
+    attempts = QuizAttempt.__table__
+    grouped = (
+        select(attempts.c.quiz_id, attempts.c.score, func.count().label("attempts"))
+        .where(attempts.c.quiz_id.is_not(None), attempts.c.score.is_not(None))
+        .group_by(attempts.c.quiz_id, attempts.c.score)
+    )
+    clear = delete(table)
+    if quiz_id is not None:
+        grouped = grouped.where(attempts.c.quiz_id == quiz_id)
+        clear = clear.where(table.c.quiz_id == quiz_id)
+    connection.execute(clear)
+    result = connection.execute(
+        insert(table).from_select(["quiz_id", "score", "attempts"], grouped)
+    )
+    return result.rowcount
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quiz-id", type=uuid.UUID, default=None, help="rebuild only this quiz")
+    args = parser.parse_args(argv)
+
+    from db.session import engine
+
+    with engine.begin() as connection:
+        buckets = rebuild_histograms(connection, args.quiz_id)
+    print(f"Rebuilt {buckets} score buckets" + (f" for quiz {args.quiz_id}" if args.quiz_id else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import bisect
+import heapq
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import func, literal, literal_column, select, union_all
+from sqlalchemy.orm import Session
+
+from db.models import SEARCH_CONFIG, DocumentRegion, Question, Quiz, UploadedFile, search_vector
+
+# Users whose in-process index (SQLite and other non-PostgreSQL databases) is
+# kept per worker, LRU-evicted. An index is rebuilt when the user's files,
+# sections, questions or document regions change. 0 disables the cache.
+SEARCH_INDEX_CACHE_SIZE = int(os.getenv("SEARCH_INDEX_CACHE_SIZE", "50"))
+
+MAX_QUERY_TERMS = 8
+SNIPPET_CHARS = 200
+
+# A match in a file name counts for more than one in a question, which counts
+# for more than one somewhere in the document text
+KIND_WEIGHTS = {"file": 2.0, "question": 1.0, "document": 0.5}
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str | None) -> list:
+    return _WORD.findall(text.lower()) if text else []
+
+
+def query_terms(query: str) -> list:
+    """Distinct words of the query, in order; each one matches as a prefix."""
+    return list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+
+
+# === In-process inverted index (one user's documents) ===
+class InvertedIndex:
+    """
+    Term -> {document: term frequency} over one user's file names, questions
+    (text + explanation) and document regions. Only term statistics are held;
+    matched documents are read back from the database for display.
+    Ranked with BM25; every query term must match, as a prefix.
+    """
+    K1, B = 1.2, 0.75
+
+    def __init__(self):
+        self.documents = []  # (kind, id)
+        self.lengths = []
+        self.postings = {}
+        self.terms = []  # sorted, for prefix lookups
+
+    def add(self, kind: str, doc_id, *texts):
+        number = len(self.documents)
+        tokens = [token for text in texts for token in tokenize(text)]
+        self.documents.append((kind, doc_id))
+        self.lengths.append(len(tokens))
+        for token in tokens:
+            postings = self.postings.setdefault(token, {})
+            postings[number] = postings.get(number, 0) + 1
+
+    def freeze(self):
+        self.terms = sorted(self.postings)
+        # BM25 length normalisation, once per document
+        average = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        self.norms = [self.K1 * (1 - self.B + self.B * length / (average or 1)) for length in self.lengths]
+        return self
+
+    def _expand(self, prefix: str):
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + "\U0010ffff")
+        return self.terms[start:end]
+
+    def search(self, terms: list, top: int) -> tuple:
+        """([(kind, id, score)] for the `top` best documents matching every term, number matching)."""
+        total, norms, k1 = len(self.documents), self.norms, self.K1 + 1
+        scores = None
+        for term in terms:
+            term_scores = {}
+            for expanded in self._expand(term):
+                postings = self.postings[expanded]
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for number, frequency in postings.items():
+                    term_scores[number] = term_scores.get(number, 0.0) + idf * frequency * k1 / (frequency + norms[number])
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {number: score + term_scores[number] for number, score in scores.items() if number in term_scores}
+            if not scores:
+                return [], 0
+        weighted = (
+            (score * KIND_WEIGHTS[self.documents[number][0]], number) for number, score in scores.items()
+        )
+        best = heapq.nlargest(top, weighted)
+        return [(*self.documents[number], score) for score, number in best], len(scores)
+
+
+class SearchIndexCache:
+    def __init__(self, max_entries: int = SEARCH_INDEX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """(version, index) as last stored, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, index):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, index)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = SearchIndexCache()
+
+
+def get_search_index_cache() -> SearchIndexCache:
+    return _cache
+
+
+def _user_files(user_id):
+    return select(UploadedFile.id).where(UploadedFile.user_id == user_id).scalar_subquery()
+
+
+def _version(db: Session, user_id):
+    """Files, sections, questions and regions the user has. Content is append-only, so counts identify it."""
+    files = _user_files(user_id)
+    quizzes = select(Quiz.id).where(Quiz.file_id.in_(files)).scalar_subquery()
+    row = db.query(
+        select(func.count()).where(UploadedFile.user_id == user_id).scalar_subquery(),
+        select(func.count()).where(Quiz.file_id.in_(files)).scalar_subquery(),
+        select(func.count()).where(Question.quiz_id.in_(quizzes)).scalar_subquery(),
+        select(func.count()).where(DocumentRegion.file_id.in_(files)).scalar_subquery(),
+    ).one()
+    return tuple(row)
+
+
+def build_index(db: Session, user_id) -> InvertedIndex:
+    """Reads the user's searchable text in three streamed queries and indexes it."""
+    index = InvertedIndex()
+    files = _user_files(user_id)
+    for file_id, name in db.execute(select(UploadedFile.id, UploadedFile.original_name)
+                                    .where(UploadedFile.user_id == user_id)):
+        index.add("file", file_id, name)
+    questions = (
+        select(Question.id, Question.text, Question.explanation)
+        .join(Quiz, Question.quiz_id == Quiz.id)
+        .where(Quiz.file_id.in_(files))
+    )
+    for question_id, text, explanation in db.execute(questions, execution_options={"yield_per": 5000}):
+        index.add("question", question_id, text, explanation)
+    regions = select(DocumentRegion.id, DocumentRegion.text).where(DocumentRegion.file_id.in_(files))
+    for region_id, text in db.execute(regions, execution_options={"yield_per": 500}):
+        index.add("document", region_id, text)
+    return index.freeze()
+
+
+def _search_in_process(db: Session, user_id, terms: list, limit: int, offset: int, cache: SearchIndexCache):
+    version = _version(db, user_id)
+    cached = cache.get(str(user_id))
+    if cached is not None and cached[0] == version:
+        index = cached[1]
+    else:
+        index = build_index(db, user_id)
+        cache.put(str(user_id), version, index)
+    ranked, total = index.search(terms, offset + limit)
+    return ranked[offset:], total
+
+
+# === PostgreSQL: tsvector @@ tsquery over the GIN-indexed expressions ===
+def _search_postgres(db: Session, user_id, terms: list, limit: int, offset: int):
+    tsquery = func.to_tsquery(literal_column(f"'{SEARCH_CONFIG}'"), " & ".join(f"{term}:*" for term in terms))
+
+    def branch(kind, id_column, vector, *joins):
+        query = select(
+            literal(kind).label("kind"), id_column.label("id"),
+            (func.ts_rank(vector, tsquery) * KIND_WEIGHTS[kind]).label("rank"),
+        ).select_from(id_column.table)
+        for target, on in joins:
+            query = query.join(target, on)
+        return query.where(UploadedFile.user_id == user_id, vector.op("@@")(tsquery))
+
+    hits = union_all(
+        branch("file", UploadedFile.id, search_vector(UploadedFile.original_name)),
+        branch("question", Question.id, search_vector(Question.text, Question.explanation),
+               (Quiz, Question.quiz_id == Quiz.id), (UploadedFile, Quiz.file_id == UploadedFile.id)),
+        branch("document", DocumentRegion.id, search_vector(DocumentRegion.text),
+               (UploadedFile, DocumentRegion.file_id == UploadedFile.id)),
+    ).subquery()
+    rows = db.execute(
+        select(hits.c.kind, hits.c.id, hits.c.rank, func.count().over().label("total"))
+        .order_by(hits.c.rank.desc(), hits.c.id)
+        .limit(limit).offset(offset)
+    ).all()
+    if not rows and offset:
+        # Past the last page: still report how many matched
+        total = db.execute(select(func.count()).select_from(hits)).scalar()
+        return [], total
+    return [(row.kind, row.id, row.rank) for row in rows], (rows[0].total if rows else 0)
+
+
+# === Results ===
+def snippet(text: str | None, terms: list, width: int = SNIPPET_CHARS) -> str | None:
+    """About `width` characters of `text` around the first word starting with a query term."""
+    if not text:
+        return None
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(term) for term in terms) + ")", re.IGNORECASE)
+    match = pattern.search(text)
+    if match is None:
+        return None
+    start = max(0, match.start() - width // 4)
+    end = min(len(text), start + width)
+    return ("…" if start else "") + " ".join(text[start:end].split()) + ("…" if end < len(text) else "")
+
+
+def _hydrate(db: Session, hits: list, terms: list) -> list:
+    """Reads display fields for one page of hits: at most one query per kind present."""
+    ids = {}
+    for kind, doc_id, _ in hits:
+        ids.setdefault(kind, []).append(doc_id)
+
+    rows = {}
+    if "file" in ids:
+        for row in db.query(UploadedFile.id, UploadedFile.original_name).filter(UploadedFile.id.in_(ids["file"])):
+            rows[("file", row.id)] = {"file_id": row.id, "file_name": row.original_name,
+                                      "title": row.original_name, "snippet": None}
+    if "question" in ids:
+        questions = (
+            db.query(Question.id, Question.quiz_id, Question.text, Question.explanation,
+                     UploadedFile.id.label("file_id"), UploadedFile.original_name)
+            .join(Quiz, Question.quiz_id == Quiz.id)
+            .join(UploadedFile, Quiz.file_id == UploadedFile.id)
+            .filter(Question.id.in_(ids["question"]))
+        )
+        for row in questions:
+            rows[("question", row.id)] = {"file_id": row.file_id, "file_name": row.original_name,
+                                          "quiz_id": row.quiz_id, "question_id": row.id, "title": row.text,
+                                          "snippet": snippet(row.explanation, terms)}
+    if "document" in ids:
+        regions = (
+            db.query(DocumentRegion.id, DocumentRegion.region_index, DocumentRegion.text,
+                     UploadedFile.id.label("file_id"), UploadedFile.original_name)
+            .join(UploadedFile, DocumentRegion.file_id == UploadedFile.id)
+            .filter(DocumentRegion.id.in_(ids["document"]))
+        )
+        for row in regions:
+            rows[("document", row.id)] = {"file_id": row.file_id, "file_name": row.original_name,
+                                          "region_index": row.region_index, "title": row.original_name,
+                                          "snippet": snippet(row.text, terms)}
+
+    return [
+        {"kind": kind, "rank": round(float(rank), 4), **rows[(kind, doc_id)]}
+        for kind, doc_id, rank in hits
+        if (kind, doc_id) in rows
+    ]
+
+
+def search(db: Session, user_id, query: str, limit: int = 20, offset: int = 0,
+           cache: SearchIndexCache | None = None) -> dict:
+    """
+    Ranked matches for `query` among the user's file names, questions
+    (with explanations) and extracted document text. Every word must match,
+    as a prefix ("mito energ" finds "mitochondria produce energy"). PostgreSQL answers from
+    its GIN indexes; other databases from the per-worker in-process index.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return {"query": query, "total": 0, "results": []}
+    if db.get_bind().dialect.name == "postgresql":
+        hits, total = _search_postgres(db, user_id, terms, limit, offset)
+    else:
+        cache = get_search_index_cache() if cache is None else cache
+        hits, total = _search_in_process(db, user_id, terms, limit, offset, cache)
+    return {"query": query, "total": total, "results": _hydrate(db, hits, terms)}
@@ -0,0 +1,283 @@
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from sqlalchemy.exc import IntegrityError
+
+from db.models import StoredBlob
+
+CHUNK_SIZE = 1024 * 1024
+LEGACY_UPLOAD_DIR = "uploads"
+
+
+@dataclass(frozen=True)
+class StoredContent:
+    content_hash: str
+    size: int
+    created: bool  # False when identical content was already stored
+
+
+def _spool_and_hash(fileobj, directory: str | None = None):
+    """Copies `fileobj` to a temp file chunk by chunk while hashing it."""
+    digest = hashlib.sha256()
+    size = 0
+    handle = tempfile.NamedTemporaryFile(dir=directory, delete=False)
+    try:
+        with handle:
+            while chunk := fileobj.read(CHUNK_SIZE):
+                digest.update(chunk)
+                handle.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.unlink(handle.name)
+        raise
+    return handle.name, digest.hexdigest(), size
+
+
+# === Backends: blobs are immutable and addressed by their SHA-256 ===
+class BlobStorage(ABC):
+    @abstractmethod
+    def put(self, fileobj) -> StoredContent:
+        ...
+
+    @abstractmethod
+    def open_chunks(self, content_hash: str, chunk_size: int = CHUNK_SIZE):
+        """Yields the blob in chunks; never loads it whole."""
+
+    @abstractmethod
+    def local_path(self, content_hash: str):
+        """Context manager: a filesystem path to the blob for libraries that need one (PyMuPDF, python-docx)."""
+
+    @abstractmethod
+    def exists(self, content_hash: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, content_hash: str):
+        ...
+
+
+class LocalStorage(BlobStorage):
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(os.path.join(root, "tmp"), exist_ok=True)
+
+    def _path(self, content_hash: str) -> str:
+        return os.path.join(self.root, content_hash[:2], content_hash)
+
+    def put(self, fileobj) -> StoredContent:
+        tmp_path, content_hash, size = _spool_and_hash(fileobj, os.path.join(self.root, "tmp"))
+        final_path = self._path(content_hash)
+        if os.path.exists(final_path):
+            os.unlink(tmp_path)
+            return StoredContent(content_hash, size, created=False)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        os.replace(tmp_path, final_path)  # atomic: readers never see a partial blob
+        return StoredContent(content_hash, size, created=True)
+
+    def open_chunks(self, content_hash: str, chunk_size: int = CHUNK_SIZE):
+        with open(self._path(content_hash), "rb") as f:
+            while chunk := f.read(chunk_size):
+                yield chunk
+
+    @contextmanager
+    def local_path(self, content_hash: str):
+        yield self._path(content_hash)
+
+    def exists(self, content_hash: str) -> bool:
+        return os.path.exists(self._path(content_hash))
+
+    def delete(self, content_hash: str):
+        try:
+            os.unlink(self._path(content_hash))
+        except FileNotFoundError:
+            pass
+
+
+class S3Storage(BlobStorage):
+    """
+    Any S3-compatible store (AWS, MinIO, R2). `client` only needs head_object,
+    upload_fileobj, get_object and delete_object, so tests can pass a stand-in.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "uploads/", client=None, endpoint_url: str | None = None):
+        if client is None:
+            import boto3  # optional dependency, only needed for STORAGE_BACKEND=s3
+
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, content_hash: str) -> str:
+        return f"{self.prefix}{content_hash[:2]}/{content_hash}"
+
+    def put(self, fileobj) -> StoredContent:
+        # The key is the hash, so the content is spooled to disk before uploading
+        tmp_path, content_hash, size = _spool_and_hash(fileobj)
+        try:
+            if self.exists(content_hash):
+                return StoredContent(content_hash, size, created=False)
+            with open(tmp_path, "rb") as f:
+                self.client.upload_fileobj(f, self.bucket, self._key(content_hash))
+            return StoredContent(content_hash, size, created=True)
+        finally:
+            os.unlink(tmp_path)
+
+    def open_chunks(self, content_hash: str, chunk_size: int = CHUNK_SIZE):
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(content_hash))["Body"]
+        try:
+            yield from body.iter_chunks(chunk_size)
+        finally:
+            body.close()
+
+    @contextmanager
+    def local_path(self, content_hash: str):
+        handle = tempfile.NamedTemporaryFile(delete=False)
+        try:
+            with handle:
+                for chunk in self.open_chunks(content_hash):
+                    handle.write(chunk)
+            yield handle.name
+        finally:
+            os.unlink(handle.name)
+
+    def exists(self, content_hash: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(content_hash))
+            return True
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if code in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, content_hash: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(content_hash))
+
+
+def build_storage_from_env() -> BlobStorage:
+    backend = os.getenv("STORAGE_BACKEND", "local").lower()
+    if backend == "local":
+        return LocalStorage(os.getenv("STORAGE_ROOT", os.path.join(LEGACY_UPLOAD_DIR, "blobs")))
+    if backend == "s3":
+        return S3Storage(
+            bucket=os.environ["S3_BUCKET"],
+            prefix=os.getenv("S3_PREFIX", "uploads/"),
+            endpoint_url=os.getenv("S3_ENDPOINT_URL") or None,
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected 'local' or 's3'")
+
+
+_storage = None
+
+
+def get_storage() -> BlobStorage:
+    global _storage
+    if _storage is None:
+        _storage = build_storage_from_env()
+    return _storage
+
+
+def set_storage(storage: BlobStorage | None):
+    """Swap the process-wide backend (tests, benchmarks); None rebuilds it from env."""
+    global _storage
+    _storage = storage
+
+
+# === Reference counts: one StoredBlob row per distinct content, shared by UploadedFile rows ===
+def retain_blob(db, content: StoredContent):
+    """Counts one more UploadedFile pointing at `content`. Runs in the caller's transaction."""
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        # Single-statement upsert: INSERT ... ON CONFLICT DO UPDATE refcount + 1
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(StoredBlob).values(content_hash=content.content_hash, size=content.size, refcount=1)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=[StoredBlob.content_hash],
+            set_={"refcount": StoredBlob.refcount + 1},
+        ))
+        return
+
+    bumped = (
+        db.query(StoredBlob)
+        .filter(StoredBlob.content_hash == content.content_hash)
+        .update({StoredBlob.refcount: StoredBlob.refcount + 1}, synchronize_session=False)
+    )
+    if bumped:
+        return
+    try:
+        with db.begin_nested():
+            db.add(StoredBlob(content_hash=content.content_hash, size=content.size, refcount=1))
+    except IntegrityError:
+        # Another upload of the same content inserted the row first
+        db.query(StoredBlob).filter(StoredBlob.content_hash == content.content_hash).update(
+            {StoredBlob.refcount: StoredBlob.refcount + 1}, synchronize_session=False
+        )
+
+
+def release_blob(db, content_hash: str, storage: BlobStorage | None = None):
+    """
+    Drops one reference and commits; deletes the blob itself once nothing
+    points at it. The row goes in a conditional DELETE (refcount <= 0) and the
+    blob is deleted before that commits, so a concurrent retain_blob of the same
+    content waits on the row and then finds the blob gone (see ensure_blob).
+    """
+    blobs = db.query(StoredBlob).filter(StoredBlob.content_hash == content_hash)
+    blobs.update({StoredBlob.refcount: StoredBlob.refcount - 1}, synchronize_session=False)
+    unreferenced = blobs.filter(StoredBlob.refcount <= 0).delete(synchronize_session=False)
+    if unreferenced:
+        try:
+            (storage or get_storage()).delete(content_hash)
+        except BaseException:
+            db.rollback()
+            raise
+    db.commit()
+
+
+def ensure_blob(fileobj, content: StoredContent, storage: BlobStorage | None = None):
+    """
+    Call once `content` is retained and committed. put() may have found the
+    blob already stored just before its last reference was released; if it is
+    gone now, stores `fileobj` again (nothing can release it any more).
+    """
+    storage = storage or get_storage()
+    if content.created or storage.exists(content.content_hash):
+        return
+    fileobj.seek(0)
+    storage.put(fileobj)
+
+
+def discard_upload(db, file_record, storage: BlobStorage | None = None):
+    """Deletes an UploadedFile that has no quizzes yet and releases its content."""
+    content_hash = file_record.content_hash
+    db.delete(file_record)
+    db.flush()  # the file row references the blob row
+    if content_hash:
+        release_blob(db, content_hash, storage)
+    else:
+        db.commit()
+
+
+@contextmanager
+def uploaded_file_path(file_record):
+    """Local path to an upload: content-addressed blob, or a pre-dedup file under uploads/."""
+    if getattr(file_record, "content_hash", None):
+        with get_storage().local_path(file_record.content_hash) as path:
+            yield path
+    else:
+        yield os.path.join(LEGACY_UPLOAD_DIR, file_record.filename)
+
+
+def uploaded_file_chunks(file_record, chunk_size: int = CHUNK_SIZE):
+    if getattr(file_record, "content_hash", None):
+        yield from get_storage().open_chunks(file_record.content_hash, chunk_size)
+        return
+    with open(os.path.join(LEGACY_UPLOAD_DIR, file_record.filename), "rb") as f:
+        yield from iter(lambda: f.read(chunk_size), b"")
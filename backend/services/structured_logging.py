@@ -0,0 +1,168 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_request_id = ContextVar("request_id", default="-")
+
+
+def get_request_id() -> str:
+    return _request_id.get()
+
+
+def set_request_id(request_id: str):
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+# === Payload helpers: never log a full prompt / answer sheet / model output ===
+def summarize_payload(value, max_chars: int | None = None) -> dict:
+    """Size, a stable hash and (optionally) a short preview instead of the payload itself."""
+    if max_chars is None:
+        max_chars = int(os.getenv("LOG_PAYLOAD_CHARS", "200"))
+    text = value if isinstance(value, str) else json.dumps(value, default=str, sort_keys=True)
+    raw = text.encode("utf-8")
+    summary = {"bytes": len(raw), "sha256": hashlib.sha256(raw).hexdigest()[:16]}
+    if max_chars > 0:
+        summary["preview"] = text[:max_chars] + ("…" if len(text) > max_chars else "")
+    return summary
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    """
+    Logs `event` with structured fields; skips building the record when the
+    level is off. A callable field is called only once the level is known to
+    be on, for values that are costly to build (summarize_payload).
+    """
+    if logger.isEnabledFor(level):
+        fields = {name: value() if callable(value) else value for name, value in fields.items()}
+        logger.log(level, event, extra={"event": event, **fields})
+
+
+# === Filters (run in the calling thread, before the record is queued) ===
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of records per `event`. The decision hashes the request
+    id, so a sampled request keeps all of its events. Warnings and errors are
+    never dropped.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        rate = self.rates.get(event, 1.0) if event else 1.0
+        if rate >= 1.0 or record.levelno >= logging.WARNING:
+            return True
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            digest = hashlib.blake2b(f"{request_id}:{event}".encode(), digest_size=8).digest()
+            keep = int.from_bytes(digest, "big") / 2 ** 64 < rate
+        else:
+            keep = random.random() < rate
+        if keep:
+            record.sample_rate = rate
+        return keep
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """"llm.response=0.1,grading.payload=0.01" -> {"llm.response": 0.1, ...}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        event, _, rate = item.partition("=")
+        rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+# === Process-wide setup: a queue handler so request threads never block on I/O ===
+_listener = None
+
+
+def configure_logging(stream=None):
+    """
+    Routes the app's `nexera.*` loggers through a QueueHandler; a background
+    QueueListener does the formatting and writing. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if os.getenv("LOG_FORMAT", "json").lower() == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+        ))
+
+    queue_handler = QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter(parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))))
+
+    app_logger = logging.getLogger("nexera")
+    app_logger.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    app_logger.addHandler(queue_handler)
+
+    _listener = QueueListener(queue_handler.queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_stop_listener)
+    return _listener
+
+
+def restart_logging_listener():
+    """
+    Starts a fresh listener on the same queue and handlers. For a forked
+    worker (gunicorn's post_fork with preload_app): the parent's listener
+    thread does not exist in the child.
+    """
+    global _listener
+    if _listener is None:
+        return None
+    _listener = QueueListener(_listener.queue, *_listener.handlers,
+                              respect_handler_level=_listener.respect_handler_level)
+    _listener.start()
+    return _listener
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,95 @@
+import os
+from dataclasses import dataclass
+
+# Caps on what is read from one document. The quiz prompt only needs a
+# section's worth of text, so there is no point parsing a 2,000-page PDF.
+DEFAULT_MAX_PAGES = int(os.getenv("EXTRACT_MAX_PAGES", "300"))
+DEFAULT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", "400000"))
+
+TXT_BLOCK_CHARS = 64 * 1024
+
+
+@dataclass
+class ExtractedText:
+    text: str
+    units_read: int   # pages (PDF), paragraphs (DOCX) or 64 KB blocks (TXT)
+    truncated: bool   # stopped early at max_pages / max_chars
+
+
+# === Generators: one page / paragraph / block at a time ===
+def iter_pdf_pages(path: str, first_page: int = 1, last_page: int | None = None):
+    import pymupdf  # imported on first use to keep worker boot fast
+
+    doc = pymupdf.open(path)
+    try:
+        last = min(last_page or doc.page_count, doc.page_count)
+        for number in range(max(1, first_page) - 1, last):
+            page = doc.load_page(number)
+            yield page.get_text()
+            del page  # let MuPDF free the page's display list before the next one
+    finally:
+        doc.close()
+
+
+def iter_docx_paragraphs(path: str, first_page: int = 1, last_page: int | None = None):
+    # DOCX has no fixed pages; the range applies to paragraphs
+    from docx import Document
+
+    for number, paragraph in enumerate(Document(path).paragraphs, start=1):
+        if number < first_page:
+            continue
+        if last_page is not None and number > last_page:
+            break
+        yield paragraph.text
+
+
+def iter_txt_blocks(path: str, errors: str = "strict"):
+    with open(path, "r", encoding="utf-8", errors=errors) as f:
+        while block := f.read(TXT_BLOCK_CHARS):
+            yield block
+
+
+def iter_document_text(path: str, file_type: str, first_page: int = 1, last_page: int | None = None,
+                       txt_errors: str = "strict"):
+    file_type = file_type.lower().lstrip(".")
+    if file_type == "pdf":
+        return iter_pdf_pages(path, first_page, last_page)
+    if file_type == "docx":
+        return iter_docx_paragraphs(path, first_page, last_page)
+    return iter_txt_blocks(path, errors=txt_errors)
+
+
+def extract_text(path: str, file_type: str, first_page: int = 1, last_page: int | None = None,
+                 max_pages: int | None = None, max_chars: int | None = None,
+                 txt_errors: str = "strict") -> ExtractedText:
+    """
+    Joins the document's text unit by unit, stopping as soon as `max_pages`
+    units or `max_chars` characters have been read; the rest is never parsed.
+    """
+    max_pages = DEFAULT_MAX_PAGES if max_pages is None else max_pages
+    max_chars = DEFAULT_MAX_CHARS if max_chars is None else max_chars
+    is_txt = file_type.lower().lstrip(".") not in ("pdf", "docx")
+    separator = "" if is_txt else "\n"
+
+    parts, chars, units, truncated = [], 0, 0, False
+    units_iter = iter_document_text(path, file_type, first_page, last_page, txt_errors)
+    try:
+        for unit in units_iter:
+            if units >= max_pages and not is_txt:
+                truncated = True
+                break
+            # The separator before this unit counts towards max_chars too
+            joiner = len(separator) if parts else 0
+            if chars + joiner + len(unit) > max_chars:
+                room = max(0, max_chars - chars - joiner)
+                if room:
+                    parts.append(unit[:room])
+                units += 1
+                truncated = True
+                break
+            parts.append(unit)
+            chars += joiner + len(unit)
+            units += 1
+    finally:
+        units_iter.close()  # closes the PDF right away on early exit
+    return ExtractedText(separator.join(parts), units, truncated)
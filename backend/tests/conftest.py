@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import importlib.util
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.models import Base
+from services.storage import LocalStorage, set_storage
+
+
+@pytest.fixture
+def engine():
+    """An in-memory SQLite database with every table, disposed after the test."""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+@pytest.fixture(autouse=True)
+def blob_storage(tmp_path):
+    """Uploads land in the test's tmp_path, never in the real uploads/ directory."""
+    storage = LocalStorage(str(tmp_path / "blobs"))
+    set_storage(storage)
+    yield storage
+    set_storage(None)
+
+
+@pytest.fixture
+def migration():
+    """Loads an alembic revision module by revision id, e.g. migration("0003_compact_answer_storage")."""
+    versions = os.path.join(os.path.dirname(__file__), "..", "alembic", "versions")
+
+    def load(revision):
+        spec = importlib.util.spec_from_file_location(revision, os.path.join(versions, f"{revision}.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
@@ -0,0 +1,128 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, HTTPException, Request
+from prometheus_client import REGISTRY
+
+from auth.utils import get_current_user
+from routes.file_processor import router as upload_router
+from routes.responses_handler import router as answers_router
+from routes.user_dashboard import router as dashboard_router
+from services.admission import (
+    AdmissionController, AdmissionRejected, Pool, admission_slot, handle_admission_rejected,
+)
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def controller(total=1, queue=4, timeout=5.0):
+    return AdmissionController(
+        [Pool("grading", 1, queue, priority=0), Pool("generation", 1, queue, priority=1)],
+        total=total, queue_timeout=timeout,
+    )
+
+
+def test_only_llm_bound_routes_take_a_slot():
+    def takes_slot(router, path, method):
+        [route] = [r for r in router.routes if r.path == path and method in r.methods]
+        return any(d.call.__name__ == "hold_slot" for d in route.dependant.dependencies)
+
+    assert takes_slot(answers_router, "/", "POST")
+    assert takes_slot(upload_router, "/", "POST")
+    assert takes_slot(dashboard_router, "/dashboard/files/{file_id}/generate", "POST")
+    assert not takes_slot(answers_router, "/attempts", "GET")
+    assert not takes_slot(dashboard_router, "/me", "GET")
+
+
+@pytest.mark.asyncio
+async def test_freed_slot_goes_to_grading_before_generation():
+    admission = controller()
+    await admission.acquire("generation")
+    order = []
+
+    async def wait(name):
+        await admission.acquire(name)
+        order.append(name)
+
+    queued_generation = asyncio.create_task(wait("generation"))
+    await asyncio.sleep(0)
+    queued_grading = asyncio.create_task(wait("grading"))
+    await asyncio.sleep(0)
+    assert order == [] and sample("admission_queue_depth", {"route_class": "grading"}) == 1
+
+    admission.release("generation")
+    await queued_grading
+    assert order == ["grading"] and not queued_generation.done()
+
+    admission.release("grading")
+    await queued_generation
+    assert order == ["grading", "generation"]
+    assert sample("admission_queue_depth", {"route_class": "generation"}) == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_429_and_long_wait_is_503():
+    admission = controller(queue=1, timeout=0.05)
+    rejected = {"route_class": "grading", "reason": "queue_full"}
+    timed_out = {"route_class": "grading", "reason": "timeout"}
+    before = sample("admission_rejected_total", rejected), sample("admission_rejected_total", timed_out)
+
+    await admission.acquire("grading")
+    waiting = asyncio.create_task(admission.acquire("grading"))
+    await asyncio.sleep(0)
+    with pytest.raises(AdmissionRejected) as full:
+        await admission.acquire("grading")
+    assert full.value.status_code == 429 and 1 <= full.value.retry_after <= 60
+
+    with pytest.raises(AdmissionRejected) as slow:
+        await waiting
+    assert slow.value.status_code == 503
+    assert not admission.pools["grading"].waiters
+    assert (sample("admission_rejected_total", rejected), sample("admission_rejected_total", timed_out)) == \
+        (before[0] + 1, before[1] + 1)
+
+
+@pytest.mark.asyncio
+async def test_slot_is_taken_after_auth_and_cheap_routes_never_wait():
+    app = FastAPI()
+    release = asyncio.Event()
+    app.add_exception_handler(AdmissionRejected, handle_admission_rejected)
+
+    def current_user(request: Request):
+        if "authorization" not in request.headers:
+            raise HTTPException(status_code=401, detail="Not authenticated")
+        return object()
+
+    app.dependency_overrides[get_current_user] = current_user
+
+    @app.post("/api/answers/", dependencies=[Depends(admission_slot("grading", controller(queue=1), enabled=True))])
+    async def grade():
+        await release.wait()
+        return {"graded": True}
+
+    @app.get("/user/me")
+    async def me():
+        return {"id": 1}
+
+    transport = httpx.ASGITransport(app=app)
+    auth = {"Authorization": "Bearer t"}
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        running = asyncio.create_task(client.post("/api/answers/", headers=auth))
+        queued = asyncio.create_task(client.post("/api/answers/", headers=auth))
+        await asyncio.sleep(0.05)
+
+        assert (await client.get("/user/me")).status_code == 200
+        assert (await client.post("/api/answers/")).status_code == 401  # never queued
+        turned_away = await client.post("/api/answers/", headers=auth)
+        assert turned_away.status_code == 429 and int(turned_away.headers["retry-after"]) >= 1
+        assert "error" in turned_away.json()
+
+        release.set()
+        assert [(await running).status_code, (await queued).status_code] == [200, 200]
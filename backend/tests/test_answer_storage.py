@@ -0,0 +1,134 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import uuid
+import pytest
+
+import services.answer_storage as answer_storage
+from services import request_coalescing
+from db.models import Question, Quiz, QuizAttempt, User, UserAnswer
+from routes.responses_handler import retrieve_all_attempts, router
+from routes.schemas import SubmissionRequest
+from services.answer_storage import FLAG_ZLIB, decode_answers, encode_answers
+
+
+def _seed(db, attempts=2, questions=3):
+    user = User(email="a@example.com", full_name="A", hashed_password="x")
+    quiz = Quiz()
+    db.add_all([user, quiz])
+    db.flush()
+    quiz_questions = [Question(quiz_id=quiz.id, text=f"Q{n}", correct_answer=f"A{n}", explanation=f"E{n}")
+                      for n in range(questions)]
+    db.add_all(quiz_questions)
+    db.flush()
+    for a in range(attempts):
+        attempt = QuizAttempt(id=uuid.uuid4(), user_id=user.id, quiz_id=quiz.id, score=0)
+        db.add(attempt)
+        for n, q in enumerate(quiz_questions):
+            db.add(UserAnswer(user_id=user.id, attempt_id=attempt.id, question_id=q.id,
+                              answer=f"A{n}" if (n + a) % 2 else "wrong", is_correct=bool((n + a) % 2)))
+    db.commit()
+    return user
+
+
+def _answers_by_question(results):
+    return sorted((r["question"], r["user_answer"], r["is_correct"]) for r in results)
+
+
+def test_roundtrip_keeps_order_nulls_and_ungraded_answers():
+    answers = [(uuid.uuid4(), f"answer {n}", n % 3 == 0 if n % 5 else None) for n in range(21)]
+    answers[4] = (answers[4][0], None, False)
+    answers[7] = (answers[7][0], "", True)
+    answers[9] = (answers[9][0], "naïve — ünïcode", None)
+
+    decoded = decode_answers(encode_answers(answers))
+    assert [tuple(a) for a in decoded] == answers
+
+
+def test_repetitive_answers_are_compressed():
+    answers = [(uuid.uuid4(), "The mitochondria is the powerhouse of the cell", True) for _ in range(50)]
+    blob = encode_answers(answers)
+    assert blob[0] & FLAG_ZLIB
+    assert len(blob) < 50 * 16 + 200
+    assert decode_answers(blob)[-1].answer == answers[-1][1]
+
+
+def test_empty_attempt_and_unknown_version():
+    assert decode_answers(encode_answers([])) == []
+    with pytest.raises(ValueError):
+        decode_answers(b"\x07\x00\x00")
+
+
+@pytest.mark.parametrize("source", ["service", "migration"])
+def test_conversion_moves_rows_into_records_and_back(db, migration, source):
+    # The 0003 migration carries its own copy of the format; both must agree
+    module = answer_storage if source == "service" else migration("0003_compact_answer_storage")
+    convert_rows_to_compact, expand_compact_to_rows = module.convert_rows_to_compact, module.expand_compact_to_rows
+    user = _seed(db, attempts=3)
+    before = _answers_by_question(retrieve_all_attempts(db, user))
+
+    assert convert_rows_to_compact(db.connection(), batch_size=2) == 3
+    db.commit()
+    assert db.query(UserAnswer).count() == 0
+    assert db.query(QuizAttempt).filter(QuizAttempt.answers_blob.is_not(None)).count() == 3
+    assert _answers_by_question(retrieve_all_attempts(db, user)) == before
+
+    assert expand_compact_to_rows(db.connection(), batch_size=2) == 3
+    db.commit()
+    assert db.query(UserAnswer).count() == 9
+    assert _answers_by_question(retrieve_all_attempts(db, user)) == before
+
+
+def test_reader_returns_both_layouts(db):
+    user = _seed(db, attempts=1, questions=2)
+    question = db.query(Question).first()
+    db.add(QuizAttempt(user_id=user.id, quiz_id=question.quiz_id, score=1,
+                       answers_blob=encode_answers([(question.id, "compact answer", True)])))
+    db.commit()
+
+    results = retrieve_all_attempts(db, user)
+    assert len(results) == 3
+    assert {"question": "Q0", "user_answer": "compact answer", "correct_answer": "A0",
+            "explanation": "E0", "is_correct": True} in results
+
+
+@pytest.mark.asyncio
+async def test_compact_mode_writes_one_record_and_no_rows(monkeypatch):
+    qid1, qid2, quiz_id = str(uuid.uuid4()), str(uuid.uuid4()), str(uuid.uuid4())
+    server_quiz = {"quiz_id": quiz_id, "questions": [
+        {"id": qid1, "text": "Q1", "options": ["A", "B"], "correct_answer": "A", "question_type": "mcq"},
+        {"id": qid2, "text": "Q2", "options": ["A", "B"], "correct_answer": "A", "question_type": "mcq"},
+    ]}
+    evaluation = {"results": [{"id": qid1, "is_correct": True, "user_answer": "A"},
+                              {"id": qid2, "is_correct": False, "user_answer": "B"}]}
+
+    class DummyDB:
+        def __init__(self):
+            self.data = []
+
+        def add(self, item): self.data.append(item)
+        def commit(self): pass
+        def refresh(self, item): item.submitted_at = "now"
+        def execute(self, statement): pass
+        def get_bind(self): return type("Bind", (), {"dialect": type("Dialect", (), {"name": "sqlite"})})()
+        def close(self): pass
+
+    monkeypatch.setattr(answer_storage, "ANSWER_STORAGE_MODE", "compact")
+    monkeypatch.setattr("routes.responses_handler.load_quiz_for_grading", lambda db, quiz_id: server_quiz)
+    monkeypatch.setattr("routes.responses_handler.score_user_responses", lambda quiz, answers: evaluation)
+
+    db = DummyDB()
+    monkeypatch.setattr(request_coalescing, "_session_factory", lambda: db)
+    response = await router.routes[0].endpoint(
+        submission=SubmissionRequest(quiz_id=quiz_id, answers={qid1: "A", qid2: "B"}),
+        db=db,
+        current_user=type("User", (), {"id": 1})()
+    )
+
+    assert response["score"] == 1
+    [attempt] = db.data
+    assert isinstance(attempt, QuizAttempt)
+    assert [tuple(a) for a in decode_answers(attempt.answers_blob)] == [
+        (uuid.UUID(qid1), "A", True), (uuid.UUID(qid2), "B", False),
+    ]
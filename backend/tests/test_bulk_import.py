@@ -0,0 +1,130 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import csv
+import io
+import json
+import uuid
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlalchemy import event, func
+
+from db.models import Question, Quiz, UploadedFile, User
+from routes.quizzes_logic import import_quiz_bank
+from routes.user_dashboard import create_additional_quiz, download_user_file
+from services.bulk_import import QuizImportError, copy_rows, import_quizzes, read_quizzes
+
+MCQ = {"question": "Pick the organelle", "options": ["Nucleus", "Ribosome"], "answer": "Nucleus",
+       "explanation": "It holds the DNA.", "question_type": "mcq"}
+TEXT = {"question": "What is ATP?", "answer": "Energy", "question_type": "text", "options": ["ignored"]}
+
+
+@pytest.fixture
+def user(db):
+    user = User(email="teacher@example.com", full_name="T", hashed_password="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _ndjson(*quizzes):
+    return io.BytesIO(b"".join(json.dumps(quiz).encode() + b"\n" for quiz in quizzes))
+
+
+def test_ndjson_quizzes_are_written_in_batches(engine, db, user):
+    quizzes = [{"name": f"Bank {n}.pdf", "questions": [dict(MCQ), dict(TEXT)]} for n in range(5)]
+    statements, progress = [], []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    result = import_quizzes(db, user.id, read_quizzes(_ndjson(*quizzes), "ndjson"), progress=lambda *p: progress.append(p),
+                            batch_size=4)
+    db.commit()
+
+    assert (result["quizzes"], result["questions"]) == (5, 10)
+    assert progress == [(2, 4), (4, 8), (5, 10)]
+    assert len([s for s in statements if s.startswith("INSERT")]) == 9  # files, quizzes, questions per batch
+    assert db.query(func.count(UploadedFile.id)).filter(UploadedFile.user_id == user.id).scalar() == 5
+    assert {f.original_name for f in db.query(UploadedFile)} == {f"Bank {n}.pdf" for n in range(5)}
+    text = db.query(Question).filter(Question.question_type == "text").first()
+    assert text.options is None and text.explanation == "No explanation provided."
+    mcq = db.query(Question).filter(Question.question_type == "mcq").first()
+    assert mcq.options == ["Nucleus", "Ribosome"] and mcq.quiz_id in result["quiz_ids"]
+
+
+def test_json_accepts_one_quiz_a_list_or_quizzes_key(db, user):
+    shapes = [{"questions": [dict(MCQ)]}, [{"questions": [dict(MCQ)]}] * 2, {"quizzes": [{"questions": [dict(TEXT)]}]}]
+    counts = [import_quizzes(db, user.id, read_quizzes(io.BytesIO(json.dumps(shape).encode()), "json"), "bank.json")
+              ["quizzes"] for shape in shapes]
+    assert counts == [1, 2, 1]
+    assert {name for name, in db.query(UploadedFile.original_name)} == {"bank.json #1", "bank.json #2"}
+
+
+@pytest.mark.parametrize("quiz, message", [
+    ({"questions": [dict(MCQ), {"question": "No options", "answer": "A"}]},
+     "line 2, question 2: Missing valid options for MCQ."),
+    ({"questions": [{"question": " ", "answer": "A", "question_type": "text"}]}, "line 2, question 1: Missing question text."),
+    ({"questions": []}, "line 2: expected an object"),
+])
+def test_invalid_quiz_imports_nothing(engine, db, user, quiz, message):
+    with pytest.raises(QuizImportError, match=message.replace(".", r"\.")):
+        import_quizzes(db, user.id, read_quizzes(_ndjson({"questions": [dict(MCQ)]}, quiz), "ndjson"), batch_size=1)
+    db.rollback()
+    assert db.query(func.count(Quiz.id)).scalar() == 0
+
+    with pytest.raises(QuizImportError, match="line 1: invalid JSON"):
+        list(read_quizzes(io.BytesIO(b"{not json\n"), "ndjson"))
+
+
+def test_postgres_rows_go_through_copy_csv():
+    copied = []
+
+    class Cursor:
+        def copy_expert(self, sql, buffer):
+            copied.append((sql, buffer.read()))
+
+        def close(self):
+            pass
+
+    connection = type("Connection", (), {"connection": type("Raw", (), {"cursor": lambda self: Cursor()})()})()
+    question_id = uuid.uuid4()
+    copy_rows(connection, Question.__table__, [
+        {"id": question_id, "text": 'Say "hi",\nthen go', "options": ["A", 'B "b"'], "explanation": None},
+        {"id": question_id, "text": "", "options": None, "explanation": "x"},
+    ])
+
+    sql, payload = copied[0]
+    assert sql == "COPY questions (id, text, options, explanation) FROM STDIN WITH (FORMAT csv)"
+    rows = list(csv.reader(io.StringIO(payload)))
+    assert rows[0] == [str(question_id), 'Say "hi",\nthen go', '["A","B \\"b\\""]', ""]
+    assert payload.endswith(',"",,"x"\n')  # empty string is quoted, NULL is not
+
+
+def test_route_imports_for_the_current_user(db, user):
+    upload = UploadFile(filename="bank.ndjson", file=_ndjson({"name": "Cells", "questions": [dict(MCQ), dict(TEXT)]}))
+    result = import_quiz_bank(upload, None, db, user)
+    assert (result["quizzes"], result["questions"]) == (1, 2)
+    assert db.query(UploadedFile.user_id).one()[0] == user.id
+
+    with pytest.raises(HTTPException) as error:
+        import_quiz_bank(UploadFile(filename="bank.jsonl", file=_ndjson({"questions": [{"answer": "A"}]})), None, db, user)
+    assert error.value.status_code == 422
+    assert import_quiz_bank(UploadFile(filename="bank.csv", file=io.BytesIO(b"")), None, db, user).status_code == 415
+
+
+def test_imported_bank_has_nothing_to_download(db, user):
+    import_quizzes(db, user.id, read_quizzes(_ndjson({"questions": [dict(MCQ)]}), "ndjson"))
+    db.commit()
+    with pytest.raises(HTTPException) as error:
+        download_user_file(db.query(UploadedFile.id).scalar(), db, user)
+    assert error.value.status_code == 409 and "no document" in error.value.detail
+
+
+@pytest.mark.asyncio
+async def test_imported_bank_cannot_generate_more_questions(db, user):
+    import_quizzes(db, user.id, read_quizzes(_ndjson({"questions": [dict(MCQ)]}), "ndjson"))
+    db.commit()
+    with pytest.raises(HTTPException) as error:
+        await create_additional_quiz(db.query(UploadedFile.id).scalar(), db, user)
+    assert error.value.status_code == 409 and "no document" in error.value.detail
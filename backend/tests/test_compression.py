@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from middleware.compression import CompressionMiddleware, choose_encoding
+
+PAYLOAD = [{"question": f"Question {n}", "explanation": "The material explains this in detail. " * 4}
+           for n in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI(default_response_class=ORJSONResponse)
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/large")
+    def large():
+        return PAYLOAD
+
+    @app.get("/small")
+    def small():
+        return {"ok": True}
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter([b"data: 1\n\n" * 200, b"data: 2\n\n"]), media_type="text/event-stream")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b"a,b\n" * 500, b"c,d\n"]), media_type="text/csv")
+
+    @app.get("/image")
+    def image():
+        return Response(b"\x89PNG" + b"\x00" * 5000, media_type="image/png")
+
+    return TestClient(app)
+
+
+def test_large_json_is_gzipped(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content) / 5
+    assert response.json() == PAYLOAD
+
+
+def test_brotli_is_preferred_when_available(client):
+    pytest.importorskip("brotli")
+    response = client.get("/large", headers={"Accept-Encoding": "gzip, deflate, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.json() == PAYLOAD
+
+
+@pytest.mark.parametrize("path", ["/small", "/events", "/stream", "/image"])
+def test_small_streaming_and_binary_responses_pass_through(client, path):
+    response = client.get(path, headers={"Accept-Encoding": "gzip, br"})
+    assert "content-encoding" not in response.headers
+
+
+def test_no_accept_encoding_means_identity(client):
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.json() == PAYLOAD
+
+
+def test_encoding_negotiation_honours_q_values():
+    assert choose_encoding("gzip;q=1.0, br;q=0.5", brotli_available=True) == "gzip"
+    assert choose_encoding("br;q=0, *", brotli_available=True) == "gzip"
+    assert choose_encoding("br", brotli_available=False) is None
+    assert choose_encoding("gzip;q=0", brotli_available=False) is None
@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import io
+import pytest
+
+from db.models import DocumentRegion, UploadedFile, User
+from routes import user_dashboard
+from services import request_coalescing
+from services.document_regions import build_regions, claim_next_region, release_region, split_into_regions
+from services.storage import retain_blob
+
+
+@pytest.fixture
+def stored_file(db, blob_storage):
+    text = "".join(f"Chapter {n}. " + "Enzymes lower activation energy. " * 30 + "\n" for n in range(1, 11))
+    stored = blob_storage.put(io.BytesIO(text.encode("utf-8")))
+    retain_blob(db, stored)
+    file_record = UploadedFile(filename="notes.txt", original_name="notes.txt", file_type="txt",
+                               content_hash=stored.content_hash)
+    db.add(file_record)
+    db.commit()
+    return file_record
+
+
+def test_units_are_grouped_up_to_the_target_size():
+    pages = ["a" * 40, "b" * 40, "c" * 40, "", "d" * 150]
+    regions = list(split_into_regions(pages, target_chars=100))
+
+    assert [(r.first_unit, r.last_unit) for r in regions] == [(1, 2), (3, 3), (5, 5), (5, 5)]
+    assert regions[0].text == "a" * 40 + "\n" + "b" * 40
+    assert all(len(r.text) <= 100 for r in regions)
+    assert "".join(r.text for r in regions[2:]) == "d" * 150
+
+
+def test_oversized_unit_is_cut_at_whitespace():
+    regions = list(split_into_regions(["word " * 50], target_chars=60))
+    assert all(len(r.text) <= 60 and not r.text.endswith(" wor") for r in regions)
+    assert " ".join(r.text for r in regions).split() == ["word"] * 50
+
+
+def test_each_claim_takes_the_next_region_then_wraps(db, stored_file):
+    count = build_regions(db, stored_file, target_chars=2000)
+    assert count == db.query(DocumentRegion).count() > 2
+
+    claimed = [claim_next_region(db, stored_file, count).index for _ in range(count + 1)]
+    assert claimed == list(range(count)) + [0]
+    assert "Chapter 1." in db.query(DocumentRegion).filter_by(region_index=0).one().text
+
+
+def test_released_region_is_claimed_again(db, stored_file):
+    count = build_regions(db, stored_file, target_chars=2000)
+    failed = claim_next_region(db, stored_file, count)
+    release_region(db, stored_file.id, failed)
+    assert claim_next_region(db, stored_file, count).index == failed.index == 0
+
+    # A region claimed in between keeps its place; the failed one waits for the next pass
+    failed, later = claim_next_region(db, stored_file, count), claim_next_region(db, stored_file, count)
+    release_region(db, stored_file.id, failed)
+    assert claim_next_region(db, stored_file, count).index == later.index + 1
+
+
+@pytest.mark.asyncio
+async def test_failed_generation_does_not_skip_its_region(db, stored_file, monkeypatch):
+    user = User(email="student@example.com", hashed_password="x")
+    db.add(user)
+    db.flush()
+    stored_file.user_id = user.id
+    db.commit()
+    file_id = stored_file.id
+
+    async def unavailable(text, existing, db):
+        raise RuntimeError("LLM unavailable")
+
+    async def inline(function, *args, **kwargs):  # the in-memory database lives on this thread
+        return function(*args, **kwargs)
+
+    monkeypatch.setattr(user_dashboard, "run_in_threadpool", inline)
+    monkeypatch.setattr(user_dashboard, "generate_additional_questions", unavailable)
+    monkeypatch.setattr(request_coalescing, "_session_factory", lambda: db)
+    with pytest.raises(RuntimeError):
+        await user_dashboard.create_additional_quiz(file_id, db, user)
+
+    assert db.get(UploadedFile, file_id).region_cursor == 0
+
+
+def test_file_is_split_only_once(db, stored_file):
+    count = build_regions(db, stored_file, target_chars=2000)
+    claim_next_region(db, stored_file, count)
+
+    assert build_regions(db, stored_file, target_chars=500) == count
+    assert db.query(DocumentRegion).count() == count
@@ -0,0 +1,129 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import services.export as export
+from db.models import Question, Quiz, QuizAttempt, UploadedFile, User, UserAnswer
+from routes.responses_handler import export_attempt_history
+from services.answer_storage import encode_answers
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def history(engine):
+    """A user with three attempts: two stored as rows, the newest as a compact record."""
+    db = sessionmaker(bind=engine)()
+    user = User(email="teacher@example.com", full_name="T", hashed_password="x")
+    db.add(user)
+    db.flush()
+    upload = UploadedFile(user_id=user.id, filename="f.pdf", original_name="Cells.pdf", file_type="pdf")
+    db.add(upload)
+    db.flush()
+    quiz = Quiz(file_id=upload.id)
+    db.add(quiz)
+    db.flush()
+    q1 = Question(quiz_id=quiz.id, text="What is ATP?", correct_answer="Energy", question_type="text")
+    q2 = Question(quiz_id=quiz.id, text="Pick one", correct_answer="A", question_type="mcq", options=["A", "B"])
+    db.add_all([q1, q2])
+    db.flush()
+    attempts = []
+    for n in range(2):
+        attempt = QuizAttempt(id=uuid.uuid4(), user_id=user.id, quiz_id=quiz.id, score=n,
+                              submitted_at=START + timedelta(days=n))
+        db.add(attempt)
+        db.add_all([UserAnswer(user_id=user.id, attempt_id=attempt.id, question_id=q1.id, answer='Energy, "quoted"',
+                               is_correct=True),
+                    UserAnswer(user_id=user.id, attempt_id=attempt.id, question_id=q2.id, answer="B", is_correct=False)])
+        attempts.append(attempt.id)
+    compact = QuizAttempt(id=uuid.uuid4(), user_id=user.id, quiz_id=quiz.id, score=2, submitted_at=START + timedelta(days=5),
+                          answers_blob=encode_answers([(q1.id, "Energy", True), (q2.id, "A", True)]))
+    db.add(compact)
+    attempts.append(compact.id)
+    db.add(QuizAttempt(user_id=uuid.uuid4(), quiz_id=quiz.id, score=0, submitted_at=START))  # someone else's
+    db.commit()
+    result = {"user_id": user.id, "attempts": attempts, "questions": (q1.id, q2.id)}
+    db.close()
+    return result
+
+
+def _export(engine, user_id, fmt, after=None):
+    return b"".join(export.export_attempts(engine, user_id, fmt, after)).decode("utf-8")
+
+
+def test_csv_has_a_row_per_answer_for_row_and_compact_attempts(engine, history):
+    rows = list(csv.DictReader(io.StringIO(_export(engine, history["user_id"], "csv"))))
+    assert [r["attempt_id"] for r in rows] == [str(a) for a in history["attempts"] for _ in range(2)]
+    first = next(r for r in rows[:2] if r["question"] == "What is ATP?")  # answers of an attempt come in id order
+    assert first["file_name"] == "Cells.pdf"
+    assert first["user_answer"] == 'Energy, "quoted"' and first["is_correct"] == "True"
+    assert rows[-1]["question"] == "Pick one" and rows[-1]["user_answer"] == "A" and rows[-1]["correct_answer"] == "A"
+
+
+def test_csv_neutralizes_formula_like_text_but_ndjson_does_not(engine, history):
+    db = sessionmaker(bind=engine)()
+    q1, q2 = history["questions"]
+    attempt = QuizAttempt(id=uuid.uuid4(), user_id=history["user_id"], quiz_id=db.get(Question, q1).quiz_id,
+                          score=-1, submitted_at=START + timedelta(days=9))
+    db.add(attempt)
+    db.add_all([UserAnswer(user_id=history["user_id"], attempt_id=attempt.id, question_id=q1,
+                           answer='=HYPERLINK("http://example.com")', is_correct=False),
+                UserAnswer(user_id=history["user_id"], attempt_id=attempt.id, question_id=q2, answer="@SUM(A1)",
+                           is_correct=False)])
+    db.get(Question, q1).correct_answer = "-5"
+    db.commit()
+    db.close()
+
+    rows = list(csv.DictReader(io.StringIO(_export(engine, history["user_id"], "csv"))))[-2:]
+    assert sorted(r["user_answer"] for r in rows) == ["'=HYPERLINK(\"http://example.com\")", "'@SUM(A1)"]
+    assert "'-5" in {r["correct_answer"] for r in rows}
+    assert rows[0]["score"] == "-1"  # numbers are not free text
+
+    last = json.loads(_export(engine, history["user_id"], "ndjson").splitlines()[-1])
+    assert "@SUM(A1)" in {a["user_answer"] for a in last["answers"]}
+
+
+def test_ndjson_resumes_after_a_cursor(engine, history):
+    lines = [json.loads(line) for line in _export(engine, history["user_id"], "ndjson").splitlines()]
+    assert [line["attempt_id"] for line in lines] == [str(a) for a in history["attempts"]]
+    assert [len(line["answers"]) for line in lines] == [2, 2, 2]
+
+    resumed = _export(engine, history["user_id"], "ndjson", export.decode_cursor(lines[0]["cursor"]))
+    assert [json.loads(line)["attempt_id"] for line in resumed.splitlines()] == [str(a) for a in history["attempts"][1:]]
+    assert _export(engine, history["user_id"], "ndjson", export.decode_cursor(lines[-1]["cursor"])) == ""
+
+
+def test_export_streams_in_chunks_from_one_query(engine, history, monkeypatch):
+    monkeypatch.setattr(export, "CHUNK_BYTES", 100)
+    monkeypatch.setattr(export, "STREAM_BATCH", 2)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    chunks = list(export.export_attempts(engine, history["user_id"], "csv"))
+    assert len(chunks) > 1
+    # The joined history query, plus one question lookup for the quiz of the compact attempt
+    assert len(statements) == 2
+
+
+def test_route_streams_and_rejects_bad_cursors(engine, history):
+    db = sessionmaker(bind=engine)()
+    user = type("User", (), {"id": history["user_id"]})()
+    response = export_attempt_history(format="ndjson", after=None, db=db, current_user=user)
+    assert isinstance(response, StreamingResponse)
+    assert response.media_type == "application/x-ndjson"
+
+    with pytest.raises(HTTPException) as exc_info:
+        export_attempt_history(format="csv", after="not-a-cursor", db=db, current_user=user)
+    assert exc_info.value.status_code == 422
+    db.close()
@@ -7,6 +7,8 @@ from fastapi import HTTPException, UploadFile
 from fastapi.testclient import TestClient
 from starlette.datastructures import UploadFile as StarletteUploadFile
 from routes.file_processor import extract_text_from_uploaded_file, router
+from db.models import User
+from services.search import SearchIndexCache, search
 from io import BytesIO
 import tempfile
 
@@ -44,6 +46,8 @@ async def test_handle_file_upload_valid_extension(monkeypatch):
         def add(self, x): pass
         def commit(self): pass
         def refresh(self, x): pass
+        def get_bind(self): return type("Bind", (), {"dialect": type("Dialect", (), {"name": "sqlite"})})()
+        def execute(self, statement, params=None): pass
 
     class DummyUser:
         id = 123
@@ -83,3 +87,24 @@ async def test_handle_file_upload_invalid_extension():
 
     response = await router.routes[0].endpoint(file=dummy_file, db=DummyDB(), current_user=DummyUser())
     assert isinstance(response, dict) or response.status_code == 415
+
+
+@pytest.mark.asyncio
+async def test_uploaded_document_text_is_searchable_straight_away(db, monkeypatch):
+    async def same_thread(func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    async def no_questions(text, db):
+        return []
+
+    monkeypatch.setattr("routes.file_processor.run_in_threadpool", same_thread)
+    monkeypatch.setattr("routes.file_processor.generate_quiz_from_text", no_questions)
+    user = User(email="reader@example.com", full_name="Reader", hashed_password="x")
+    db.add(user)
+    db.commit()
+
+    upload = UploadFile(filename="lecture.txt", file=BytesIO(b"Photosynthesis turns light into chemical energy."))
+    response = await router.routes[0].endpoint(file=upload, db=db, current_user=user)
+
+    result = search(db, user.id, "photosynth", cache=SearchIndexCache())
+    assert [(hit["kind"], hit["file_id"]) for hit in result["results"]] == [("document", response["file_id"])]
@@ -0,0 +1,105 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+
+from services import pregrader
+from services.grading import grade_submission
+from services.grading_cache import GradingCache, normalize_answer, question_version
+
+QUIZ = {
+    "quiz_id": "quiz-1",
+    "questions": [
+        {"id": "q1", "text": "Which process makes glucose in plants?", "correct_answer": "Photosynthesis",
+         "question_type": "text"},
+        {"id": "q2", "text": "Powerhouse of the cell?", "correct_answer": "Mitochondria", "question_type": "text"},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def cache_only(monkeypatch):
+    # These answers are exact matches the pre-grader would settle by itself
+    monkeypatch.setattr(pregrader, "PREGRADE_ENABLED", False)
+
+
+class RecordingScorer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, quiz, answers):
+        self.calls.append([str(q["id"]) for q in quiz["questions"]])
+        expected = {q["id"]: q["correct_answer"] for q in quiz["questions"]}
+        return {"results": [
+            {"id": a["id"], "user_answer": a["answer"], "correct_answer": expected[a["id"]],
+             "is_correct": normalize_answer(a["answer"]) == normalize_answer(expected[a["id"]]),
+             "explanation": f"Expected {expected[a['id']]}."}
+            for a in answers
+        ]}
+
+
+def test_trivial_differences_normalize_to_one_key():
+    variants = ["photosynthesis", "Photosynthesis.", "  PHOTOSYNTHESIS!  ", "ｐｈｏｔｏｓｙｎｔｈｅｓｉｓ"]
+    assert {normalize_answer(v) for v in variants} == {"photosynthesis"}
+    assert normalize_answer("cell  wall,\tplant") == "cell wall, plant"
+
+
+def test_signs_and_inner_punctuation_are_kept():
+    assert normalize_answer("-5") == "-5" and normalize_answer("5") == "5"
+    assert normalize_answer(" +5. ") == "+5" and normalize_answer(".5") == ".5"
+    assert normalize_answer("x-1") == "x-1" and normalize_answer("3.14!") == "3.14"
+    assert normalize_answer("- photosynthesis") == "photosynthesis"
+    assert normalize_answer("...") == ""
+
+
+def test_repeat_answers_skip_the_llm():
+    cache, scorer = GradingCache(max_entries=100), RecordingScorer()
+    first = grade_submission(QUIZ, [{"id": "q1", "answer": "photosynthesis"}, {"id": "q2", "answer": "golgi"}],
+                             scorer, cache)
+    second = grade_submission(QUIZ, [{"id": "q1", "answer": "Photosynthesis."}, {"id": "q2", "answer": "Golgi"}],
+                              scorer, cache)
+
+    assert scorer.calls == [["q1", "q2"]]
+    assert second["cache"] == {"hits": 2, "misses": 0}
+    assert [r["is_correct"] for r in second["results"]] == [r["is_correct"] for r in first["results"]] == [True, False]
+    assert second["results"][0]["user_answer"] == "Photosynthesis."
+    assert second["results"][0]["explanation"] == "Expected Photosynthesis."
+
+
+def test_only_uncached_questions_are_sent_to_the_llm():
+    cache, scorer = GradingCache(max_entries=100), RecordingScorer()
+    grade_submission(QUIZ, [{"id": "q1", "answer": "photosynthesis"}, {"id": "q2", "answer": "golgi"}], scorer, cache)
+    result = grade_submission(QUIZ, [{"id": "q1", "answer": "photosynthesis"}, {"id": "q2", "answer": "ribosome"}],
+                              scorer, cache)
+
+    assert scorer.calls[-1] == ["q2"]
+    assert [r["id"] for r in result["results"]] == ["q1", "q2"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 3, 0.25)
+    assert "quiz-1" not in str(stats)
+
+
+def test_changed_question_is_regraded():
+    cache, scorer = GradingCache(max_entries=100), RecordingScorer()
+    answers = [{"id": "q1", "answer": "photosynthesis"}, {"id": "q2", "answer": "mitochondria"}]
+    grade_submission(QUIZ, answers, scorer, cache)
+
+    edited = {**QUIZ, "questions": [{**QUIZ["questions"][0], "correct_answer": "Chemosynthesis"}, QUIZ["questions"][1]]}
+    assert question_version(edited["questions"][0]) != question_version(QUIZ["questions"][0])
+    result = grade_submission(edited, answers, scorer, cache)
+    assert scorer.calls[-1] == ["q1"]
+    assert result["results"][0]["is_correct"] is False
+
+
+def test_least_recently_used_verdict_is_evicted():
+    cache = GradingCache(max_entries=2)
+    a, b, c = (cache.key("q1", "v1", answer) for answer in ("a", "b", "c"))
+    cache.put(a, {"is_correct": True})
+    cache.put(b, {"is_correct": False})
+    cache.get(a)
+    cache.put(c, {"is_correct": False})
+
+    assert len(cache) == 2
+    assert cache.get(b) is None
+    assert cache.get(a) == {"is_correct": True}
@@ -0,0 +1,39 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import threading
+import time
+import pytest
+
+from services.lifecycle import InFlightTracker
+from services.llm_resilience import LLMUnavailableError
+
+
+def test_wait_idle_returns_once_in_flight_requests_finish():
+    tracker = InFlightTracker()
+    tracker.enter()
+    threading.Timer(0.05, tracker.exit).start()
+
+    started = time.monotonic()
+    assert tracker.wait_idle(timeout=2) is True
+    assert time.monotonic() - started < 1
+    assert tracker.count == 0
+
+
+def test_wait_idle_gives_up_at_the_deadline():
+    tracker = InFlightTracker()
+    tracker.enter()
+
+    assert tracker.wait_idle(timeout=0.05) is False
+    assert tracker.count == 1
+
+
+def test_new_requests_are_refused_while_draining():
+    tracker = InFlightTracker()
+    assert tracker.wait_idle(timeout=0) is True
+
+    with pytest.raises(LLMUnavailableError) as excinfo:
+        tracker.enter()
+    assert excinfo.value.retry_after == 1
+    assert tracker.count == 0
@@ -0,0 +1,98 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import pytest
+from services import llm_providers
+from services.gemini_service import build_quiz_from_content, score_user_answers, expand_quiz_with_new_items
+from services.llm_providers import FakeLLMProvider, FakeUpstreamError, build_provider_from_env
+from services.llm_resilience import gemini_caller, TokenBucket
+
+SAMPLE_TEXT = (
+    "Photosynthesis converts light energy into chemical energy. "
+    "Chlorophyll absorbs mostly blue and red light. "
+    "The Calvin cycle fixes carbon dioxide into sugars. "
+    "Oxygen is released as a byproduct of splitting water."
+)
+
+
+class DummyDB:
+    def execute(self, statement):
+        return type("Result", (), {"scalars": lambda self: type("S", (), {"all": lambda self: []})()})()
+
+
+@pytest.fixture
+def fake_provider(monkeypatch):
+    monkeypatch.setattr(gemini_caller, "limiter", TokenBucket(rate_per_second=1000, capacity=100))
+    provider = FakeLLMProvider(seed=7)
+    llm_providers.set_llm_provider(provider)
+    yield provider
+    llm_providers.set_llm_provider(None)
+
+
+def test_provider_selected_by_configuration(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "fake")
+    monkeypatch.setenv("FAKE_LLM_FAILURE_RATE", "0.25")
+    provider = build_provider_from_env()
+    assert isinstance(provider, FakeLLMProvider)
+    assert provider.failure_rate == 0.25
+
+    monkeypatch.setenv("LLM_PROVIDER", "nope")
+    with pytest.raises(ValueError):
+        build_provider_from_env()
+
+
+@pytest.mark.asyncio
+async def test_build_quiz_with_fake_provider_is_deterministic(fake_provider):
+    first = await build_quiz_from_content(SAMPLE_TEXT, DummyDB())
+    second = await build_quiz_from_content(SAMPLE_TEXT, DummyDB())
+
+    assert len(first) == 10
+    assert [q["question_type"] for q in first].count("mcq") == 5
+    assert all(q["answer"] in q["options"] for q in first if q["question_type"] == "mcq")
+    assert [q["question"] for q in first] == [q["question"] for q in second]
+
+
+@pytest.mark.asyncio
+async def test_expand_quiz_with_fake_provider(fake_provider):
+    questions = await expand_quiz_with_new_items(SAMPLE_TEXT, ["Q1", "Q2"], DummyDB())
+    assert len(questions) == 10
+    assert all(q["options"] is None for q in questions if q["question_type"] == "text")
+
+
+def test_score_user_answers_with_fake_provider(fake_provider):
+    quiz = {"questions": [
+        {"id": "1", "text": "Capital of France?", "correct_answer": "Paris"},
+        {"id": "2", "text": "2+2?", "correct_answer": "4"},
+    ]}
+    result = score_user_answers(quiz, [{"id": "1", "answer": "paris."}, {"id": "2", "answer": "5"}])
+    verdicts = {r["id"]: r["is_correct"] for r in result["results"]}
+    assert verdicts == {"1": True, "2": False}
+
+
+def test_fake_provider_latency_and_failures_are_reproducible():
+    slept = []
+    provider = FakeLLMProvider(latency_median_ms=200, latency_p95_ms=800, failure_rate=0.3, seed=1, sleep=slept.append)
+    outcomes = []
+    for _ in range(50):
+        try:
+            provider.generate("build_quiz_from_content", "prompt", {"text": SAMPLE_TEXT})
+            outcomes.append("ok")
+        except FakeUpstreamError:
+            outcomes.append("fail")
+
+    replay_slept = []
+    replay = FakeLLMProvider(latency_median_ms=200, latency_p95_ms=800, failure_rate=0.3, seed=1, sleep=replay_slept.append)
+    replay_outcomes = []
+    for _ in range(50):
+        try:
+            json.loads(replay.generate("build_quiz_from_content", "prompt", {"text": SAMPLE_TEXT}))
+            replay_outcomes.append("ok")
+        except FakeUpstreamError:
+            replay_outcomes.append("fail")
+
+    assert outcomes == replay_outcomes
+    assert slept == replay_slept
+    assert 0 < outcomes.count("fail") < 50
+    assert 0.05 < sorted(slept)[len(slept) // 2] < 0.5
@@ -0,0 +1,133 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from services.llm_resilience import (
+    CircuitBreaker,
+    LLMUnavailableError,
+    ResilientCaller,
+    TokenBucket,
+    is_retryable_error,
+)
+
+
+class UpstreamError(Exception):
+    def __init__(self, code):
+        super().__init__(f"upstream {code}")
+        self.code = code
+
+
+def make_caller(**overrides):
+    options = dict(
+        limiter=TokenBucket(rate_per_second=1000, capacity=100),
+        breaker=CircuitBreaker(failure_threshold=3, cooldown_seconds=60),
+        max_attempts=4,
+        deadline_seconds=30,
+        sleep=lambda seconds: None,
+    )
+    options.update(overrides)
+    return ResilientCaller(**options)
+
+
+# -------------------------------
+# Error classification
+# -------------------------------
+
+def test_is_retryable_error():
+    assert is_retryable_error(UpstreamError(429))
+    assert is_retryable_error(UpstreamError(503))
+    assert is_retryable_error(TimeoutError())
+    assert not is_retryable_error(UpstreamError(400))
+    assert not is_retryable_error(ValueError("bad json"))
+
+
+# -------------------------------
+# Retries
+# -------------------------------
+
+def test_call_retries_then_succeeds():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise UpstreamError(429)
+        return "ok"
+
+    caller = make_caller()
+    assert caller.call(flaky) == "ok"
+    assert len(calls) == 3
+    assert caller.total_retries == 2
+    assert caller.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_call_does_not_retry_client_errors():
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise UpstreamError(400)
+
+    with pytest.raises(UpstreamError):
+        make_caller().call(bad_request)
+    assert len(calls) == 1
+
+
+def test_call_gives_up_after_max_attempts():
+    caller = make_caller(breaker=CircuitBreaker(failure_threshold=100, cooldown_seconds=60))
+
+    def always_down():
+        raise UpstreamError(503)
+
+    with pytest.raises(LLMUnavailableError) as exc_info:
+        caller.call(always_down)
+    assert exc_info.value.retry_after >= 1
+
+
+# -------------------------------
+# Circuit breaker
+# -------------------------------
+
+def test_breaker_opens_and_fails_fast():
+    caller = make_caller(max_attempts=1)
+    calls = []
+
+    def always_down():
+        calls.append(1)
+        raise UpstreamError(500)
+
+    for _ in range(3):
+        with pytest.raises(LLMUnavailableError):
+            caller.call(always_down)
+
+    assert caller.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(LLMUnavailableError) as exc_info:
+        caller.call(always_down)
+    assert len(calls) == 3  # the fourth call never reached the upstream
+    assert exc_info.value.retry_after > 1
+    assert caller.snapshot()["circuit_breaker"]["total_rejections"] == 1
+
+
+def test_breaker_half_open_trial_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0)
+    caller = make_caller(breaker=breaker, max_attempts=1)
+
+    with pytest.raises(LLMUnavailableError):
+        caller.call(lambda: (_ for _ in ()).throw(UpstreamError(503)))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert caller.call(lambda: "recovered") == "recovered"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+# -------------------------------
+# Rate limiter
+# -------------------------------
+
+def test_rate_limiter_rejects_when_deadline_too_short():
+    caller = make_caller(limiter=TokenBucket(rate_per_second=0.01, capacity=1), deadline_seconds=0.05)
+    assert caller.call(lambda: "first") == "first"
+    with pytest.raises(LLMUnavailableError) as exc_info:
+        caller.call(lambda: "second")
+    assert exc_info.value.retry_after > 1
@@ -0,0 +1,102 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from db.models import Question, QuestionMastery, Quiz, QuizAttempt, User, UserAnswer
+from routes.user_dashboard import get_review_set
+from services.answer_storage import encode_answers
+from services import mastery
+from services.mastery import REVIEW_INTERVALS, record_answers, review_set
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _setup(db, questions=3):
+    user = User(email=f"{uuid.uuid4().hex[:8]}@example.com", full_name="A", hashed_password="x")
+    quiz = Quiz()
+    db.add_all([user, quiz])
+    db.flush()
+    items = [Question(quiz_id=quiz.id, text=f"Q{n}", correct_answer="A", question_type="mcq", options=["A", "B"])
+             for n in range(questions)]
+    db.add_all(items)
+    db.commit()
+    return user.id, quiz.id, [q.id for q in items]
+
+
+def _mastery(db, user_id, question_id):
+    db.expire_all()
+    return db.query(QuestionMastery).filter_by(user_id=user_id, question_id=question_id).one()
+
+
+def test_streak_pushes_questions_out_and_a_miss_brings_them_back(db):
+    user_id, _, (question_id, *_) = _setup(db)
+
+    for day, expected_streak in enumerate([1, 2, 3]):
+        answered_at = START + timedelta(days=10 * day)
+        record_answers(db, user_id, [(question_id, "A", True)], answered_at)
+        db.commit()
+        row = _mastery(db, user_id, question_id)
+        assert row.streak == expected_streak
+        assert row.next_due_at.replace(tzinfo=timezone.utc) == answered_at + REVIEW_INTERVALS[expected_streak - 1]
+
+    missed_at = START + timedelta(days=40)
+    record_answers(db, user_id, [(question_id, "B", False), (uuid.uuid4(), "A", None)], missed_at)
+    db.commit()
+    row = _mastery(db, user_id, question_id)
+    assert (row.last_correct, row.streak, row.attempts) == (False, 0, 4)
+    assert row.next_due_at.replace(tzinfo=timezone.utc) == missed_at
+    assert db.query(QuestionMastery).count() == 1  # ungraded answers are not recorded
+
+
+def test_review_set_is_one_query_for_due_questions_most_overdue_first(engine, db):
+    user_id, quiz_id, (missed, stale, fresh) = _setup(db)
+    other_id, _, _ = _setup(db)
+    record_answers(db, user_id, [(stale, "A", True)], START)
+    record_answers(db, user_id, [(missed, "B", False), (fresh, "A", True)], START + timedelta(days=5))
+    record_answers(db, other_id, [(missed, "B", False)], START)
+    db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    due = review_set(db, user_id, now=START + timedelta(days=5, hours=1))
+    assert len(statements) == 1
+    assert [q["id"] for q in due] == [stale, missed]
+    assert due[0]["quiz_id"] == quiz_id and due[0]["text"] and due[0]["last_correct"] is True
+    assert review_set(db, user_id, limit=1, now=START + timedelta(days=5, hours=1))[0]["id"] == stale
+
+    response = get_review_set(db, type("User", (), {"id": user_id})(), limit=20)
+    assert [q["id"] for q in response["questions"]] == [stale, missed, fresh]
+
+
+@pytest.mark.parametrize("source", ["service", "migration"])
+def test_rebuild_replays_rows_and_compact_records_in_order(db, migration, source):
+    # Migration 0006 carries its own copy of the replay; both must agree
+    rebuild_mastery = (mastery.rebuild_mastery if source == "service"
+                       else migration("0006_question_mastery").rebuild_mastery)
+    user_id, quiz_id, (first, second, third) = _setup(db)
+    row_attempt = QuizAttempt(id=uuid.uuid4(), user_id=user_id, quiz_id=quiz_id, submitted_at=START)
+    compact_attempt = QuizAttempt(
+        id=uuid.uuid4(), user_id=user_id, quiz_id=quiz_id, submitted_at=START + timedelta(days=2),
+        answers_blob=encode_answers([(first, "A", True), (second, "B", False), (third, None, None)]),
+    )
+    db.add_all([row_attempt, compact_attempt])
+    db.add_all([
+        UserAnswer(user_id=user_id, attempt_id=row_attempt.id, question_id=first, answer="A",
+                   is_correct=True, submitted_at=START),
+        UserAnswer(user_id=user_id, attempt_id=row_attempt.id, question_id=second, answer="A",
+                   is_correct=True, submitted_at=START),
+    ])
+    db.commit()
+
+    assert rebuild_mastery(db.connection()) == 2
+    db.commit()
+    first_row, second_row = _mastery(db, user_id, first), _mastery(db, user_id, second)
+    assert (first_row.streak, first_row.attempts, first_row.last_correct) == (2, 2, True)
+    assert first_row.next_due_at.replace(tzinfo=timezone.utc) == START + timedelta(days=2) + REVIEW_INTERVALS[1]
+    assert (second_row.streak, second_row.attempts, second_row.last_correct) == (0, 2, False)
@@ -0,0 +1,80 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from middleware.metrics import PrometheusMiddleware
+from services.metrics import observe_extraction, observe_llm_call, render_metrics
+
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(PrometheusMiddleware)
+
+    @app.get("/quizzes/{quiz_id}")
+    def read_quiz(quiz_id: str):
+        return {"quiz_id": quiz_id}
+
+    return app
+
+
+def test_requests_are_labelled_by_route_template():
+    labels = {"method": "GET", "route": "/quizzes/{quiz_id}", "status": "200"}
+    before = sample("http_request_duration_seconds_count", labels)
+
+    client = TestClient(make_app())
+    client.get("/quizzes/a")
+    client.get("/quizzes/b")
+
+    assert sample("http_request_duration_seconds_count", labels) == before + 2
+    assert sample("http_requests_in_flight", {"route": "/quizzes/{quiz_id}"}) == 0
+
+
+def test_unknown_paths_share_one_label():
+    labels = {"method": "GET", "route": "unmatched", "status": "404"}
+    before = sample("http_request_duration_seconds_count", labels)
+
+    client = TestClient(make_app())
+    client.get("/nope/1")
+    client.get("/nope/2")
+
+    assert sample("http_request_duration_seconds_count", labels) == before + 2
+
+
+def test_llm_call_records_outcome_and_sizes():
+    ok = {"function": "metrics_test", "outcome": "ok"}
+    error = {"function": "metrics_test", "outcome": "error"}
+
+    with observe_llm_call("metrics_test", "x" * 100) as observed:
+        observed["text"] = "y" * 40
+    with pytest.raises(RuntimeError):
+        with observe_llm_call("metrics_test", "x"):
+            raise RuntimeError("upstream")
+
+    assert sample("llm_call_duration_seconds_count", ok) == 1
+    assert sample("llm_call_duration_seconds_count", error) == 1
+    assert sample("llm_prompt_bytes_sum", {"function": "metrics_test"}) == 101
+    assert sample("llm_response_bytes_sum", {"function": "metrics_test"}) == 40
+
+
+def test_extraction_failures_are_counted():
+    with pytest.raises(ValueError):
+        with observe_extraction("metrics_test"):
+            raise ValueError("corrupt")
+
+    assert sample("document_extraction_failures_total", {"file_type": "metrics_test"}) == 1
+    assert sample("document_extraction_duration_seconds_count", {"file_type": "metrics_test"}) == 1
+
+
+def test_render_metrics_uses_prometheus_text_format():
+    body, content_type = render_metrics()
+    assert content_type.startswith("text/plain")
+    assert b"# TYPE http_request_duration_seconds histogram" in body
@@ -0,0 +1,88 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from pydantic import ValidationError
+
+from benchmarks.pregrader_agreement import evaluate, load_labels
+from routes.schemas import MAX_ANSWER_CHARS, SubmissionRequest
+from services.grading import grade_submission
+from services.grading_cache import GradingCache
+from services.pregrader import PREGRADE_ACCEPT, pregrade, similarities
+
+
+def test_a_pair_scores_the_same_alone_and_in_a_batch():
+    alone = similarities(["paris"], ["Paris, France"])[0]
+    batched = similarities(["paris", "Lyon", "the mitochondria"], ["Paris, France", "Paris", "Mitochondria"])[0]
+    assert alone == pytest.approx(batched)
+
+
+def test_similarities_are_computed_for_the_whole_batch():
+    scores = similarities(["Photosynthesis.", "the mitochondria", "Lyon"], ["photosynthesis", "Mitochondria", "Paris"])
+    assert len(scores) == 3
+    assert scores[0] == pytest.approx(1.0)
+    assert 0 < scores[1] < 1
+    assert scores[2] == 0.0
+
+
+def test_clear_matches_and_misses_are_decided_ambiguous_ones_are_not():
+    decisions = pregrade(
+        ["photosynthesis", "respiration", "photosynthesys", "not photosynthesis", "Unanswered"],
+        ["Photosynthesis"] * 5,
+    )
+    assert [d.is_correct for d in decisions] == [True, None, None, None, False]
+
+
+def test_no_overlap_is_not_enough_to_reject():
+    decisions = pregrade(["CO2", "H2O", "USA"], ["Carbon dioxide", "Water", "United States of America"])
+    assert [d.is_correct for d in decisions] == [None, None, None]
+
+
+def test_reject_threshold_grades_clear_misses_when_enabled():
+    answers, references = ["Lyon", "photosynthesys", "not Paris"], ["Paris", "Photosynthesis", "Paris"]
+    assert [d.is_correct for d in pregrade(answers, references)] == [None, None, None]
+    assert [d.is_correct for d in pregrade(answers, references, reject=0.05)] == [False, None, None]
+
+
+def test_only_ambiguous_text_answers_reach_the_llm():
+    quiz = {"quiz_id": "quiz-2", "questions": [
+        {"id": "q1", "text": "Capital of France?", "correct_answer": "Paris", "question_type": "text"},
+        {"id": "q2", "text": "Powerhouse of the cell?", "correct_answer": "Mitochondria", "question_type": "text"},
+        {"id": "q3", "text": "Why does ice float?", "correct_answer": "Ice is less dense than liquid water",
+         "question_type": "text"},
+        {"id": "q4", "text": "Pick a colour", "options": ["Red", "Blue"], "correct_answer": "Red",
+         "question_type": "mcq"},
+    ]}
+    answers = [{"id": "q1", "answer": "paris"}, {"id": "q2", "answer": "  "},
+               {"id": "q3", "answer": "its lattice weighs less per volume"}, {"id": "q4", "answer": "Red"}]
+    sent = []
+
+    def scorer(quiz_payload, user_answers):
+        sent.extend(q["id"] for q in quiz_payload["questions"])
+        return {"results": [{"id": a["id"], "user_answer": a["answer"], "is_correct": True} for a in user_answers]}
+
+    result = grade_submission(quiz, answers, scorer, GradingCache(max_entries=10))
+
+    assert sent == ["q3", "q4"]
+    assert result["pregraded"] == 2
+    assert [r["is_correct"] for r in result["results"]] == [True, False, True, True]
+    assert result["results"][1]["explanation"] == "The expected answer is: Mitochondria."
+
+
+def test_local_verdicts_agree_with_labeled_llm_verdicts():
+    report = evaluate(load_labels(), PREGRADE_ACCEPT)
+    assert report["agreement"] >= 0.95
+    assert report["coverage"] >= 0.3
+
+
+def test_a_sign_is_not_normalized_away():
+    minus, plus = pregrade(["-5", "5"], ["5", "-5"])
+    assert minus.is_correct is not True and plus.is_correct is not True
+
+
+def test_overlong_answers_are_rejected_by_the_schema():
+    quiz_id, question_id = "00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"
+    SubmissionRequest(quiz_id=quiz_id, answers={question_id: "x" * MAX_ANSWER_CHARS})
+    with pytest.raises(ValidationError):
+        SubmissionRequest(quiz_id=quiz_id, answers={question_id: "x" * (MAX_ANSWER_CHARS + 1)})
@@ -16,4 +16,8 @@ def test_unauthorized_profile_access():
         "about": "I love quizzes!"
     })
     assert response.status_code == 403
-    assert response.json()["detail"] == "Not authenticated"
\ No newline at end of file
+    assert response.json()["detail"] == "Not authenticated"
+
+def test_unauthorized_grading_cache_status():
+    response = client.get("/status/grading-cache")
+    assert response.status_code == 403
@@ -0,0 +1,28 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from benchmarks.harness import BenchmarkApp, check_results, load_budgets
+
+
+@pytest.fixture(scope="module")
+def bench(tmp_path_factory):
+    workdir = str(tmp_path_factory.mktemp("bench"))
+    app = BenchmarkApp(f"sqlite:///{os.path.join(workdir, 'bench.db')}", workdir)
+    app.seed("small")
+    yield app
+    app.close()
+
+
+def test_routes_stay_within_query_budgets(bench):
+    results = [bench.run_route(spec, iterations=2) for spec in bench.applicable_routes(load_budgets())]
+    assert check_results(results) == []
+
+
+def test_check_results_flags_budget_and_latency_regressions():
+    results = [{"name": "history", "queries": 9, "max_queries": 4, "p95_ms": 80.0}]
+    failures = check_results(results, baseline={"history": {"p95_ms": 20.0}}, tolerance=0.5, slack_ms=5)
+    assert len(failures) == 2
+    assert "exceeds budget" in failures[0]
+    assert "regressed" in failures[1]
@@ -0,0 +1,148 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from db.models import Question, Quiz, QuizAttempt, UploadedFile, User, UserAnswer
+from routes.user_dashboard import get_file_analytics, get_quiz_analytics
+from services.answer_storage import encode_answers
+from services.question_analytics import AnalyticsCache, file_analytics, quiz_analytics
+from services.score_histograms import record_score
+
+
+@pytest.fixture
+def quiz(db):
+    user = User(email="a@example.com", full_name="A", hashed_password="x")
+    db.add(user)
+    db.flush()
+    uploaded = UploadedFile(filename="notes.txt", original_name="notes.txt", file_type="txt", user_id=user.id)
+    db.add(uploaded)
+    db.flush()
+    quiz = Quiz(file_id=uploaded.id)
+    db.add(quiz)
+    db.flush()
+    mcq = Question(quiz_id=quiz.id, text="Pick A", options=["A", "B", "C"], correct_answer="A", question_type="mcq")
+    text = Question(quiz_id=quiz.id, text="Explain", correct_answer="Because", question_type="text")
+    db.add_all([mcq, text])
+    db.commit()
+    return {"user": user.id, "file": uploaded.id, "quiz": quiz.id, "mcq": mcq.id, "text": text.id}
+
+
+def _submit(db, ids, answers, compact=False):
+    """answers: [(question_id, answer, is_correct)]"""
+    attempt = QuizAttempt(id=uuid.uuid4(), user_id=ids["user"], quiz_id=ids["quiz"],
+                          score=sum(1 for a in answers if a[2]))
+    if compact:
+        attempt.answers_blob = encode_answers(answers)
+    else:
+        db.add_all(UserAnswer(user_id=ids["user"], attempt_id=attempt.id, question_id=q, answer=a, is_correct=c)
+                   for q, a, c in answers)
+    db.add(attempt)
+    record_score(db, ids["quiz"], attempt.score)
+    db.commit()
+
+
+def test_stats_combine_row_and_compact_answers_hardest_first(db, quiz):
+    _submit(db, quiz, [(quiz["mcq"], "A", True), (quiz["text"], "dunno", False)])
+    _submit(db, quiz, [(quiz["mcq"], "B", False), (quiz["text"], "Because", True)])
+    _submit(db, quiz, [(quiz["mcq"], "A", True), (quiz["text"], "no", False)], compact=True)
+
+    result = quiz_analytics(db, quiz["quiz"], AnalyticsCache())
+    assert result["total_attempts"] == 3
+    text, mcq = result["questions"]
+    assert (text["question_id"], text["attempts"], text["correct"]) == (quiz["text"], 3, 1)
+    assert text["correct_rate"] == pytest.approx(1 / 3, abs=1e-4)
+    assert text["answer_distribution"] is None
+    assert (mcq["attempts"], mcq["correct"]) == (3, 2)
+    assert mcq["answer_distribution"] == {"A": 2, "B": 1, "C": 0}
+
+
+def test_unanswered_quiz_has_no_rates(db, quiz):
+    result = quiz_analytics(db, quiz["quiz"], AnalyticsCache())
+    assert result["total_attempts"] == 0
+    assert [q["correct_rate"] for q in result["questions"]] == [None, None]
+
+
+def test_cached_until_the_next_submission(db, quiz, engine):
+    cache = AnalyticsCache()
+    _submit(db, quiz, [(quiz["mcq"], "A", True), (quiz["text"], "Because", True)])
+    quiz_id = quiz["quiz"]
+    first = quiz_analytics(db, quiz_id, cache)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    assert quiz_analytics(db, quiz_id, cache)["questions"] is first["questions"]
+    assert len(statements) == 1  # the version check only
+
+    # SQLite's CURRENT_TIMESTAMP has one-second resolution; keep the new attempt after the snapshot
+    db.query(QuizAttempt).update({QuizAttempt.submitted_at: datetime(2026, 1, 1, tzinfo=timezone.utc)})
+    db.commit()
+    cache.clear()
+    quiz_analytics(db, quiz_id, cache)
+    _submit(db, quiz, [(quiz["mcq"], "C", False), (quiz["text"], "no", False)], compact=True)
+
+    statements.clear()
+    refreshed = quiz_analytics(db, quiz_id, cache)
+    assert refreshed["total_attempts"] == 2
+    mcq = next(q for q in refreshed["questions"] if q["question_id"] == quiz["mcq"])
+    assert (mcq["attempts"], mcq["correct"], mcq["answer_distribution"]) == (2, 1, {"A": 1, "B": 0, "C": 1})
+    assert not any("questions.text" in s for s in statements)  # caught up from the snapshot
+    assert refreshed == quiz_analytics(db, quiz_id, AnalyticsCache())
+
+
+def test_out_of_order_attempt_forces_a_recount(db, quiz):
+    cache = AnalyticsCache()
+    _submit(db, quiz, [(quiz["mcq"], "A", True), (quiz["text"], "Because", True)])
+    db.query(QuizAttempt).update({QuizAttempt.submitted_at: datetime(2026, 1, 2, tzinfo=timezone.utc)})
+    db.commit()
+    quiz_analytics(db, quiz["quiz"], cache)
+
+    _submit(db, quiz, [(quiz["mcq"], "B", False), (quiz["text"], "no", False)])
+    db.query(QuizAttempt).filter(QuizAttempt.score == 0).update(
+        {QuizAttempt.submitted_at: datetime(2026, 1, 1, tzinfo=timezone.utc)})
+    db.commit()
+
+    result = quiz_analytics(db, quiz["quiz"], cache)
+    assert [q["attempts"] for q in result["questions"]] == [2, 2]
+
+
+def test_file_analytics_spans_sections(db, quiz):
+    second = Quiz(file_id=quiz["file"])
+    db.add(second)
+    db.flush()
+    db.add(Question(quiz_id=second.id, text="New", options=["X", "Y"], correct_answer="X", question_type="mcq"))
+    db.commit()
+    _submit(db, quiz, [(quiz["mcq"], "A", True), (quiz["text"], "Because", True)])
+
+    cache = AnalyticsCache()
+    result = file_analytics(db, quiz["file"], cache)
+    assert result["total_attempts"] == 1
+    assert len(result["questions"]) == 3
+    assert result["questions"][-1]["answer_distribution"] == {"X": 0, "Y": 0}
+
+    third = Quiz(file_id=quiz["file"])
+    db.add(third)
+    db.flush()
+    db.add(Question(quiz_id=third.id, text="Newer", correct_answer="Z", question_type="text"))
+    db.commit()
+    assert len(file_analytics(db, quiz["file"], cache)["questions"]) == 4
+
+
+def test_analytics_routes_are_limited_to_the_owner(db, quiz):
+    owner = db.get(User, quiz["user"])
+    assert get_quiz_analytics(quiz["quiz"], db, owner)["quiz_id"] == quiz["quiz"]
+    assert get_file_analytics(quiz["file"], db, owner)["file_id"] == quiz["file"]
+
+    stranger = User(email="b@example.com", full_name="B", hashed_password="x")
+    db.add(stranger)
+    db.commit()
+    for route, resource in ((get_quiz_analytics, quiz["quiz"]), (get_file_analytics, quiz["file"])):
+        with pytest.raises(HTTPException) as exc:
+            route(resource, db, stranger)
+        assert exc.value.status_code == 404
@@ -0,0 +1,145 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+
+from db.models import IdempotencyKey
+from services import request_coalescing
+from services.request_coalescing import SingleFlight, finish_key, hash_payload, reserve_key, run_once
+
+USER = uuid.uuid4()
+
+
+@pytest.fixture(autouse=True)
+def sessions(engine, monkeypatch):
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(request_coalescing, "single_flight", SingleFlight())
+    monkeypatch.setattr(request_coalescing, "_session_factory", factory)
+    return factory
+
+
+def test_hash_payload_ignores_key_order():
+    assert hash_payload({"a": 1, "b": [1, 2]}) == hash_payload({"b": [1, 2], "a": 1})
+    assert hash_payload({"a": 1}) != hash_payload({"a": 2})
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_share_one_computation():
+    calls = []
+
+    async def compute(db):
+        calls.append(db)
+        await asyncio.sleep(0.01)
+        return {"quiz_id": "q1"}
+
+    results = await asyncio.gather(*[
+        run_once("generate", USER, "f1", {}, compute) for _ in range(5)
+    ])
+    assert len(calls) == 1
+    assert all(r == {"quiz_id": "q1"} for r in results)
+
+
+@pytest.mark.asyncio
+async def test_work_runs_in_a_session_of_its_own(sessions, monkeypatch):
+    opened = []
+    monkeypatch.setattr(request_coalescing, "_session_factory", lambda: opened.append(sessions()) or opened[-1])
+
+    async def compute(db):
+        return db is opened[-1] and db.is_active
+
+    assert await run_once("generate", USER, "f1", {}, compute)
+    assert len(opened) == 1 and not opened[0].in_transaction()
+
+
+@pytest.mark.asyncio
+async def test_different_payloads_are_not_coalesced():
+    calls = []
+
+    async def compute(db):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    await asyncio.gather(
+        run_once("grade", USER, "quiz", {"answers": ["A"]}, compute),
+        run_once("grade", USER, "quiz", {"answers": ["B"]}, compute),
+    )
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_exception_is_shared_and_not_cached(sessions):
+    calls = []
+
+    async def failing(db):
+        calls.append(1)
+        raise HTTPException(status_code=500, detail="boom")
+
+    with pytest.raises(HTTPException):
+        await run_once("grade", USER, "quiz", {}, failing, idempotency_key="k1")
+    with pytest.raises(HTTPException):
+        await run_once("grade", USER, "quiz", {}, failing, idempotency_key="k1")
+    assert len(calls) == 2
+    assert sessions().query(IdempotencyKey).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_replays_stored_response_on_any_worker(monkeypatch):
+    calls = []
+
+    async def compute(db):
+        calls.append(1)
+        return {"attempt": len(calls), "at": datetime(2026, 1, 1, tzinfo=timezone.utc)}
+
+    first = await run_once("grade", USER, "quiz", {"x": 1}, compute, idempotency_key="k1")
+    monkeypatch.setattr(request_coalescing, "single_flight", SingleFlight())  # another worker
+    second = await run_once("grade", USER, "quiz", {"x": 1}, compute, idempotency_key="k1")
+    assert calls == [1] and first["attempt"] == second["attempt"] == 1
+    assert second["at"] == "2026-01-01T00:00:00+00:00"
+
+    with pytest.raises(HTTPException) as exc_info:
+        await run_once("grade", USER, "quiz", {"x": 2}, compute, idempotency_key="k1")
+    assert exc_info.value.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_key_running_on_another_worker_is_a_conflict(sessions):
+    db = sessions()
+    assert reserve_key(db, "grade", USER, "k1", hash_payload({})) is request_coalescing.RESERVED
+    calls = []
+
+    async def compute(db):
+        calls.append(1)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await run_once("grade", USER, "quiz", {}, compute, idempotency_key="k1")
+    assert exc_info.value.status_code == 409 and calls == []
+
+
+def test_key_freed_during_the_conflict_is_reserved_on_retry(sessions):
+    reserve_key(sessions(), "grade", USER, "k1", hash_payload({}))
+    db = sessions()
+    rollback = db.rollback
+
+    def rollback_then_free_key():
+        # The request holding the key fails between our insert and our read
+        rollback()
+        finish_key(USER, "k1")
+
+    db.rollback = rollback_then_free_key
+    assert reserve_key(db, "grade", USER, "k1", hash_payload({})) is request_coalescing.RESERVED
+
+
+def test_key_can_be_reused_after_the_window(sessions):
+    db = sessions()
+    long_ago = datetime.now(timezone.utc) - timedelta(seconds=request_coalescing.IDEMPOTENCY_WINDOW_SECONDS + 1)
+    reserve_key(db, "grade", USER, "k1", "old", now=long_ago)
+    assert reserve_key(db, "grade", USER, "k1", "new") is request_coalescing.RESERVED
+    assert db.get(IdempotencyKey, (USER, "k1")).payload_hash == "new"
@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import logging
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+from db.instrumentation import install_sql_instrumentation
+from middleware.server_timing import ServerTimingMiddleware
+from services.request_context import current_timings, track
+
+
+def make_app(slow_query_ms):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    install_sql_instrumentation(engine, slow_query_ms=slow_query_ms)
+
+    app = FastAPI()
+    app.add_middleware(ServerTimingMiddleware)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT :x"), {"x": item_id})
+        with track("llm"):
+            pass
+        return {"ok": True}
+
+    return app
+
+
+def test_server_timing_header_reports_db_and_llm():
+    client = TestClient(make_app(slow_query_ms=10_000))
+    response = client.get("/items/3")
+
+    header = response.headers["server-timing"]
+    assert 'desc="2 queries"' in header
+    assert "db;dur=" in header
+    assert "llm;dur=" in header
+    assert "extract" not in header
+    assert "total;dur=" in header
+
+
+def test_slow_queries_are_logged_with_route(caplog):
+    client = TestClient(make_app(slow_query_ms=0))
+    with caplog.at_level(logging.WARNING, logger="nexera.sql"):
+        client.get("/items/3")
+
+    slow = [r.getMessage() for r in caplog.records if r.name == "nexera.sql"]
+    assert len(slow) == 2
+    assert all("/items/{item_id}" in message for message in slow)
+
+
+def test_track_is_a_no_op_outside_requests():
+    assert current_timings() is None
+    with track("llm"):
+        pass
+    assert current_timings() is None
@@ -5,7 +5,14 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 import pytest
 from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from pydantic import ValidationError
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from db.models import Base, Question, Quiz
 from routes.responses_handler import router
+from routes.schemas import SubmissionRequest
+from services import request_coalescing
+from services.quiz_cache import QuizCache, load_quiz_for_grading
 from uuid import uuid4
 
 client = TestClient(router)
@@ -14,45 +21,40 @@ client = TestClient(router)
 # Tests for evaluate_user_submission
 # -------------------------------
 
-@pytest.mark.asyncio
-async def test_evaluate_user_submission_invalid_answers(monkeypatch):
-    class DummyRequest:
-        async def json(self):
-            return {
-                "quizData": {"quiz_id": str(uuid4()), "questions": [{"id": "1"}]},
-                "userAnswers": "not_a_list"
-            }
+def test_legacy_payload_rejects_invalid_answers():
+    with pytest.raises(ValidationError) as exc_info:
+        SubmissionRequest.model_validate({
+            "quizData": {"quiz_id": str(uuid4()), "questions": [{"id": "1"}]},
+            "userAnswers": "not_a_list"
+        })
+    assert "userAnswers must be a list or dict" in str(exc_info.value)
 
-    with pytest.raises(HTTPException) as exc_info:
-        await router.routes[0].endpoint(
-            request=DummyRequest(),
-            db=None,
-            current_user=type("User", (), {"id": 1})()
-        )
-    assert exc_info.value.status_code == 422
-    assert "userAnswers must be a list or dict" in str(exc_info.value.detail)
+
+def test_legacy_payload_keeps_only_quiz_id_and_answers():
+    quiz_id, qid = uuid4(), uuid4()
+    submission = SubmissionRequest.model_validate({
+        "quizData": {"quiz_id": str(quiz_id), "questions": [{"id": str(qid), "correct_answer": "forged"}]},
+        "userAnswers": [{"id": str(qid), "answer": "A"}]
+    })
+    assert submission.quiz_id == quiz_id
+    assert submission.answers == {qid: "A"}
 
 
 @pytest.mark.asyncio
 async def test_evaluate_user_submission_success(monkeypatch):
     qid1 = str(uuid4())
     qid2 = str(uuid4())
+    quiz_id = str(uuid4())
     dummy_eval_result = {
         "results": [
             {"id": qid1, "is_correct": True, "user_answer": "A"},
             {"id": qid2, "is_correct": False, "user_answer": "B"}
         ]
     }
-
-    class DummyRequest:
-        async def json(self):
-            return {
-                "quizData": {
-                    "quiz_id": str(uuid4()),
-                    "questions": [{"id": qid1}, {"id": qid2}]
-                },
-                "userAnswers": [{"id": qid1, "answer": "A"}, {"id": qid2, "answer": "B"}]
-            }
+    server_quiz = {"quiz_id": quiz_id, "questions": [
+        {"id": qid1, "text": "Q1", "options": ["A", "B"], "correct_answer": "A", "question_type": "mcq"},
+        {"id": qid2, "text": "Q2", "options": ["A", "B"], "correct_answer": "A", "question_type": "mcq"},
+    ]}
 
     class DummyDB:
         def __init__(self):
@@ -61,11 +63,18 @@ async def test_evaluate_user_submission_success(monkeypatch):
         def add(self, item): self.data.append(item)
         def commit(self): pass
         def refresh(self, item): item.submitted_at = "now"
+        def execute(self, statement): pass
+        def get_bind(self): return type("Bind", (), {"dialect": type("Dialect", (), {"name": "sqlite"})})()
+        def close(self): pass
 
-    monkeypatch.setattr("routes.responses_handler.score_user_responses", lambda quiz, answers: dummy_eval_result)
+    graded = []
+    monkeypatch.setattr("routes.responses_handler.load_quiz_for_grading", lambda db, quiz_id: server_quiz)
+    monkeypatch.setattr("routes.responses_handler.score_user_responses",
+                        lambda quiz, answers: graded.append(quiz) or dummy_eval_result)
+    monkeypatch.setattr(request_coalescing, "_session_factory", DummyDB)
 
     response = await router.routes[0].endpoint(
-        request=DummyRequest(),
+        submission=SubmissionRequest(quiz_id=quiz_id, answers={qid1: "A", qid2: "B"}),
         db=DummyDB(),
         current_user=type("User", (), {"id": 1})()
     )
@@ -73,50 +82,76 @@ async def test_evaluate_user_submission_success(monkeypatch):
     assert response["score"] == 1
     assert response["quiz_id"] is not None
     assert len(response["results"]) == 2
+    assert graded[0] is server_quiz
+
+
+@pytest.mark.asyncio
+async def test_evaluate_user_submission_rejects_foreign_question(monkeypatch):
+    quiz_id = str(uuid4())
+    monkeypatch.setattr("routes.responses_handler.load_quiz_for_grading",
+                        lambda db, quiz_id: {"quiz_id": quiz_id, "questions": [{"id": str(uuid4())}]})
+
+    with pytest.raises(HTTPException) as exc_info:
+        await router.routes[0].endpoint(
+            submission=SubmissionRequest(quiz_id=quiz_id, answers={uuid4(): "A"}),
+            db=None,
+            current_user=type("User", (), {"id": 1})()
+        )
+    assert exc_info.value.status_code == 422
+
+
+def test_quiz_is_hydrated_once_then_served_from_cache():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    quiz = Quiz()
+    db.add(quiz)
+    db.flush()
+    quiz_id = quiz.id
+    db.add(Question(quiz_id=quiz_id, text="2+2?", correct_answer="4", question_type="text"))
+    db.commit()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    cache = QuizCache(max_entries=10)
+    first = load_quiz_for_grading(db, quiz_id, cache)
+    second = load_quiz_for_grading(db, quiz_id, cache)
+
+    assert first is second
+    assert first["questions"][0]["correct_answer"] == "4"
+    assert len(statements) == 1
+    assert load_quiz_for_grading(db, uuid4(), cache) is None
+    db.close()
+
 
 # -------------------------------
 # Tests for retrieve_all_attempts
 # -------------------------------
 
 def test_retrieve_all_attempts(monkeypatch):
-    class DummyQuestion:
-        def __init__(self, id, text, correct_answer, explanation):
-            self.id = id
-            self.text = text
-            self.correct_answer = correct_answer
-            self.explanation = explanation
-
-    class DummyAnswer:
-        def __init__(self, question_id):
-            self.question_id = question_id
-            self.answer = "A"
-            self.is_correct = True
-
-    class DummyAttempt:
-        def __init__(self, answers):
-            self.answers = answers
-            self.submitted_at = "now"
-
-    qid = uuid4()
-    dummy_question = DummyQuestion(id=qid, text="What is AI?", correct_answer="Artificial Intelligence", explanation="It's AI.")
+    class DummyRow:
+        attempt_id = 1
+        answers_blob = None
+        answer_id = 1
+        text = "What is AI?"
+        answer = "A"
+        correct_answer = "Artificial Intelligence"
+        explanation = "It's AI."
+        is_correct = True
 
     monkeypatch.setattr("routes.responses_handler.get_db", lambda: None)
     monkeypatch.setattr("routes.responses_handler.get_current_user", lambda: type("User", (), {"id": 1})())
 
     class DummyDB:
-        def query(self, model):
-            if model.__name__ == "QuizAttempt":
-                return type("Query", (), {
-                    "filter": lambda *a, **kw: type("QuerySet", (), {
-                        "order_by": lambda *args, **kwargs: type("All", (), {
-                            "all": lambda self: [DummyAttempt([DummyAnswer(qid)])]
-                        })()
-                    })()
-                })()
-            elif model.__name__ == "Question":
-                return type("Query", (), {"get": lambda self, id: dummy_question})()
-            return None
+        def query(self, *columns):
+            return type("Query", (), {
+                "outerjoin": lambda self, *a, **kw: self,
+                "filter": lambda self, *a, **kw: self,
+                "order_by": lambda self, *a, **kw: self,
+                "all": lambda self: [DummyRow()]
+            })()
 
     result = router.routes[1].endpoint(DummyDB(), type("User", (), {"id": 1})())
     assert isinstance(result, list)
     assert result[0]["question"] == "What is AI?"
+    assert result[0]["correct_answer"] == "Artificial Intelligence"
@@ -0,0 +1,89 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event
+
+from db.models import Quiz, QuizAttempt, QuizScoreHistogram, User
+from routes.user_dashboard import get_score_percentile
+from services.score_histograms import ScoreDistribution, rebuild_histograms, record_score, score_distribution
+
+
+def _attempt(db, user, quiz, score, minutes=0):
+    db.add(QuizAttempt(user_id=user.id, quiz_id=quiz.id, score=score,
+                       submitted_at=datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=minutes)))
+    record_score(db, quiz.id, score)
+
+
+def test_percentile_counts_half_of_ties():
+    distribution = ScoreDistribution(buckets=[(2, 1), (5, 2), (8, 1)], total=4)
+    assert distribution.percentile(5) == 50.0
+    assert distribution.percentile(8) == 87.5
+    assert distribution.percentile(0) == 0.0
+    assert ScoreDistribution(buckets=[], total=0).percentile(3) is None
+
+
+def test_submissions_keep_buckets_in_step_with_a_rebuild(db, migration):
+    user = User(email="a@example.com", full_name="A", hashed_password="x")
+    quiz, other = Quiz(), Quiz()
+    db.add_all([user, quiz, other])
+    db.flush()
+    for n, score in enumerate([3, 7, 7, 10, 3, 7]):
+        _attempt(db, user, quiz, score, n)
+    _attempt(db, user, other, 1)
+    db.commit()
+
+    maintained = score_distribution(db, quiz.id)
+    assert maintained.buckets == [(3, 2), (7, 3), (10, 1)]
+    assert maintained.total == 6
+
+    db.query(QuizScoreHistogram).update({QuizScoreHistogram.attempts: 99})
+    db.commit()
+    assert rebuild_histograms(db.connection(), quiz.id) == 3
+    db.commit()
+    assert score_distribution(db, quiz.id) == maintained
+    assert score_distribution(db, other.id).buckets == [(1, 99)]
+
+    rebuild_histograms(db.connection())
+    db.commit()
+    assert score_distribution(db, other.id).buckets == [(1, 1)]
+
+    # Migration 0004 carries its own copy of the full rebuild
+    db.query(QuizScoreHistogram).update({QuizScoreHistogram.attempts: 99})
+    db.commit()
+    assert migration("0004_quiz_score_histograms").rebuild_histograms(db.connection()) == 4
+    db.commit()
+    assert score_distribution(db, quiz.id) == maintained
+    assert score_distribution(db, other.id).buckets == [(1, 1)]
+
+
+def test_percentile_endpoint_reads_buckets_not_attempts(db, engine):
+    user = User(email="a@example.com", full_name="A", hashed_password="x")
+    classmate = User(email="b@example.com", full_name="B", hashed_password="x")
+    quiz = Quiz()
+    db.add_all([user, classmate, quiz])
+    db.flush()
+    for n in range(200):
+        _attempt(db, classmate, quiz, n % 10, n)
+    _attempt(db, user, quiz, 2, 0)
+    _attempt(db, user, quiz, 8, 500)
+    db.commit()
+    quiz_id, user = quiz.id, type("User", (), {"id": user.id})()
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    result = get_score_percentile(quiz_id, db, user)
+
+    assert result["score"] == 8
+    assert result["total_attempts"] == 202
+    assert result["percentile"] == pytest.approx(100 * (161 + 21 / 2) / 202, abs=0.1)
+    assert [b["score"] for b in result["histogram"]] == list(range(10))
+    assert len(statements) == 2
+    assert not any("count(" in s.lower() for s in statements)
+
+    stranger = get_score_percentile(quiz_id, db, type("User", (), {"id": uuid.uuid4()})())
+    assert stranger["score"] is None and stranger["percentile"] is None
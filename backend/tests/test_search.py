@@ -0,0 +1,129 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import uuid
+
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex
+
+from db.models import DocumentRegion, Question, Quiz, UploadedFile, User
+from routes.user_dashboard import search_user_content
+from services.search import InvertedIndex, SearchIndexCache, _search_postgres, search, snippet
+
+
+def _library(db, name, questions, region_text=None):
+    user = User(email=f"{uuid.uuid4().hex[:8]}@example.com", full_name="A", hashed_password="x")
+    db.add(user)
+    db.flush()
+    upload = UploadedFile(user_id=user.id, filename=f"{uuid.uuid4().hex}.pdf", original_name=name, file_type="pdf")
+    db.add(upload)
+    db.flush()
+    quiz = Quiz(file_id=upload.id)
+    db.add(quiz)
+    db.flush()
+    db.add_all(Question(quiz_id=quiz.id, text=text, explanation=explanation, correct_answer="A")
+               for text, explanation in questions)
+    if region_text:
+        db.add(DocumentRegion(file_id=upload.id, region_index=0, first_unit=1, last_unit=1,
+                              char_count=len(region_text), text=region_text))
+    db.commit()
+    return user.id, upload.id, quiz.id
+
+
+def test_inverted_index_matches_every_term_as_a_prefix():
+    index = InvertedIndex()
+    index.add("question", 1, "What do mitochondria produce?", "Energy for the cell.")
+    index.add("question", 2, "Where is energy stored?", None)
+    index.add("file", 3, "Mitochondria lecture.pdf")
+    index.freeze()
+
+    hits, total = index.search(["mito", "energ"], 10)
+    assert [hit[:2] for hit in hits] == [("question", 1)] and total == 1
+    hits, total = index.search(["mito"], 10)
+    assert [hit[1] for hit in hits] == [3, 1]  # file names weigh more
+    assert index.search(["mito"], 1)[0] == hits[:1] and index.search(["mito"], 1)[1] == 2
+    assert index.search(["nucleus"], 10) == ([], 0)
+
+def test_search_covers_names_questions_and_document_text_of_one_user(db):
+    user_id, file_id, quiz_id = _library(
+        db, "Cell biology.pdf",
+        [("What do mitochondria produce?", "They produce energy as ATP."),
+         ("Name the control centre of the cell.", "The nucleus holds the DNA.")],
+        region_text="Chapter 2. The mitochondria are the powerhouse of the cell and produce ATP energy.",
+    )
+    _library(db, "Mitochondria notes.pdf", [("Mitochondria produce what?", "Energy.")])
+
+    result = search(db, user_id, "mito energ", cache=SearchIndexCache())
+    assert result["total"] == 2
+    assert {hit["kind"] for hit in result["results"]} == {"question", "document"}
+    question = next(hit for hit in result["results"] if hit["kind"] == "question")
+    assert (question["quiz_id"], question["file_id"], question["file_name"]) == (quiz_id, file_id, "Cell biology.pdf")
+    assert question["snippet"] == "They produce energy as ATP."
+    document = next(hit for hit in result["results"] if hit["kind"] == "document")
+    assert document["region_index"] == 0 and "mitochondria" in document["snippet"]
+
+    assert search(db, user_id, "biology", cache=SearchIndexCache())["results"][0]["kind"] == "file"
+    assert search(db, user_id, "  ?! ")["total"] == 0
+
+
+def test_pages_and_cached_index_refresh_when_content_is_added(engine, db):
+    user_id, _, quiz_id = _library(db, "Notes.pdf", [(f"Question about topic {n}", None) for n in range(5)])
+    cache = SearchIndexCache()
+
+    first = search(db, user_id, "topic", limit=2, offset=0, cache=cache)
+    second = search(db, user_id, "topic", limit=2, offset=2, cache=cache)
+    assert first["total"] == second["total"] == 5
+    seen = [hit["question_id"] for hit in first["results"] + second["results"]]
+    assert len(set(seen)) == 4
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    search(db, user_id, "topic", cache=cache)
+    assert len(statements) == 2  # version check + one page of questions, no rebuild
+
+    db.add(Question(quiz_id=quiz_id, text="A new topic", correct_answer="A"))
+    db.commit()
+    assert search(db, user_id, "topic", cache=cache)["total"] == 6
+
+    response = search_user_content("topic", db, type("User", (), {"id": user_id})(), limit=50, offset=0)
+    assert response["total"] == 6
+
+
+def test_snippet_centres_on_the_first_match():
+    text = "Intro. " * 40 + "Photosynthesis turns light into chemical energy. " + "Outro. " * 40
+    excerpt = snippet(text, ["photo"], width=80)
+    assert excerpt.startswith("…") and excerpt.endswith("…")
+    assert "Photosynthesis" in excerpt and len(excerpt) <= 82
+    assert snippet(text, ["nucleus"]) is None
+
+
+def test_postgres_search_uses_the_indexed_expressions():
+    captured = []
+
+    class RecordingDB:
+        def execute(self, statement):
+            captured.append(str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})))
+            return type("Result", (), {"all": lambda self: []})()
+
+    _search_postgres(RecordingDB(), uuid.uuid4(), ["mito", "energ"], 20, 0)
+    for model in (UploadedFile, Question, DocumentRegion):
+        index = next(i for i in model.__table__.indexes if i.name.endswith("_search"))
+        ddl = str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+        expression = ddl[ddl.index("(to_tsvector") + 1:-1]
+        qualified = expression.replace("coalesce(", f"coalesce({model.__tablename__}.")
+        assert f"{qualified} @@ to_tsquery('english', 'mito:* & energ:*')" in captured[0]
+
+
+def test_migration_creates_the_indexes_declared_on_the_models(migration):
+    declared = {
+        index.name: str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+        for model in (UploadedFile, Question, DocumentRegion)
+        for index in model.__table__.indexes if index.name.endswith("_search")
+    }
+    copied = {
+        name: f"CREATE INDEX {name} ON {table} USING gin ({expression})"
+        for name, (table, expression) in migration("0007_search_indexes").SEARCH_INDEXES.items()
+    }
+    assert copied == declared
@@ -0,0 +1,146 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import io
+import pytest
+
+from fastapi import HTTPException, UploadFile
+
+from db.models import StoredBlob, UploadedFile, User
+from routes.file_processor import handle_file_upload
+from services import storage as storage_module
+from services.storage import (
+    LocalStorage,
+    S3Storage,
+    build_storage_from_env,
+    ensure_blob,
+    release_blob,
+    retain_blob,
+)
+
+
+class FakeClientError(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeBody:
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+        self.closed = False
+
+    def iter_chunks(self, chunk_size):
+        while chunk := self._stream.read(chunk_size):
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeS3Client:
+    """In-memory stand-in for the handful of boto3 S3 calls the backend uses."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeClientError("404")
+        return {"ContentLength": len(self.objects[(Bucket, Key)])}
+
+    def upload_fileobj(self, Fileobj, Bucket, Key):
+        self.uploads += 1
+        self.objects[(Bucket, Key)] = Fileobj.read()
+
+    def get_object(self, Bucket, Key):
+        return {"Body": FakeBody(self.objects[(Bucket, Key)])}
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+
+@pytest.fixture(params=["local", "s3"])
+def backend(request, tmp_path):
+    if request.param == "local":
+        return LocalStorage(str(tmp_path))
+    return S3Storage("quiz-uploads", client=FakeS3Client())
+
+
+def test_identical_content_is_stored_once(backend):
+    first = backend.put(io.BytesIO(b"same pdf bytes"))
+    second = backend.put(io.BytesIO(b"same pdf bytes"))
+    other = backend.put(io.BytesIO(b"different"))
+
+    assert first.content_hash == second.content_hash != other.content_hash
+    assert (first.created, second.created) == (True, False)
+    assert first.size == 14
+    if isinstance(backend, S3Storage):
+        assert backend.client.uploads == 2
+
+
+def test_reads_stream_in_chunks(backend, monkeypatch):
+    monkeypatch.setattr(storage_module, "CHUNK_SIZE", 4)
+    data = bytes(range(256)) * 40
+    stored = backend.put(io.BytesIO(data))
+
+    chunks = list(backend.open_chunks(stored.content_hash, chunk_size=1000))
+    assert b"".join(chunks) == data
+    assert max(len(c) for c in chunks) == 1000
+
+    with backend.local_path(stored.content_hash) as path:
+        with open(path, "rb") as f:
+            assert f.read() == data
+
+
+def test_refcount_deletes_blob_with_last_reference(backend, db):
+    stored = backend.put(io.BytesIO(b"shared upload"))
+    retain_blob(db, stored)
+    retain_blob(db, backend.put(io.BytesIO(b"shared upload")))
+    db.commit()
+    assert db.get(StoredBlob, stored.content_hash).refcount == 2
+
+    release_blob(db, stored.content_hash, storage=backend)
+    assert backend.exists(stored.content_hash)
+
+    release_blob(db, stored.content_hash, storage=backend)
+    assert db.get(StoredBlob, stored.content_hash) is None
+    assert not backend.exists(stored.content_hash)
+
+
+def test_blob_released_while_put_found_it_is_stored_again(backend, db):
+    retain_blob(db, backend.put(io.BytesIO(b"last copy")))
+    db.commit()
+
+    again = backend.put(io.BytesIO(b"last copy"))  # finds the blob: created=False
+    release_blob(db, again.content_hash, storage=backend)  # ...and its last holder lets go
+    assert not backend.exists(again.content_hash)
+
+    retain_blob(db, again)
+    db.commit()
+    ensure_blob(io.BytesIO(b"last copy"), again, storage=backend)
+    assert db.get(StoredBlob, again.content_hash).refcount == 1
+    assert b"".join(backend.open_chunks(again.content_hash)) == b"last copy"
+
+
+@pytest.mark.asyncio
+async def test_unreadable_upload_is_discarded_with_its_blob(db, blob_storage):
+    user = User(email="student@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+
+    with pytest.raises(HTTPException):
+        await handle_file_upload(file=UploadFile(filename="blank.txt", file=io.BytesIO(b"   ")), db=db,
+                                 current_user=user)
+
+    assert db.query(UploadedFile).count() == 0 and db.query(StoredBlob).count() == 0
+    assert not any(os.path.isfile(os.path.join(root, name))
+                   for root, _, names in os.walk(blob_storage.root) for name in names)
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setenv("STORAGE_BACKEND", "ftp")
+    with pytest.raises(ValueError):
+        build_storage_from_env()
@@ -0,0 +1,142 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import io
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from middleware.request_id import RequestIdMiddleware
+from services import structured_logging
+from services.structured_logging import (
+    JsonFormatter,
+    RequestIdFilter,
+    SamplingFilter,
+    get_request_id,
+    log_event,
+    parse_sample_rates,
+    restart_logging_listener,
+    summarize_payload,
+)
+
+
+def capture(logger_name, *filters):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    for f in filters:
+        handler.addFilter(f)
+    logger = logging.getLogger(logger_name)
+    logger.addHandler(handler)
+    logger.setLevel(logging.DEBUG)
+    return logger, stream
+
+
+def lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_summarize_payload_truncates_and_hashes():
+    summary = summarize_payload("a" * 1000, max_chars=10)
+    assert summary["bytes"] == 1000
+    assert summary["preview"] == "a" * 10 + "…"
+    assert len(summary["sha256"]) == 16
+    assert "preview" not in summarize_payload({"x": 1}, max_chars=0)
+    assert summarize_payload({"b": 1, "a": 2})["sha256"] == summarize_payload({"a": 2, "b": 1})["sha256"]
+
+
+def test_json_lines_carry_event_fields_and_request_id():
+    logger, stream = capture("nexera.test.json", RequestIdFilter())
+    log_event(logger, logging.INFO, "grading.completed", score=3)
+
+    [entry] = lines(stream)
+    assert entry["event"] == "grading.completed"
+    assert entry["score"] == 3
+    assert entry["request_id"] == "-"
+
+
+def test_callable_fields_are_built_only_when_the_level_is_on():
+    logger, stream = capture("nexera.test.lazy")
+    logger.setLevel(logging.INFO)
+    built = []
+
+    def summary():
+        built.append(1)
+        return {"bytes": 3}
+
+    log_event(logger, logging.DEBUG, "llm.response", response=summary)
+    assert built == [] and lines(stream) == []
+
+    log_event(logger, logging.INFO, "llm.response", response=summary)
+    assert built == [1] and lines(stream)[0]["response"] == {"bytes": 3}
+
+
+def test_sampling_keeps_or_drops_whole_requests():
+    sampler = SamplingFilter({"llm.response": 0.5})
+
+    def kept(request_id):
+        record = logging.LogRecord("nexera", logging.DEBUG, "", 0, "llm.response", None, None)
+        record.event = "llm.response"
+        record.request_id = request_id
+        return sampler.filter(record)
+
+    decisions = [kept(f"req-{i}") for i in range(400)]
+    assert 120 < sum(decisions) < 280
+    assert all(kept(f"req-{i}") == decisions[i] for i in range(400))
+
+    warning = logging.LogRecord("nexera", logging.WARNING, "", 0, "llm.response", None, None)
+    warning.event = "llm.response"
+    assert SamplingFilter({"llm.response": 0.0}).filter(warning)
+
+
+def test_parse_sample_rates_clamps_values():
+    assert parse_sample_rates("llm.response=0.1, grading.payload=2") == {
+        "llm.response": 0.1, "grading.payload": 1.0,
+    }
+    assert parse_sample_rates("") == {}
+
+
+def test_request_id_is_propagated_and_echoed():
+    logger, stream = capture("nexera.test.request", RequestIdFilter())
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/ping")
+    def ping():
+        # Sync route: runs in the threadpool, the context still carries the id
+        log_event(logger, logging.INFO, "ping")
+        return {"request_id": get_request_id()}
+
+    client = TestClient(app)
+    supplied = client.get("/ping", headers={"X-Request-ID": "edge-123"})
+    generated = client.get("/ping")
+    rejected = client.get("/ping", headers={"X-Request-ID": "bad id\twith spaces"})
+
+    assert supplied.headers["x-request-id"] == "edge-123"
+    assert supplied.json()["request_id"] == "edge-123"
+    assert len(generated.headers["x-request-id"]) == 32
+    assert rejected.headers["x-request-id"] != "bad id\twith spaces"
+    assert [entry["request_id"] for entry in lines(stream)][0] == "edge-123"
+
+
+def test_forked_worker_gets_a_listener_of_its_own(monkeypatch):
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    records = queue.SimpleQueue()
+    inherited = QueueListener(records, handler, respect_handler_level=True)  # its thread stayed in the parent
+    monkeypatch.setattr(structured_logging, "_listener", inherited)
+
+    listener = restart_logging_listener()
+    logger = logging.getLogger("nexera.test.fork")
+    logger.addHandler(QueueHandler(records))
+    logger.setLevel(logging.INFO)
+    log_event(logger, logging.INFO, "worker.ready")
+    listener.stop()
+
+    assert listener is not inherited and listener.handlers == (handler,) and listener.respect_handler_level
+    assert [entry["event"] for entry in lines(stream)] == ["worker.ready"]
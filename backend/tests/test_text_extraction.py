@@ -0,0 +1,84 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pymupdf
+import pytest
+from docx import Document
+
+from services.text_extraction import extract_text, iter_document_text
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    doc = pymupdf.open()
+    for number in range(1, 11):
+        doc.new_page().insert_text((72, 72), f"Page {number} text")
+    path = tmp_path / "notes.pdf"
+    doc.save(path)
+    doc.close()
+    return str(path)
+
+
+def test_pdf_pages_are_yielded_one_at_a_time(pdf_path):
+    pages = list(iter_document_text(pdf_path, "pdf"))
+    assert len(pages) == 10
+    assert "Page 3 text" in pages[2]
+
+
+def test_pdf_page_range(pdf_path):
+    result = extract_text(pdf_path, ".pdf", first_page=4, last_page=6)
+    assert result.units_read == 3
+    assert "Page 4" in result.text and "Page 6" in result.text
+    assert "Page 3" not in result.text and "Page 7" not in result.text
+    assert not result.truncated
+
+
+def test_page_cap_stops_early(pdf_path):
+    result = extract_text(pdf_path, "pdf", max_pages=2)
+    assert result.units_read == 2
+    assert result.truncated
+    assert "Page 3" not in result.text
+
+
+def test_char_cap_truncates_mid_page(pdf_path):
+    result = extract_text(pdf_path, "pdf", max_chars=20)
+    assert len(result.text) <= 20
+    assert result.truncated
+
+
+def test_docx_range_applies_to_paragraphs(tmp_path):
+    document = Document()
+    for number in range(1, 6):
+        document.add_paragraph(f"Paragraph {number}")
+    path = tmp_path / "notes.docx"
+    document.save(path)
+
+    result = extract_text(str(path), "docx", first_page=2, last_page=3)
+    assert result.text == "Paragraph 2\nParagraph 3"
+
+
+def test_txt_is_read_in_blocks_with_char_cap(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("abc" * 50_000, encoding="utf-8")
+
+    assert extract_text(str(path), "txt").text == "abc" * 50_000
+    capped = extract_text(str(path), "txt", max_chars=100)
+    assert capped.text == ("abc" * 34)[:100]
+    assert capped.truncated
+
+
+@pytest.mark.parametrize("max_chars", [5, 10, 11, 15, 21, 22, 25, 100])
+def test_char_cap_counts_separators_for_pdf_and_docx(pdf_path, tmp_path, max_chars):
+    document = Document()
+    for _ in range(3):
+        document.add_paragraph("x" * 10)
+    docx_path = tmp_path / "three.docx"
+    document.save(docx_path)
+
+    for path, file_type in ((str(docx_path), "docx"), (pdf_path, "pdf")):
+        full = extract_text(path, file_type).text
+        capped = extract_text(path, file_type, max_chars=max_chars)
+        assert len(capped.text) <= max_chars
+        assert capped.text == full[:len(capped.text)]
+        assert capped.truncated == (len(full) > max_chars)
@@ -7,6 +7,17 @@ from fastapi import HTTPException
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from routes import user_dashboard
+from db.models import Quiz, Question, QuizAttempt
+
+
+class ChainQuery:
+    """Query double: every builder method returns itself, all() returns rows."""
+    def __init__(self, rows):
+        self.rows = rows
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+    def all(self):
+        return self.rows
 
 # -----------------------
 # Tests for get_current_user_details
@@ -21,16 +32,21 @@ def test_get_current_user_details_positive():
 # -----------------------
 def test_fetch_dashboard_summary_empty():
     class DummyDB:
-        def query(self, model):
-            class DummyQuery:
-                def join(self, other): return self
-                def filter(self, condition): return self
-                def all(self): return []
-            return DummyQuery()
+        def query(self, *columns):
+            return ChainQuery([])
     user = type("User", (), {"id": "1"})()
     result = user_dashboard.fetch_dashboard_summary(db=DummyDB(), current_user=user)
     assert result == []
 
+def test_fetch_dashboard_summary_positive():
+    row = type("Row", (), {"id": "q1", "original_name": "doc.pdf", "created_at": "now", "question_count": 10})()
+    class DummyDB:
+        def query(self, *columns):
+            return ChainQuery([row])
+    user = type("User", (), {"id": "1"})()
+    result = user_dashboard.fetch_dashboard_summary(db=DummyDB(), current_user=user)
+    assert result == [{"quiz_id": "q1", "file_name": "doc.pdf", "created_at": "now", "question_count": 10}]
+
 def test_fetch_dashboard_summary_db_failure():
     class DummyDB:
         def query(self, model): raise Exception("DB error")
@@ -42,38 +58,27 @@ def test_fetch_dashboard_summary_db_failure():
 # get_quiz_sections_by_file
 # -----------------------
 def test_get_quiz_sections_by_file_positive():
-    class DummyQuiz:
-        id = 1
-
     class DummyQuestion:
         text = "Q1"
 
+    class DummyQuiz:
+        id = 1
+        region_index = None
+        questions = [DummyQuestion()]
+
     class DummyDB:
         def query(self, model):
-            class DummyQuery:
-                def filter(self, condition):
-                    class DummyFilter:
-                        def all(self):
-                            if model.__name__ == "Quiz":
-                                return [DummyQuiz()]
-                            elif model.__name__ == "Question":
-                                return [DummyQuestion()]
-                    return DummyFilter()
-            return DummyQuery()
+            return ChainQuery([DummyQuiz()])
     user = type("User", (), {"id": "1"})()
     result = user_dashboard.get_quiz_sections_by_file("dummy-id", db=DummyDB(), current_user=user)
     assert isinstance(result, list)
+    assert result[0]["section_number"] == 1
+    assert result[0]["questions"][0].text == "Q1"
 
 def test_get_quiz_sections_by_file_empty():
     class DummyDB:
         def query(self, model):
-            class DummyQuery:
-                def filter(self, condition):
-                    class DummyFilter:
-                        def all(self):
-                            return []
-                    return DummyFilter()
-            return DummyQuery()
+            return ChainQuery([])
     user = type("User", (), {"id": "1"})()
     result = user_dashboard.get_quiz_sections_by_file("dummy-id", db=DummyDB(), current_user=user)
     assert result == []
@@ -136,61 +141,47 @@ def test_edit_profile_empty_name():
 # -----------------------
 def test_get_user_quiz_history_empty():
     class DummyDB:
-        def query(self, model):
-            class DummyQuery:
-                def join(self, other): return self
-                def filter(self, *args): return self
-                def order_by(self, *args): return type("Q", (), {"all": lambda self: []})()
-            return DummyQuery()
+        def query(self, *columns):
+            return ChainQuery([])
     user = type("User", (), {"id": "1"})()
     result = user_dashboard.get_user_quiz_history(db=DummyDB(), current_user=user)
     assert result == []
 
 def test_get_user_quiz_history_positive():
+    class DummyFile:
+        id = "f1"
+        original_name = "doc1.txt"
+
     class DummyQuiz:
         def __init__(self, id):
             self.id = id
-            self.questions = [1, 2]
-            self.created_at = datetime.utcnow()
             self.file_id = "f1"
+            self.file = DummyFile()
 
     class DummyAttempt:
         def __init__(self, quiz_id):
             self.quiz_id = quiz_id
+            self.quiz = DummyQuiz(quiz_id)
             self.score = 5
             self.submitted_at = datetime.utcnow()
 
     class DummyDB:
-        def query(self, model):
-            if model.__name__ == "QuizAttempt":
-                return type("Query", (), {
-                    "join": lambda self, other: self,
-                    "filter": lambda self, *args: self,
-                    "order_by": lambda self, *args: type("Q", (), {
-                        "all": lambda self: [DummyAttempt("q1")]
-                    })()
-                })()
-            elif model.__name__ == "Quiz":
-                return type("Query", (), {
-                    "filter": lambda self, cond: type("Q", (), {
-                        "first": lambda self: DummyQuiz("q1"),
-                        "order_by": lambda self, *args: type("Q2", (), {
-                            "all": lambda self: [DummyQuiz("q1")]
-                        })()
-                    })()
-                })()
-            elif model.__name__ == "UploadedFile":
-                return type("Query", (), {
-                    "filter": lambda self, cond: type("Q", (), {
-                        "first": lambda self: type("F", (), {"original_name": "doc1.txt", "id": "f1"})()
-                    })()
-                })()
+        def query(self, *columns):
+            if columns[0] is QuizAttempt:
+                return ChainQuery([DummyAttempt("q1"), DummyAttempt("q2")])
+            if columns[0] is Quiz.id:
+                return ChainQuery([("q2", "f1"), ("q1", "f1")])
+            if columns[0] is Question.quiz_id:
+                return ChainQuery([("q1", 2), ("q2", 10)])
             return None
 
     user = type("User", (), {"id": "1"})()
     result = user_dashboard.get_user_quiz_history(db=DummyDB(), current_user=user)
     assert isinstance(result, list)
     assert result[0]["score"] == 5
+    assert result[0]["label"] == "doc1.txt - Section 2"
+    assert result[0]["num_questions"] == 2
+    assert result[1]["label"] == "doc1.txt - Section 1"
 
 # -----------------------
 # get_attempt_details
@@ -285,3 +276,38 @@ def test_weekly_average_scores_positive():
     result = user_dashboard.weekly_average_scores(db=DummyDB(), current_user=type("User", (), {"id": 1})())
     assert result[0]["avg_score"] == 3.5
     assert result[1]["avg_score"] == 4.2
+
+
+# -----------------------
+# Tests for response models
+# -----------------------
+def _render(path, content):
+    import asyncio
+    from fastapi.responses import ORJSONResponse
+    from fastapi.routing import serialize_response
+    import orjson
+
+    route = next(r for r in user_dashboard.router.routes if r.path == path and "GET" in r.methods)
+    body = ORJSONResponse(asyncio.run(serialize_response(field=route.response_field, response_content=content))).body
+    return orjson.loads(body)
+
+
+def test_file_listing_hides_storage_columns():
+    from db.models import UploadedFile
+
+    record = UploadedFile(id=uuid4(), user_id=uuid4(), filename="3f2a.pdf", original_name="notes.pdf",
+                          file_type="pdf", content_hash="ab" * 32, uploaded_at=datetime(2026, 1, 1))
+    [item] = _render("/dashboard/files", [record])
+    assert set(item) == {"id", "original_name", "file_type", "uploaded_at"}
+    assert item["original_name"] == "notes.pdf"
+
+
+def test_sections_serialize_orm_questions():
+    question = Question(id=uuid4(), quiz_id=uuid4(), text="Q1", options=["A", "B"], correct_answer="A",
+                        explanation="", question_type="mcq")
+    quiz_id = uuid4()
+    [section] = _render("/dashboard/files/{file_id}/sections",
+                        [{"section_number": 1, "quiz_id": quiz_id, "region_index": None, "questions": [question]}])
+    assert section["quiz_id"] == str(quiz_id)
+    assert section["questions"][0]["options"] == ["A", "B"]
+    assert "quiz_id" not in section["questions"][0]